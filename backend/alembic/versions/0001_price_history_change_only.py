@@ -0,0 +1,51 @@
+"""Change-only price history: offer identity, fingerprint and validity interval
+
+Revision ID: 0001_price_history_change_only
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_price_history_change_only"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+NEW_COLUMNS = [
+    sa.Column("offer_key", sa.String(40)),
+    sa.Column("fingerprint", sa.String(40)),
+    sa.Column("first_seen", sa.DateTime()),
+    sa.Column("last_seen", sa.DateTime()),
+]
+OFFER_KEY_INDEX = "ix_price_history_offer_key"
+
+
+def upgrade() -> None:
+    # Tables may already have been created by create_tables(); only add what is missing
+    inspector = sa.inspect(op.get_bind())
+    if "price_history" not in inspector.get_table_names():
+        return
+    existing = {column["name"] for column in inspector.get_columns("price_history")}
+    with op.batch_alter_table("price_history") as batch:
+        for column in NEW_COLUMNS:
+            if column.name not in existing:
+                batch.add_column(column.copy())
+    if OFFER_KEY_INDEX not in {index["name"] for index in inspector.get_indexes("price_history")}:
+        op.create_index(OFFER_KEY_INDEX, "price_history", ["offer_key"])
+    # Existing rows were each seen once, at scraped_at
+    op.execute(
+        "UPDATE price_history SET first_seen = scraped_at, last_seen = scraped_at "
+        "WHERE first_seen IS NULL"
+    )
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if OFFER_KEY_INDEX in {index["name"] for index in inspector.get_indexes("price_history")}:
+        op.drop_index(OFFER_KEY_INDEX, table_name="price_history")
+    existing = {column["name"] for column in inspector.get_columns("price_history")}
+    with op.batch_alter_table("price_history") as batch:
+        for column in reversed(NEW_COLUMNS):
+            if column.name in existing:
+                batch.drop_column(column.name)
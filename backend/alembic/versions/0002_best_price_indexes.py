@@ -0,0 +1,79 @@
+"""Composite price history indexes and the current best price table
+
+Revision ID: 0002_best_price_indexes
+Revises: 0001_price_history_change_only
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_best_price_indexes"
+down_revision = "0001_price_history_change_only"
+branch_labels = None
+depends_on = None
+
+PRICE_HISTORY_INDEXES = {
+    "ix_price_history_set_scraped_at": ["lego_set_id", "scraped_at"],
+    "ix_price_history_set_total_price": ["lego_set_id", "total_price"],
+}
+BEST_PRICE_TABLE = "current_best_price"
+
+# One row per set and condition: the cheapest price history row, earliest first on ties
+BACKFILL_BEST_PRICES = f"""
+INSERT INTO {BEST_PRICE_TABLE}
+    (lego_set_id, condition, price, shipping_cost, total_price, store_name, store_url, seen_at, updated_at)
+SELECT ph.lego_set_id, COALESCE(ph.condition, 'new'), ph.price, ph.shipping_cost, ph.total_price,
+       ph.store_name, ph.store_url, ph.scraped_at, CURRENT_TIMESTAMP
+FROM price_history ph
+WHERE ph.id = (
+    SELECT cheapest.id FROM price_history cheapest
+    WHERE cheapest.lego_set_id = ph.lego_set_id
+      AND COALESCE(cheapest.condition, 'new') = COALESCE(ph.condition, 'new')
+    ORDER BY cheapest.total_price, cheapest.id
+    LIMIT 1
+)
+AND NOT EXISTS (
+    SELECT 1 FROM {BEST_PRICE_TABLE} best
+    WHERE best.lego_set_id = ph.lego_set_id AND best.condition = COALESCE(ph.condition, 'new')
+)
+"""
+
+
+def upgrade() -> None:
+    # Tables may already have been created by create_tables(); only add what is missing
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    if "price_history" not in tables:
+        return
+    existing_indexes = {index["name"] for index in inspector.get_indexes("price_history")}
+    for name, columns in PRICE_HISTORY_INDEXES.items():
+        if name not in existing_indexes:
+            op.create_index(name, "price_history", columns)
+
+    if BEST_PRICE_TABLE not in tables:
+        op.create_table(
+            BEST_PRICE_TABLE,
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("lego_set_id", sa.Integer(), sa.ForeignKey("lego_sets.id"), nullable=False),
+            sa.Column("condition", sa.String(50), nullable=False),
+            sa.Column("price", sa.Float(), nullable=False),
+            sa.Column("shipping_cost", sa.Float()),
+            sa.Column("total_price", sa.Float(), nullable=False),
+            sa.Column("store_name", sa.String(100), nullable=False),
+            sa.Column("store_url", sa.Text()),
+            sa.Column("seen_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+            sa.UniqueConstraint("lego_set_id", "condition", name="uq_current_best_price_set_condition"),
+        )
+        op.create_index("ix_current_best_price_id", BEST_PRICE_TABLE, ["id"])
+    op.execute(BACKFILL_BEST_PRICES)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if BEST_PRICE_TABLE in inspector.get_table_names():
+        op.drop_table(BEST_PRICE_TABLE)
+    existing_indexes = {index["name"] for index in inspector.get_indexes("price_history")}
+    for name in PRICE_HISTORY_INDEXES:
+        if name in existing_indexes:
+            op.drop_index(name, table_name="price_history")
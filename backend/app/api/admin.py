@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Depends
+
+from ..auth.auth import get_current_active_user
+from ..database.offer_writer import offer_writer
+from ..journal.scrape_journal import scrape_journal
+from ..scheduler.crawl_scheduler import crawl_scheduler
+from ..scraper.browser_pool import browser_pool
+from ..scraper.cache import scrape_cache
+from ..scraper.fetcher import tier_stats
+from ..scraper.product_index import product_indexes
+from ..scraper.readiness import readiness_stats
+from ..scraper.resource_policy import resource_stats
+from ..scraper.runtime import refresh_stats, scrape_flight
+from ..scraper.selector_memory import selector_memories
+from ..scraper.throttle import throttles
+
+# Scraper internals are for signed-in users only
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(get_current_active_user)])
+
+
+@router.get("/browser-pool")
+async def get_browser_pool_stats():
+    """Get shared browser pool statistics"""
+    return browser_pool.stats()
+
+
+@router.get("/resource-policy")
+async def get_resource_policy_stats():
+    """Get per-store counters of blocked requests and estimated bytes saved"""
+    return {store: stats.to_dict() for store, stats in resource_stats.items()}
+
+
+@router.get("/fetch-tiers")
+async def get_fetch_tier_stats():
+    """Get per-store counts of requests served over HTTP versus the browser"""
+    return {store: stats.to_dict() for store, stats in tier_stats.items()}
+
+
+@router.get("/cache")
+async def get_cache_stats():
+    """Get scrape cache hit, miss and eviction counters and background refreshes"""
+    return {**scrape_cache.stats(), "refreshes": refresh_stats.to_dict()}
+
+
+@router.get("/singleflight")
+async def get_singleflight_stats():
+    """Get counts of scrapes executed versus coalesced into an in-flight one"""
+    return scrape_flight.stats()
+
+
+@router.get("/crawl-scheduler")
+async def get_crawl_scheduler_stats():
+    """Get crawl scheduler leadership, budgets and dispatch counters"""
+    return crawl_scheduler.stats()
+
+
+@router.get("/throttle")
+async def get_throttle_stats():
+    """Get current per-store rate and concurrency limits and request outcomes"""
+    return {store: throttle.to_dict() for store, throttle in throttles.items()}
+
+
+@router.get("/selectors")
+async def get_selector_stats():
+    """Get per-store winning selectors and hit rates of each fallback chain"""
+    return {store: memory.to_dict() for store, memory in selector_memories.items()}
+
+
+@router.get("/readiness")
+async def get_readiness_stats():
+    """Get per-store time-to-ready of result pages and how often the wait timed out"""
+    return {store: stats.to_dict() for store, stats in readiness_stats.items()}
+
+
+@router.get("/product-index")
+async def get_product_index_stats():
+    """Get per-store size and hit ratio of the set number to product page index"""
+    return {store: index.to_dict() for store, index in product_indexes.items()}
+
+
+@router.get("/offer-writer")
+async def get_offer_writer_stats():
+    """Get counts of scraped offers buffered and written to price history"""
+    return offer_writer.stats()
+
+
+@router.get("/journal")
+async def get_journal_stats():
+    """Get scrape journal entries written and segments waiting to be loaded"""
+    return scrape_journal.stats()
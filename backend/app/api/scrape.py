@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from celery.result import AsyncResult
+
+from ..celery_app import celery_app, STORE_KEYS
+from ..database.database import get_async_db
+from ..database.models import LegoSet, PriceHistory, User
+from ..database.price_history import latest_rows
+from ..auth.auth import get_current_active_user
+from ..tasks import enqueue_search
+
+router = APIRouter(prefix="/api", tags=["scraping"])
+
+
+@router.post("/scrape", status_code=status.HTTP_202_ACCEPTED)
+async def enqueue_scrape(query: str, current_user: User = Depends(get_current_active_user)):
+    """Queue a background scrape of every store for a query (signed-in users only)"""
+    try:
+        tasks = enqueue_search(query, STORE_KEYS)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Scrape queue unavailable: {str(e)}"
+        )
+    return {"query": query, "tasks": tasks}
+
+
+@router.get("/scrape/{task_id}")
+async def get_scrape_status(task_id: str):
+    """Get the state of a queued scrape"""
+    result = AsyncResult(task_id, app=celery_app)
+    return {
+        "task_id": task_id,
+        "status": result.status,
+        "result": result.result if result.successful() else None
+    }
+
+
+@router.get("/prices/{set_number}")
+async def get_stored_prices(set_number: str, db: AsyncSession = Depends(get_async_db)):
+    """Get the latest stored offer of each listing for a set"""
+    lego_set = await db.scalar(select(LegoSet).where(LegoSet.set_number == set_number))
+    if not lego_set:
+        raise HTTPException(status_code=404, detail=f"Set {set_number} not found")
+
+    offers = list(await db.scalars(
+        latest_rows(PriceHistory.lego_set_id == lego_set.id, PriceHistory.offer_key.isnot(None))
+        .order_by(PriceHistory.total_price)
+    ))
+    return {
+        "set_number": lego_set.set_number,
+        "set_name": lego_set.name,
+        "total_offers": len(offers),
+        "offers": [
+            {
+                "price": price.price,
+                "shipping_cost": price.shipping_cost,
+                "total_price": price.total_price,
+                "store_name": price.store_name,
+                "store_url": price.store_url,
+                "condition": price.condition,
+                "availability": price.availability,
+                "scraped_at": price.scraped_at.isoformat() if price.scraped_at else None,
+                "first_seen": price.first_seen.isoformat() if price.first_seen else None,
+                "last_seen": price.last_seen.isoformat() if price.last_seen else None
+            }
+            for price in offers
+        ]
+    }
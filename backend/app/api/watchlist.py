@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 
-from ..database.database import get_db
-from ..database.models import User, WatchlistItem, LegoSet, PriceHistory
+from ..database.database import get_async_db
+from ..database.models import User, WatchlistItem, LegoSet, CurrentBestPrice
 from ..auth.auth import get_current_active_user
 
 router = APIRouter(prefix="/watchlist", tags=["watchlist"])
@@ -25,15 +26,21 @@ class WatchlistItemResponse(BaseModel):
     price_difference: Optional[float]
     created_at: datetime
 
+async def get_best_price(db: AsyncSession, lego_set_id: int) -> Optional[float]:
+    """Lowest stored total price of a set, in any condition"""
+    return await db.scalar(
+        select(func.min(CurrentBestPrice.total_price)).where(CurrentBestPrice.lego_set_id == lego_set_id)
+    )
+
 @router.post("/", response_model=WatchlistItemResponse)
 async def add_to_watchlist(
     item: WatchlistItemCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add a LEGO set to user's watchlist"""
     # Check if set exists
-    lego_set = db.query(LegoSet).filter(LegoSet.set_number == item.set_number).first()
+    lego_set = await db.scalar(select(LegoSet).where(LegoSet.set_number == item.set_number))
     if not lego_set:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -41,10 +48,10 @@ async def add_to_watchlist(
         )
     
     # Check if already in watchlist
-    existing_item = db.query(WatchlistItem).filter(
+    existing_item = await db.scalar(select(WatchlistItem).where(
         WatchlistItem.user_id == current_user.id,
         WatchlistItem.lego_set_id == lego_set.id
-    ).first()
+    ))
     
     if existing_item:
         raise HTTPException(
@@ -61,17 +68,15 @@ async def add_to_watchlist(
     )
     
     db.add(watchlist_item)
-    db.commit()
-    db.refresh(watchlist_item)
+    await db.commit()
+    await db.refresh(watchlist_item)
     
     # Get current best price
-    current_price = db.query(PriceHistory).filter(
-        PriceHistory.lego_set_id == lego_set.id
-    ).order_by(PriceHistory.total_price.asc()).first()
+    current_price = await get_best_price(db, lego_set.id)
     
     price_difference = None
-    if current_price and item.target_price:
-        price_difference = item.target_price - current_price.total_price
+    if current_price is not None and item.target_price:
+        price_difference = item.target_price - current_price
     
     return WatchlistItemResponse(
         id=watchlist_item.id,
@@ -79,7 +84,7 @@ async def add_to_watchlist(
         set_name=lego_set.name,
         target_price=watchlist_item.target_price,
         notification_enabled=watchlist_item.notification_enabled,
-        current_best_price=current_price.total_price if current_price else None,
+        current_best_price=current_price,
         price_difference=price_difference,
         created_at=watchlist_item.created_at
     )
@@ -87,23 +92,22 @@ async def add_to_watchlist(
 @router.get("/", response_model=List[WatchlistItemResponse])
 async def get_watchlist(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get user's watchlist"""
-    watchlist_items = db.query(WatchlistItem).filter(
-        WatchlistItem.user_id == current_user.id
-    ).all()
+    rows = await db.execute(
+        select(WatchlistItem, LegoSet)
+        .join(LegoSet, LegoSet.id == WatchlistItem.lego_set_id)
+        .where(WatchlistItem.user_id == current_user.id)
+    )
     
     result = []
-    for item in watchlist_items:
-        lego_set = db.query(LegoSet).filter(LegoSet.id == item.lego_set_id).first()
-        current_price = db.query(PriceHistory).filter(
-            PriceHistory.lego_set_id == item.lego_set_id
-        ).order_by(PriceHistory.total_price.asc()).first()
+    for item, lego_set in rows.all():
+        current_price = await get_best_price(db, item.lego_set_id)
         
         price_difference = None
-        if current_price and item.target_price:
-            price_difference = item.target_price - current_price.total_price
+        if current_price is not None and item.target_price:
+            price_difference = item.target_price - current_price
         
         result.append(WatchlistItemResponse(
             id=item.id,
@@ -111,7 +115,7 @@ async def get_watchlist(
             set_name=lego_set.name,
             target_price=item.target_price,
             notification_enabled=item.notification_enabled,
-            current_best_price=current_price.total_price if current_price else None,
+            current_best_price=current_price,
             price_difference=price_difference,
             created_at=item.created_at
         ))
@@ -123,13 +127,13 @@ async def update_watchlist_item(
     item_id: int,
     item_update: WatchlistItemCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update watchlist item"""
-    watchlist_item = db.query(WatchlistItem).filter(
+    watchlist_item = await db.scalar(select(WatchlistItem).where(
         WatchlistItem.id == item_id,
         WatchlistItem.user_id == current_user.id
-    ).first()
+    ))
     
     if not watchlist_item:
         raise HTTPException(
@@ -141,18 +145,16 @@ async def update_watchlist_item(
     watchlist_item.target_price = item_update.target_price
     watchlist_item.notification_enabled = item_update.notification_enabled
     
-    db.commit()
-    db.refresh(watchlist_item)
+    await db.commit()
+    await db.refresh(watchlist_item)
     
     # Get updated data
-    lego_set = db.query(LegoSet).filter(LegoSet.id == watchlist_item.lego_set_id).first()
-    current_price = db.query(PriceHistory).filter(
-        PriceHistory.lego_set_id == watchlist_item.lego_set_id
-    ).order_by(PriceHistory.total_price.asc()).first()
+    lego_set = await db.get(LegoSet, watchlist_item.lego_set_id)
+    current_price = await get_best_price(db, watchlist_item.lego_set_id)
     
     price_difference = None
-    if current_price and watchlist_item.target_price:
-        price_difference = watchlist_item.target_price - current_price.total_price
+    if current_price is not None and watchlist_item.target_price:
+        price_difference = watchlist_item.target_price - current_price
     
     return WatchlistItemResponse(
         id=watchlist_item.id,
@@ -160,7 +162,7 @@ async def update_watchlist_item(
         set_name=lego_set.name,
         target_price=watchlist_item.target_price,
         notification_enabled=watchlist_item.notification_enabled,
-        current_best_price=current_price.total_price if current_price else None,
+        current_best_price=current_price,
         price_difference=price_difference,
         created_at=watchlist_item.created_at
     )
@@ -169,13 +171,13 @@ async def update_watchlist_item(
 async def remove_from_watchlist(
     item_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Remove item from watchlist"""
-    watchlist_item = db.query(WatchlistItem).filter(
+    watchlist_item = await db.scalar(select(WatchlistItem).where(
         WatchlistItem.id == item_id,
         WatchlistItem.user_id == current_user.id
-    ).first()
+    ))
     
     if not watchlist_item:
         raise HTTPException(
@@ -183,7 +185,7 @@ async def remove_from_watchlist(
             detail="Watchlist item not found"
         )
     
-    db.delete(watchlist_item)
-    db.commit()
+    await db.delete(watchlist_item)
+    await db.commit()
     
     return {"message": "Item removed from watchlist"} 
\ No newline at end of file
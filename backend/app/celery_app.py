@@ -0,0 +1,51 @@
+import os
+
+from celery import Celery
+from kombu import Queue
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", REDIS_URL)
+
+# Every worker process drives its own Chromium pool, so keep process counts low
+CELERY_WORKER_CONCURRENCY = int(os.getenv("CELERY_WORKER_CONCURRENCY", "2"))
+# Recycle worker processes periodically to return browser memory to the OS
+CELERY_MAX_TASKS_PER_CHILD = int(os.getenv("CELERY_MAX_TASKS_PER_CHILD", "100"))
+SCRAPE_TASK_TIME_LIMIT = int(os.getenv("SCRAPE_TASK_TIME_LIMIT", "120"))
+
+STORE_KEYS = ("allegro", "olx", "ceneo")
+DEFAULT_QUEUE = "celery"
+
+
+def queue_for_store(store_key: str) -> str:
+    """Name of the queue that carries scrapes of one store"""
+    return f"scrape.{store_key}"
+
+
+celery_app = Celery(
+    "lego_price_agent",
+    broker=CELERY_BROKER_URL,
+    backend=CELERY_RESULT_BACKEND,
+    include=["app.tasks"]
+)
+
+celery_app.conf.update(
+    # One queue per store, so a slow or blocked store cannot starve the others
+    # and workers can be dedicated to a store with ``-Q scrape.<store>``
+    task_queues=[Queue(DEFAULT_QUEUE)] + [Queue(queue_for_store(key)) for key in STORE_KEYS],
+    task_default_queue=DEFAULT_QUEUE,
+    # Scrapes take seconds each: reserve one task at a time and acknowledge it
+    # only when done, so a crashed worker's task is redelivered
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_concurrency=CELERY_WORKER_CONCURRENCY,
+    worker_max_tasks_per_child=CELERY_MAX_TASKS_PER_CHILD,
+    task_time_limit=SCRAPE_TASK_TIME_LIMIT,
+    task_soft_time_limit=max(SCRAPE_TASK_TIME_LIMIT - 15, 1),
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    result_expires=3600,
+    timezone="UTC",
+)
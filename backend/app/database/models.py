@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 
@@ -37,10 +37,44 @@ class PriceHistory(Base):
     availability = Column(Boolean, default=True)
     currency = Column(String(3), default="PLN")
     scraped_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    # Change-only storage: one row per distinct observation of a listing,
+    # valid from first_seen until last_seen
+    offer_key = Column(String(40), index=True)  # store + set + canonical URL
+    fingerprint = Column(String(40))  # offer_key + price, shipping, condition, availability
+    first_seen = Column(DateTime)
+    last_seen = Column(DateTime)
     
     # Relationships
     lego_set = relationship("LegoSet", back_populates="prices")
 
+    __table_args__ = (
+        Index("ix_price_history_set_scraped_at", "lego_set_id", "scraped_at"),
+        Index("ix_price_history_set_total_price", "lego_set_id", "total_price"),
+    )
+
+class CurrentBestPrice(Base):
+    """Cheapest current offer of a set in one condition, recomputed at ingest.
+
+    Current offers are the newest observations of listings still being
+    seen; the row follows them up as well as down.
+    """
+    __tablename__ = "current_best_price"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    lego_set_id = Column(Integer, ForeignKey("lego_sets.id"), nullable=False)
+    condition = Column(String(50), nullable=False)
+    price = Column(Float, nullable=False)
+    shipping_cost = Column(Float, default=0.0)
+    total_price = Column(Float, nullable=False)
+    store_name = Column(String(100), nullable=False)
+    store_url = Column(Text)
+    seen_at = Column(DateTime)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        UniqueConstraint("lego_set_id", "condition", name="uq_current_best_price_set_condition"),
+    )
+
 class PriceRecommendation(Base):
     __tablename__ = "price_recommendations"
     
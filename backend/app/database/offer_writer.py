@@ -0,0 +1,139 @@
+import asyncio
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .price_history import record_offers
+
+OFFER_WRITE_BEHIND = os.getenv("OFFER_WRITE_BEHIND", "true").lower() == "true"
+# Buffered offers that trigger a flush, and the longest an offer waits for one
+OFFER_BATCH_SIZE = int(os.getenv("OFFER_BATCH_SIZE", "200"))
+OFFER_FLUSH_SECONDS = float(os.getenv("OFFER_FLUSH_SECONDS", "5"))
+# Offers kept while the database is unreachable; the oldest are dropped beyond this
+OFFER_BUFFER_MAX = int(os.getenv("OFFER_BUFFER_MAX", "20000"))
+
+
+class OfferWriter:
+    """Write-behind buffer that persists scraped offers in batches.
+
+    ``submit`` only appends to an in-memory buffer, so request handlers never
+    wait on the database. A background task flushes the buffer through
+    ``record_offers`` in a worker thread when it reaches ``batch_size`` offers
+    or every ``flush_seconds``. Until ``start`` is called submissions are
+    ignored, so processes that store offers themselves (Celery workers) do
+    not write them twice.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal,
+                 batch_size: int = OFFER_BATCH_SIZE, flush_seconds: float = OFFER_FLUSH_SECONDS,
+                 max_buffer: int = OFFER_BUFFER_MAX):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_buffer = max_buffer
+        self._buffer: List = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.submitted = 0
+        self.written = 0
+        self.flushes = 0
+        self.failures = 0
+        self.dropped = 0
+        self.last_flush_ms: Optional[int] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def submit(self, offers: Iterable):
+        """Queue offers for the next flush without blocking"""
+        if not self.running:
+            return
+        offers = list(offers)
+        self._buffer.extend(offers)
+        self.submitted += len(offers)
+        self._trim()
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def _trim(self):
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.dropped += overflow
+
+    def _write(self, batch: List) -> int:
+        db = self.session_factory()
+        try:
+            written = record_offers(db, batch)
+            db.commit()
+            return written
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def flush(self) -> int:
+        """Write everything buffered so far; returns the rows written"""
+        written = 0
+        while self._buffer:
+            batch, self._buffer = self._buffer[:self.batch_size], self._buffer[self.batch_size:]
+            started = time.monotonic()
+            try:
+                written += await asyncio.to_thread(self._write, batch)
+            except Exception as e:
+                # Keep the batch for the next attempt; the buffer bound caps the backlog
+                self.failures += 1
+                self._buffer[:0] = batch
+                self._trim()
+                print(f"Offer flush of {len(batch)} offers failed: {e}")
+                break
+            self.flushes += 1
+            self.last_flush_ms = round((time.monotonic() - started) * 1000)
+        self.written += written
+        return written
+
+    async def run_forever(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if not self.running:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        """Stop the flush loop and write what is still buffered"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict:
+        return {
+            "running": self.running,
+            "submitted": self.submitted,
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+
+offer_writer = OfferWriter()
@@ -0,0 +1,260 @@
+import hashlib
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List
+from urllib.parse import urlsplit
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .models import CurrentBestPrice, LegoSet, PriceHistory
+
+# Rows per multi-row INSERT statement, or keys per IN list (bind parameters are capped)
+INSERT_CHUNK_SIZE = 1000
+# Condition of price rows that do not state one (the column default)
+DEFAULT_CONDITION = "new"
+# Set numbers that identify a catalog set; anything else is not stored
+CATALOG_SET_NUMBER = re.compile(r"^\d{3,6}$")
+# A listing not seen this long before its set's newest observation no longer counts as a current offer
+CURRENT_OFFER_MAX_AGE = timedelta(hours=float(os.getenv("CURRENT_OFFER_MAX_AGE_HOURS", "48")))
+
+
+def to_utc(value: datetime) -> datetime:
+    """A timestamp as naive UTC, the form price history stores; naive values are taken as UTC"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def upsert_catalog_sets(db: Session, names: Dict[str, str]) -> Dict[str, int]:
+    """Create missing catalog rows in one statement; returns ids by set number"""
+    if not names:
+        return {}
+    dialect = db.get_bind().dialect.name
+    rows = [{"set_number": set_number, "name": name[:500]} for set_number, name in names.items()]
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        db.execute(dialect_insert(LegoSet).values(rows).on_conflict_do_nothing(index_elements=["set_number"]))
+    else:
+        existing = set(db.scalars(select(LegoSet.set_number).where(LegoSet.set_number.in_(names))))
+        missing = [row for row in rows if row["set_number"] not in existing]
+        if missing:
+            db.execute(insert(LegoSet), missing)
+    return dict(db.execute(select(LegoSet.set_number, LegoSet.id).where(LegoSet.set_number.in_(names))).all())
+
+
+def insert_price_rows(db: Session, rows: List[Dict]):
+    """Insert price history rows in bulk.
+
+    Postgres gets multi-row INSERT statements; other databases, SQLite
+    included, an executemany of one prepared statement.
+    """
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+            db.execute(insert(PriceHistory).values(rows[start:start + INSERT_CHUNK_SIZE]))
+    else:
+        db.execute(insert(PriceHistory), rows)
+
+
+def canonical_url(url: str) -> str:
+    """A listing URL without query string, fragment or trailing slash"""
+    if not url:
+        return ""
+    parts = urlsplit(url)
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}{parts.path.rstrip('/')}"
+
+
+def _digest(*values) -> str:
+    return hashlib.sha1("|".join(str(value) for value in values).encode("utf-8")).hexdigest()
+
+
+def offer_key(offer) -> str:
+    """Identity of a listing across scrapes"""
+    return _digest(offer.store_name, offer.set_number, canonical_url(offer.store_url))
+
+
+def offer_fingerprint(offer) -> str:
+    """Identity of a listing together with everything that makes a price observation differ"""
+    return _digest(
+        offer_key(offer), round(offer.price, 2), round(offer.shipping_cost or 0.0, 2),
+        offer.condition, bool(offer.availability)
+    )
+
+
+def observed_at():
+    """When a price history row was last observed (rows predating last_seen use scraped_at)"""
+    return func.coalesce(PriceHistory.last_seen, PriceHistory.scraped_at)
+
+
+def latest_rows(*conditions):
+    """Select the newest observation of each listing matching the conditions.
+
+    Newest means latest observed, not last inserted: a late or replayed
+    write of an older observation gets a higher id but must not win.
+    """
+    ranked = select(
+        PriceHistory.id,
+        func.row_number().over(
+            partition_by=PriceHistory.offer_key,
+            order_by=(observed_at().desc(), PriceHistory.id.desc())
+        ).label("rank")
+    ).where(*conditions).subquery()
+    return select(PriceHistory).join(ranked, ranked.c.id == PriceHistory.id).where(ranked.c.rank == 1)
+
+
+def latest_observations(db: Session, keys: Iterable[str]) -> Dict[str, Dict]:
+    """Newest price history row of each listing, by offer key"""
+    keys = list(set(keys))
+    latest = {}
+    for start in range(0, len(keys), INSERT_CHUNK_SIZE):
+        chunk = keys[start:start + INSERT_CHUNK_SIZE]
+        for row in db.scalars(latest_rows(PriceHistory.offer_key.in_(chunk))):
+            latest[row.offer_key] = {
+                "id": row.id, "fingerprint": row.fingerprint, "last_seen": row.last_seen or row.scraped_at
+            }
+    return latest
+
+
+def update_best_prices(db: Session, set_ids: Iterable[int]):
+    """Recompute the current best price per condition of the given sets.
+
+    Candidates are the newest observation of each listing, if available
+    and seen within CURRENT_OFFER_MAX_AGE of the set's newest observation;
+    listings that stopped showing up count as gone. A set's rows are
+    replaced, so a best price goes back up when its offer changes or ends.
+    """
+    set_ids = list(set(set_ids))
+    now = to_utc(datetime.now(timezone.utc))
+    for start in range(0, len(set_ids), INSERT_CHUNK_SIZE):
+        chunk = set_ids[start:start + INSERT_CHUNK_SIZE]
+        rows = list(db.scalars(latest_rows(PriceHistory.lego_set_id.in_(chunk), PriceHistory.offer_key.isnot(None))))
+        newest: Dict[int, datetime] = {}
+        for row in rows:
+            seen = row.last_seen or row.scraped_at
+            newest[row.lego_set_id] = max(newest.get(row.lego_set_id, seen), seen)
+
+        cheapest: Dict[tuple, PriceHistory] = {}
+        for row in rows:
+            seen = row.last_seen or row.scraped_at
+            if row.availability is False or seen < newest[row.lego_set_id] - CURRENT_OFFER_MAX_AGE:
+                continue
+            key = (row.lego_set_id, row.condition or DEFAULT_CONDITION)
+            if key not in cheapest or row.total_price < cheapest[key].total_price:
+                cheapest[key] = row
+
+        db.execute(delete(CurrentBestPrice).where(CurrentBestPrice.lego_set_id.in_(chunk)))
+        if cheapest:
+            db.execute(insert(CurrentBestPrice), [
+                {
+                    "lego_set_id": set_id,
+                    "condition": condition,
+                    "price": row.price,
+                    "shipping_cost": row.shipping_cost,
+                    "total_price": row.total_price,
+                    "store_name": row.store_name,
+                    "store_url": row.store_url,
+                    "seen_at": row.last_seen or row.scraped_at,
+                    "updated_at": now,
+                }
+                for (set_id, condition), row in cheapest.items()
+            ])
+
+
+def stored_offers(db: Session, set_numbers: Iterable[str], since: datetime) -> List:
+    """Newest stored observation of each listing of the given sets seen since ``since``.
+
+    Returned as scraper LegoSet dataclasses so that they can be analyzed
+    like freshly scraped offers.
+    """
+    from ..scraper.base_scraper import LegoSet as ScrapedSet
+
+    catalog_ids = select(LegoSet.id).where(LegoSet.set_number.in_(list(set_numbers)))
+    query = latest_rows(
+        PriceHistory.lego_set_id.in_(catalog_ids),
+        PriceHistory.offer_key.isnot(None),
+        observed_at() >= to_utc(since)
+    ).join(LegoSet, LegoSet.id == PriceHistory.lego_set_id).add_columns(LegoSet.set_number, LegoSet.name)
+    return [
+        ScrapedSet(
+            set_number=set_number,
+            name=name,
+            price=row.price,
+            shipping_cost=row.shipping_cost or 0.0,
+            total_price=row.total_price,
+            store_name=row.store_name,
+            store_url=row.store_url or "",
+            condition=row.condition or DEFAULT_CONDITION,
+            availability=bool(row.availability),
+            last_updated=(row.last_seen or row.scraped_at).replace(tzinfo=timezone.utc)
+        )
+        for row, set_number, name in db.execute(query.order_by(PriceHistory.total_price))
+    ]
+
+
+def record_offers(db: Session, offers: Iterable) -> int:
+    """Store scraped offers (scraper LegoSet dataclasses) as price history.
+
+    Only changes are stored: an offer identical to its listing's newest
+    row (same fingerprint) extends that row's last_seen instead of adding
+    a row. Offers older than their listing's newest observation are
+    ignored, and so are offers without a catalog set number. Catalog rows
+    are created for sets seen for the first time and the current best
+    prices of the offers' sets are recomputed. Timestamps are stored as naive
+    UTC. Everything is written with a few bulk statements, however many
+    offers there are. Returns the number of price history rows added; the caller
+    commits.
+    """
+    offers = sorted(
+        (offer for offer in offers if CATALOG_SET_NUMBER.match(offer.set_number or "")),
+        key=lambda offer: to_utc(offer.last_updated)
+    )
+    catalog = upsert_catalog_sets(db, {offer.set_number: offer.name for offer in offers})
+    keys = [offer_key(offer) for offer in offers]
+    latest = latest_observations(db, keys)
+
+    inserts: List[Dict] = []
+    extended: Dict[int, Dict] = {}
+    for offer, key in zip(offers, keys):
+        fingerprint = offer_fingerprint(offer)
+        observed = to_utc(offer.last_updated)
+        previous = latest.get(key)
+        if previous is not None and previous["last_seen"] is not None and observed < previous["last_seen"]:
+            # Older than what is stored (a late write or a replay): the listing has moved on since
+            continue
+        if previous is not None and previous["fingerprint"] == fingerprint:
+            if previous["last_seen"] is None or observed > previous["last_seen"]:
+                previous["last_seen"] = observed
+                if "id" in previous:
+                    extended[previous["id"]] = previous
+            continue
+        row = {
+            "lego_set_id": catalog[offer.set_number],
+            "store_name": offer.store_name,
+            "store_url": offer.store_url,
+            "price": offer.price,
+            "shipping_cost": offer.shipping_cost,
+            "total_price": offer.total_price,
+            "condition": offer.condition,
+            "availability": offer.availability,
+            "scraped_at": observed,
+            "offer_key": key,
+            "fingerprint": fingerprint,
+            "first_seen": observed,
+            "last_seen": observed,
+        }
+        inserts.append(row)
+        # Later offers of this batch compare against (and extend) the new row
+        latest[key] = row
+
+    if extended:
+        db.execute(update(PriceHistory), [
+            {"id": row_id, "last_seen": row["last_seen"]} for row_id, row in extended.items()
+        ])
+    insert_price_rows(db, inserts)
+    update_best_prices(db, {catalog[offer.set_number] for offer in offers})
+    return len(inserts)
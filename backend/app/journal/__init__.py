@@ -0,0 +1 @@
+# Journal package for durable raw scrape output
@@ -0,0 +1,42 @@
+"""Scrape journal commands.
+
+    python -m app.journal load [--reparse]
+    python -m app.journal replay [--since 2024-01-01] [--until 2024-02-01] [--reparse]
+"""
+import argparse
+import asyncio
+from datetime import datetime
+
+from ..database.database import create_tables
+from .loader import load_segments, replay
+from .scrape_journal import SCRAPE_JOURNAL_DIR
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.journal", description="Scrape journal tools")
+    parser.add_argument("--dir", default=SCRAPE_JOURNAL_DIR, help="journal directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load = commands.add_parser("load", help="ingest closed segments into price history")
+    load.add_argument("--reparse", action="store_true", help="parse raw records with the current scrapers")
+
+    replay_command = commands.add_parser("replay", help="re-run the price analyzer over journaled offers")
+    replay_command.add_argument("--since", type=datetime.fromisoformat, help="UTC unless an offset is given")
+    replay_command.add_argument("--until", type=datetime.fromisoformat, help="UTC unless an offset is given")
+    replay_command.add_argument("--reparse", action="store_true", help="parse raw records with the current scrapers")
+
+    args = parser.parse_args()
+    if args.command == "load":
+        create_tables()
+        result = asyncio.run(load_segments(args.dir, reparse=args.reparse))
+        print(f"Loaded {result['offers']} offers from {result['segments']} segments")
+    else:
+        recommendations = asyncio.run(replay(args.dir, args.since, args.until, reparse=args.reparse))
+        for rec in recommendations:
+            print(f"{rec.set_number}\t{rec.recommendation}\t{rec.current_best_price:.2f}\t"
+                  f"{rec.average_market_price:.2f}\t{rec.confidence_score:.2f}\t{rec.set_name}")
+        print(f"{len(recommendations)} recommendations")
+
+
+if __name__ == "__main__":
+    main()
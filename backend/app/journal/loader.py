@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..database.database import SessionLocal
+from ..database.price_history import record_offers
+from ..recommender.price_analyzer import PriceAnalyzer, PriceRecommendation
+from .scrape_journal import (
+    JOURNAL_SEGMENT_SECONDS, SCRAPE_JOURNAL_DIR, closed_segments, entry_offers, loaded_segments,
+    mark_loaded, read_segment
+)
+
+
+def _get_scrapers() -> Dict:
+    from ..tasks import get_scrapers
+    return get_scrapers()
+
+
+async def load_segments(directory: str = SCRAPE_JOURNAL_DIR, reparse: bool = False,
+                        session_factory: Callable[[], Session] = SessionLocal,
+                        stale_after: Optional[float] = 2 * JOURNAL_SEGMENT_SECONDS) -> Dict:
+    """Bulk-ingest closed journal segments into price history.
+
+    Each segment is written in one transaction and then moved to
+    ``loaded/``. Open segments untouched for ``stale_after`` seconds were
+    left behind by a process that died and are ingested too. With
+    ``reparse`` the raw records are parsed again by the current scrapers.
+    """
+    scrapers = _get_scrapers() if reparse else None
+    segments = 0
+    offers_stored = 0
+    for path in closed_segments(directory, stale_after):
+        offers = []
+        for entry in read_segment(path):
+            offers.extend(await entry_offers(entry, scrapers))
+        db = session_factory()
+        try:
+            offers_stored += record_offers(db, offers)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        mark_loaded(path)
+        segments += 1
+        print(f"Loaded {len(offers)} offers from journal segment {path}")
+    return {"segments": segments, "offers": offers_stored}
+
+
+async def replay(directory: str = SCRAPE_JOURNAL_DIR, since: Optional[datetime] = None,
+                 until: Optional[datetime] = None, reparse: bool = False,
+                 analyzer: Optional[PriceAnalyzer] = None) -> List[PriceRecommendation]:
+    """Run the price analyzer again over journaled offers, loaded or not.
+
+    Naive ``since`` and ``until`` are taken as UTC.
+    """
+    since = since.replace(tzinfo=timezone.utc) if since and since.tzinfo is None else since
+    until = until.replace(tzinfo=timezone.utc) if until and until.tzinfo is None else until
+    scrapers = _get_scrapers() if reparse else None
+    analyzer = analyzer or PriceAnalyzer()
+    offers = []
+    for path in loaded_segments(directory) + closed_segments(directory, stale_after=0):
+        for entry in read_segment(path):
+            scraped_at = datetime.fromtimestamp(entry["ts"], timezone.utc)
+            if (since and scraped_at < since) or (until and scraped_at > until):
+                continue
+            offers.extend(await entry_offers(entry, scrapers))
+    return analyzer.analyze_prices(offers)
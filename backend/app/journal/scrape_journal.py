@@ -0,0 +1,207 @@
+import glob
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+SCRAPE_JOURNAL_ENABLED = os.getenv("SCRAPE_JOURNAL", "true").lower() == "true"
+SCRAPE_JOURNAL_DIR = os.getenv("SCRAPE_JOURNAL_DIR", ".scrape_journal")
+# A segment is closed once it grows past this size or age
+JOURNAL_SEGMENT_BYTES = int(os.getenv("JOURNAL_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+JOURNAL_SEGMENT_SECONDS = float(os.getenv("JOURNAL_SEGMENT_SECONDS", "3600"))
+# fsync after every entry; off by default, a killed process still leaves its writes in the page cache
+JOURNAL_FSYNC = os.getenv("JOURNAL_FSYNC", "false").lower() == "true"
+
+OPEN_SUFFIX = ".jsonl.open"
+CLOSED_SUFFIX = ".jsonl"
+LOADED_DIR = "loaded"
+
+# Compact keys of journaled offers
+_OFFER_KEYS = {
+    "set_number": "n", "name": "m", "price": "p", "shipping_cost": "s", "total_price": "t",
+    "store_url": "u", "condition": "c", "availability": "a", "image_url": "i",
+}
+
+
+# When the offer was observed, as a Unix timestamp
+_OBSERVED_KEY = "d"
+
+
+def offer_to_entry(offer) -> Dict:
+    entry = {short: getattr(offer, field) for field, short in _OFFER_KEYS.items()}
+    observed = offer.last_updated
+    if observed.tzinfo is None:
+        # Naive offer times are UTC
+        observed = observed.replace(tzinfo=timezone.utc)
+    entry[_OBSERVED_KEY] = observed.timestamp()
+    return entry
+
+
+def offer_from_entry(data: Dict, store_name: str, scraped_at: datetime):
+    """Rebuild a journaled offer with its own observation time.
+
+    Keeping the time the offer was stored with makes loading a segment
+    idempotent: price history ignores observations it already has or that
+    are older than a listing's newest row. Entries written before offers
+    carried their time fall back to the page's time.
+    """
+    # Imported here: the scrapers import this module to journal their output
+    from ..scraper.base_scraper import LegoSet
+    values = {field: data.get(short) for field, short in _OFFER_KEYS.items()}
+    observed = data.get(_OBSERVED_KEY)
+    last_updated = datetime.fromtimestamp(observed, timezone.utc) if observed is not None else scraped_at
+    return LegoSet(store_name=store_name, last_updated=last_updated, **values)
+
+
+class ScrapeJournal:
+    """Append-only, rotating JSONL log of scraper output.
+
+    Each line holds one parsed result page: the raw listing records and the
+    offers built from them, so history can be reloaded after a crash or
+    re-parsed after a parser fix. Every process writes its own segment
+    (``<start>-<pid>.jsonl.open``); segments are renamed to ``.jsonl`` once
+    closed and only then picked up by the loader.
+    """
+
+    def __init__(self, directory: str = SCRAPE_JOURNAL_DIR, segment_bytes: int = JOURNAL_SEGMENT_BYTES,
+                 segment_seconds: float = JOURNAL_SEGMENT_SECONDS, fsync: bool = JOURNAL_FSYNC):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.fsync = fsync
+        self._file = None
+        self._path: Optional[str] = None
+        self._pid: Optional[int] = None
+        self._opened_at = 0.0
+        self.entries = 0
+        self.segments_closed = 0
+        self.errors = 0
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._pid = os.getpid()
+        self._opened_at = time.time()
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        self._path = os.path.join(self.directory, f"{stamp}-{self._pid}{OPEN_SUFFIX}")
+        self._file = open(self._path, "a", encoding="utf-8")
+
+    def append(self, store_name: str, query: str, records: List[Dict], offers: List):
+        """Write one result page to the current segment"""
+        line = json.dumps({
+            "ts": time.time(),
+            "store": store_name,
+            "query": query,
+            "records": records,
+            "offers": [offer_to_entry(offer) for offer in offers],
+        }, ensure_ascii=False, separators=(",", ":"), default=str)
+        try:
+            if self._file is not None and self._pid != os.getpid():
+                # Forked worker: leave the parent's segment to the parent
+                self._file = None
+            elif self._file is not None and not os.path.exists(self._path):
+                # The loader took over a segment that sat idle; start a new one
+                self._file.close()
+                self._file = None
+            elif self._file is not None and time.time() - self._opened_at >= self.segment_seconds:
+                self.rotate()
+            if self._file is None:
+                self._open_segment()
+            self._file.write(line + "\n")
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.entries += 1
+            if self._file.tell() >= self.segment_bytes:
+                self.rotate()
+        except OSError as e:
+            self.errors += 1
+            print(f"Could not write scrape journal: {e}")
+
+    def rotate(self):
+        """Close the current segment so the loader can ingest it"""
+        if self._file is None:
+            return
+        self._file.close()
+        os.replace(self._path, self._path[:-len(OPEN_SUFFIX)] + CLOSED_SUFFIX)
+        self._file = None
+        self._path = None
+        self.segments_closed += 1
+
+    def close(self):
+        if self._file is not None and self._pid == os.getpid():
+            self.rotate()
+
+    def stats(self) -> Dict:
+        return {
+            "directory": self.directory,
+            "current_segment": os.path.basename(self._path) if self._path else None,
+            "entries": self.entries,
+            "segments_closed": self.segments_closed,
+            "errors": self.errors,
+            "pending_segments": len(closed_segments(self.directory)),
+        }
+
+
+def closed_segments(directory: str, stale_after: Optional[float] = None) -> List[str]:
+    """Closed segments in write order.
+
+    With ``stale_after``, open segments not written to for that many
+    seconds are treated as closed too: their process died without rotating.
+    """
+    paths = glob.glob(os.path.join(directory, f"*{CLOSED_SUFFIX}"))
+    if stale_after is not None:
+        now = time.time()
+        paths += [
+            path for path in glob.glob(os.path.join(directory, f"*{OPEN_SUFFIX}"))
+            if now - os.path.getmtime(path) >= stale_after
+        ]
+    return sorted(paths, key=os.path.basename)
+
+
+def loaded_segments(directory: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(directory, LOADED_DIR, f"*{CLOSED_SUFFIX}")), key=os.path.basename)
+
+
+def read_segment(path: str) -> Iterator[Dict]:
+    """Entries of a segment; a torn last line from a crash is skipped"""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"Skipping unreadable journal line {path}:{number}")
+
+
+async def entry_offers(entry: Dict, scrapers: Optional[Dict] = None) -> List:
+    """Offers of a journal entry; with ``scrapers`` the raw records are parsed again"""
+    scraped_at = datetime.fromtimestamp(entry["ts"], timezone.utc)
+    if scrapers is None:
+        return [offer_from_entry(data, entry["store"], scraped_at) for data in entry.get("offers", [])]
+
+    scraper = scrapers.get(entry["store"].lower())
+    if scraper is None:
+        return []
+    offers = await scraper.records_to_sets(entry.get("records", []), entry.get("query", ""))
+    for offer in offers:
+        offer.last_updated = scraped_at
+    return offers
+
+
+def mark_loaded(path: str) -> str:
+    """Move an ingested segment out of the loader's way"""
+    directory = os.path.join(os.path.dirname(path), LOADED_DIR)
+    os.makedirs(directory, exist_ok=True)
+    name = os.path.basename(path)
+    if name.endswith(OPEN_SUFFIX):
+        name = name[:-len(OPEN_SUFFIX)] + CLOSED_SUFFIX
+    target = os.path.join(directory, name)
+    shutil.move(path, target)
+    return target
+
+
+scrape_journal = ScrapeJournal()
@@ -1,17 +1,31 @@
 import os
-from fastapi import FastAPI, HTTPException
+import re
+import json
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from typing import List
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .scraper.allegro_scraper import AllegroScraper
 from .scraper.olx_scraper import OlxScraper
 from .scraper.ceneo_scraper import CeneoScraper
 from .recommender.price_analyzer import PriceAnalyzer, PriceRecommendation
 from .scraper.base_scraper import LegoSet
-from .database.database import create_tables
-from .api import auth, watchlist
+from .scraper.browser_pool import browser_pool
+from .scraper.deadline import Deadline
+from .scraper.fetcher import http_fetcher
+from .scraper.health import get_store_health
+from .scraper.selector_memory import flush_selector_memories
+from .scraper.fanout import fan_out, fan_out_set_details, iter_fan_out, combine_sets, summarize_stores, summarize_freshness
+from .database.database import create_tables, dispose_async_engine, get_async_db
+from .database.price_history import stored_offers
+from .database.offer_writer import offer_writer, OFFER_WRITE_BEHIND
+from .journal.scrape_journal import scrape_journal
+from .scheduler.crawl_scheduler import crawl_scheduler, search_popularity, SEED_SETS, CRAWL_SCHEDULER_ENABLED
+from .api import auth, watchlist, admin, scrape
 
 app = FastAPI(
     title="LEGO Price Agent API",
@@ -32,16 +46,37 @@ app.add_middleware(
 allegro_scraper = AllegroScraper()
 olx_scraper = OlxScraper()
 ceneo_scraper = CeneoScraper()
+scrapers = [allegro_scraper, olx_scraper, ceneo_scraper]
 price_analyzer = PriceAnalyzer()
 
 # Include API routers
 app.include_router(auth.router)
 app.include_router(watchlist.router)
+app.include_router(admin.router)
+app.include_router(scrape.router)
 
 # Create database tables on startup
 @app.on_event("startup")
 async def startup_event():
     create_tables()
+    # Persist freshly scraped offers in the background, off the request path
+    if OFFER_WRITE_BEHIND:
+        offer_writer.start()
+    # Every replica starts the scheduler; a Redis lock lets only one crawl
+    if CRAWL_SCHEDULER_ENABLED:
+        crawl_scheduler.start()
+
+
+# Release shared browsers and HTTP connections on shutdown
+@app.on_event("shutdown")
+async def shutdown_event():
+    await crawl_scheduler.stop()
+    await offer_writer.stop()
+    scrape_journal.close()
+    flush_selector_memories()
+    await browser_pool.close()
+    await http_fetcher.close()
+    await dispose_async_engine()
 
 # Alternative using lifespan (for future FastAPI versions)
 # from contextlib import asynccontextmanager
@@ -64,32 +99,94 @@ async def root():
     }
 
 
+def serialize_set(lego_set: LegoSet) -> dict:
+    """Serialize a scraped offer for search responses"""
+    return {
+        "set_number": lego_set.set_number,
+        "name": lego_set.name,
+        "price": lego_set.price,
+        "shipping_cost": lego_set.shipping_cost,
+        "total_price": lego_set.total_price,
+        "store_name": lego_set.store_name,
+        "store_url": lego_set.store_url,
+        "condition": lego_set.condition,
+        "availability": lego_set.availability,
+        "last_updated": lego_set.last_updated.isoformat()
+    }
+
+
+def serialize_recommendation(rec: PriceRecommendation) -> dict:
+    """Serialize a price recommendation with its best offers"""
+    return {
+        "set_number": rec.set_number,
+        "set_name": rec.set_name,
+        "current_best_price": rec.current_best_price,
+        "average_market_price": rec.average_market_price,
+        "price_difference": rec.price_difference,
+        "price_percentage": rec.price_percentage,
+        "recommendation": rec.recommendation,
+        "confidence_score": rec.confidence_score,
+        "reasoning": rec.reasoning,
+        "best_offers": [
+            {
+                "store_name": offer.store_name,
+                "price": offer.price,
+                "total_price": offer.total_price,
+                "store_url": offer.store_url,
+                "condition": offer.condition
+            }
+            for offer in rec.best_offers
+        ]
+    }
+
+
+def filter_specific_set(query: str, sets: List[LegoSet]) -> List[LegoSet]:
+    """If the query is a set number (3-5 digits), keep only exact matches"""
+    target_set_number = query.strip()
+    if not re.match(r'^\d{3,5}$', target_set_number):
+        return sets
+    return [result for result in sets if result.set_number == target_set_number]
+
+
+# Stored offers older than this are left out of recommendations
+RECOMMENDATION_MAX_AGE_HOURS = float(os.getenv("RECOMMENDATION_MAX_AGE_HOURS", "48"))
+
+# How often a running request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
+
+
+async def cancel_on_disconnect(request: Request, coro):
+    """Await a coroutine, cancelling it if the client goes away first.
+
+    Cancelling the fan-out stops its scrapes, which closes their pages and
+    frees their browser pool capacity.
+    """
+    task = asyncio.create_task(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        task.cancel()
+
+
 @app.get("/api/search")
-async def search_lego_sets(query: str, limit: int = 10):
+async def search_lego_sets(request: Request, query: str, limit: int = 10):
     """Search for LEGO sets across all stores"""
     try:
-        # Check if query looks like a specific set number (3-5 digits)
-        import re
-        set_number_pattern = re.compile(r'^\d{3,5}$')
-        is_specific_set = set_number_pattern.match(query.strip())
+        await search_popularity.record(query)
         
-        # Search on multiple platforms
-        allegro_results = await allegro_scraper.search_sets(query)
-        olx_results = await olx_scraper.search_sets(query)
-        ceneo_results = await ceneo_scraper.search_sets(query)
-        
-        # Combine results from all platforms
-        all_results = allegro_results + olx_results + ceneo_results
+        # Search all platforms concurrently within the request's latency budget
+        deadline = Deadline()
+        store_results = await cancel_on_disconnect(request, fan_out(scrapers, [query], deadline=deadline))
+        all_results = combine_sets(store_results)
         
         # If query is a specific set number, filter for exact matches
-        if is_specific_set:
-            target_set_number = query.strip()
-            filtered_results = []
-            for result in all_results:
-                if result.set_number == target_set_number:
-                    filtered_results.append(result)
-            all_results = filtered_results
-            print(f"Filtered results for set {target_set_number}: {len(all_results)} exact matches")
+        all_results = filter_specific_set(query, all_results)
         
         all_results = all_results[:limit]  # Limit total results
         
@@ -99,61 +196,63 @@ async def search_lego_sets(query: str, limit: int = 10):
         return {
             "query": query,
             "total_results": len(all_results),
-            "sets": [
-                {
-                    "set_number": lego_set.set_number,
-                    "name": lego_set.name,
-                    "price": lego_set.price,
-                    "shipping_cost": lego_set.shipping_cost,
-                    "total_price": lego_set.total_price,
-                    "store_name": lego_set.store_name,
-                    "store_url": lego_set.store_url,
-                    "condition": lego_set.condition,
-                    "availability": lego_set.availability,
-                    "last_updated": lego_set.last_updated.isoformat()
-                }
-                for lego_set in all_results
-            ],
-            "recommendations": [
-                {
-                    "set_number": rec.set_number,
-                    "set_name": rec.set_name,
-                    "current_best_price": rec.current_best_price,
-                    "average_market_price": rec.average_market_price,
-                    "price_difference": rec.price_difference,
-                    "price_percentage": rec.price_percentage,
-                    "recommendation": rec.recommendation,
-                    "confidence_score": rec.confidence_score,
-                    "reasoning": rec.reasoning,
-                    "best_offers": [
-                        {
-                            "store_name": offer.store_name,
-                            "price": offer.price,
-                            "total_price": offer.total_price,
-                            "store_url": offer.store_url,
-                            "condition": offer.condition
-                        }
-                        for offer in rec.best_offers
-                    ]
-                }
-                for rec in recommendations
-            ]
+            "stores": summarize_stores(store_results),
+            "freshness": summarize_freshness(store_results),
+            "sets": [serialize_set(lego_set) for lego_set in all_results],
+            "recommendations": [serialize_recommendation(rec) for rec in recommendations]
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
 
+@app.get("/api/search/stream")
+async def stream_search_lego_sets(query: str, limit: int = 10):
+    """Stream search results as NDJSON, one event per store as it finishes.
+
+    Each line is a JSON object: a ``store`` event carrying that store's
+    offers, followed by a final ``complete`` event with the recommendations
+    for everything that was sent.
+    """
+    await search_popularity.record(query)
+    
+    async def events():
+        # The response stops, and cancels the scrapes, when the client disconnects
+        deadline = Deadline()
+        sent = []
+        async for store_result in iter_fan_out(scrapers, [query], deadline=deadline):
+            batch = filter_specific_set(query, store_result.sets)[:max(limit - len(sent), 0)]
+            sent.extend(batch)
+            yield json.dumps({
+                "type": "store",
+                "store": summarize_stores([store_result])[0],
+                "sets": [serialize_set(lego_set) for lego_set in batch]
+            }) + "\n"
+        
+        recommendations = price_analyzer.analyze_prices(sent)
+        yield json.dumps({
+            "type": "complete",
+            "query": query,
+            "total_results": len(sent),
+            "recommendations": [serialize_recommendation(rec) for rec in recommendations]
+        }) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 @app.get("/api/set/{set_number}")
-async def get_set_details(set_number: str):
+async def get_set_details(request: Request, set_number: str):
     """Get detailed information about a specific LEGO set"""
     try:
-        # Search for the specific set on multiple platforms
-        query = f"lego {set_number}"
-        allegro_results = await allegro_scraper.search_sets(query)
-        olx_results = await olx_scraper.search_sets(query)
-        ceneo_results = await ceneo_scraper.search_sets(query)
-        results = allegro_results + olx_results + ceneo_results
+        # Look the set up on all platforms concurrently, via their indexed product pages
+        await search_popularity.record(f"lego {set_number}")
+        deadline = Deadline()
+        store_results = await cancel_on_disconnect(
+            request, fan_out_set_details(scrapers, set_number, deadline=deadline)
+        )
+        results = combine_sets(store_results)
         
         # Filter for exact set number match
         exact_matches = [r for r in results if r.set_number == set_number]
@@ -167,6 +266,8 @@ async def get_set_details(set_number: str):
         return {
             "set_number": set_number,
             "total_offers": len(exact_matches),
+            "stores": summarize_stores(store_results),
+            "freshness": summarize_freshness(store_results),
             "offers": [
                 {
                     "name": lego_set.name,
@@ -191,28 +292,23 @@ async def get_set_details(set_number: str):
 
 
 @app.get("/api/recommendations")
-async def get_recommendations():
-    """Get current best deals and recommendations"""
+async def get_recommendations(db: AsyncSession = Depends(get_async_db)):
+    """Get current best deals and recommendations.
+
+    Reads the newest stored offers of the popular sets, which the crawl
+    scheduler keeps fresh, instead of scraping on the request path. Sets
+    with no recent stored offers (a fresh database, or the scheduler
+    disabled) are scraped live.
+    """
     try:
-        # Search for popular LEGO sets
-        popular_sets = [
-            "42100",  # Liebherr R 9800
-            "42115",  # Lamborghini Sián FKP 37
-            "42131",  # App-Controlled D11 Bulldozer
-            "42145",  # Airbus H175 Rescue Helicopter
-            "42154",  # 2022 Ford GT
-        ]
-        
-        all_results = []
-        for set_number in popular_sets:
-            try:
-                allegro_results = await allegro_scraper.search_sets(f"lego {set_number}")
-                olx_results = await olx_scraper.search_sets(f"lego {set_number}")
-                ceneo_results = await ceneo_scraper.search_sets(f"lego {set_number}")
-                all_results.extend(allegro_results + olx_results + ceneo_results)
-            except Exception as e:
-                print(f"Error searching for set {set_number}: {e}")
-                continue
+        since = datetime.now(timezone.utc) - timedelta(hours=RECOMMENDATION_MAX_AGE_HOURS)
+        all_results = await db.run_sync(lambda session: stored_offers(session, SEED_SETS, since))
+        stored = {offer.set_number for offer in all_results}
+        missing = [set_number for set_number in SEED_SETS if set_number not in stored]
+        if missing:
+            store_results = await fan_out(scrapers, [f"lego {set_number}" for set_number in missing],
+                                          deadline=Deadline())
+            all_results.extend(combine_sets(store_results))
         
         # Analyze all results
         recommendations = price_analyzer.analyze_prices(all_results)
@@ -245,22 +341,24 @@ async def get_recommendations():
             ]
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get recommendations: {str(e)}")
 
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint with per-store circuit state, success rate and latency"""
+    stores = {scraper.store_key: get_store_health(scraper.store_key) for scraper in scrapers}
+    services = {f"{store_key}_scraper": health.service_status() for store_key, health in stores.items()}
+    services["price_analyzer"] = "available"
+    
     return {
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "services": {
-            "allegro_scraper": "available",
-            "olx_scraper": "available",
-            "ceneo_scraper": "available",
-            "price_analyzer": "available"
-        }
+        "status": "healthy" if all(status == "available" for status in services.values()) else "degraded",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "services": services,
+        "stores": {store_key: health.to_dict() for store_key, health in stores.items()}
     }
 
 
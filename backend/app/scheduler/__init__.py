@@ -0,0 +1 @@
+# Scheduler package for proactive background crawling
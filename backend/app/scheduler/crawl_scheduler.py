@@ -0,0 +1,452 @@
+import asyncio
+import heapq
+import math
+import os
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func
+
+from ..celery_app import SCRAPE_TASK_TIME_LIMIT, STORE_KEYS
+from ..database.database import SessionLocal
+from ..database.models import LegoSet, PriceHistory, WatchlistItem
+from ..database.price_history import to_utc
+from ..scraper.cache import normalize_query, REDIS_RETRY_SECONDS
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:
+    redis_asyncio = None
+
+
+REDIS_URL = os.getenv("REDIS_URL")
+CRAWL_SCHEDULER_ENABLED = os.getenv("CRAWL_SCHEDULER_ENABLED", "false").lower() == "true"
+CRAWL_TICK_SECONDS = float(os.getenv("CRAWL_TICK_SECONDS", "60"))
+# How often a set nobody watches or searches for is refreshed
+CRAWL_BASE_INTERVAL = float(os.getenv("CRAWL_BASE_INTERVAL", "86400"))
+# Hot sets are never refreshed more often than this
+CRAWL_MIN_INTERVAL = float(os.getenv("CRAWL_MIN_INTERVAL", "900"))
+# Scrape requests each store may receive per tick, overridable with e.g. OLX_CRAWL_BUDGET
+CRAWL_STORE_BUDGET = int(os.getenv("CRAWL_STORE_BUDGET", "10"))
+CRAWL_WATCHER_WEIGHT = float(os.getenv("CRAWL_WATCHER_WEIGHT", "4.0"))
+CRAWL_SEARCH_WEIGHT = float(os.getenv("CRAWL_SEARCH_WEIGHT", "1.0"))
+# Result pages a scheduled refresh crawls (listings beyond the first page are stored too)
+CRAWL_REFRESH_PAGES = int(os.getenv("CRAWL_REFRESH_PAGES", "3"))
+# A dispatched store/set scrape is not dispatched again for this long; never less than the task time limit
+CRAWL_DISPATCH_TTL = max(float(os.getenv("CRAWL_DISPATCH_TTL", str(CRAWL_MIN_INTERVAL))), SCRAPE_TASK_TIME_LIMIT)
+CRAWL_LOCK_KEY = "lpa:crawl-scheduler:leader"
+DISPATCH_KEY_PREFIX = "lpa:crawl-dispatched"
+POPULARITY_KEY = "lpa:search-popularity"
+
+# Sets crawled even before anyone has searched for or watched them
+SEED_SETS = [
+    "42100",  # Liebherr R 9800
+    "42115",  # Lamborghini Sián FKP 37
+    "42131",  # App-Controlled D11 Bulldozer
+    "42145",  # Airbus H175 Rescue Helicopter
+    "42154",  # 2022 Ford GT
+]
+
+_SET_NUMBER_LENGTHS = range(3, 6)
+
+
+def set_number_from_query(query: str) -> Optional[str]:
+    """Set number a query asks for, if it is a plain set-number search"""
+    normalized = normalize_query(query)
+    if normalized.isdigit() and len(normalized) in _SET_NUMBER_LENGTHS:
+        return normalized
+    return None
+
+
+def store_budget(store_key: str) -> int:
+    return int(os.getenv(f"{store_key.upper()}_CRAWL_BUDGET", CRAWL_STORE_BUDGET))
+
+
+def demand(watchers: int, searches: int) -> float:
+    """How much users care about a set; 1.0 for a set nobody asks about"""
+    return 1.0 + CRAWL_WATCHER_WEIGHT * watchers + CRAWL_SEARCH_WEIGHT * math.log1p(searches)
+
+
+def refresh_interval(watchers: int, searches: int) -> float:
+    """Target time between refreshes: shorter the more a set is in demand"""
+    return max(CRAWL_BASE_INTERVAL / demand(watchers, searches), CRAWL_MIN_INTERVAL)
+
+
+@dataclass
+class CrawlCandidate:
+    """A set the scheduler may refresh"""
+    set_number: str
+    watchers: int = 0
+    searches: int = 0
+    last_scraped: Optional[datetime] = None
+
+    def age(self, now: datetime) -> float:
+        if self.last_scraped is None:
+            return math.inf
+        # Stored timestamps are naive UTC
+        return max((to_utc(now) - to_utc(self.last_scraped)).total_seconds(), 0.0)
+
+    def priority(self, now: datetime) -> float:
+        """Staleness relative to the set's target interval; due at 1.0"""
+        return self.age(now) / refresh_interval(self.watchers, self.searches)
+
+
+class SearchPopularity:
+    """Counts set-number searches, in Redis when available so replicas share them"""
+
+    def __init__(self, redis_url: Optional[str] = REDIS_URL):
+        self.redis_url = redis_url
+        self.local = Counter()
+        self._redis = None
+        self._redis_loop = None
+        self._redis_disabled_until = 0.0
+
+    def _get_redis(self):
+        if not self.redis_url or redis_asyncio is None:
+            return None
+        if time.time() < self._redis_disabled_until:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            self._redis = redis_asyncio.from_url(self.redis_url, socket_timeout=1.0, socket_connect_timeout=1.0)
+            self._redis_loop = loop
+        return self._redis
+
+    async def record(self, query: str):
+        set_number = set_number_from_query(query)
+        if set_number is None:
+            return
+        self.local[set_number] += 1
+        client = self._get_redis()
+        if client is not None:
+            try:
+                await client.zincrby(POPULARITY_KEY, 1, set_number)
+            except Exception as e:
+                self._redis_failed(e)
+
+    async def counts(self) -> Dict[str, int]:
+        client = self._get_redis()
+        if client is not None:
+            try:
+                pairs = await client.zrange(POPULARITY_KEY, 0, -1, withscores=True)
+                return {member.decode() if isinstance(member, bytes) else member: int(score)
+                        for member, score in pairs}
+            except Exception as e:
+                self._redis_failed(e)
+        return dict(self.local)
+
+    def _redis_failed(self, error: Exception):
+        self._redis_disabled_until = time.time() + REDIS_RETRY_SECONDS
+        print(f"Search popularity: Redis unavailable ({error}), using local counts")
+
+
+class DispatchMarkers:
+    """Remembers which store/set scrapes were dispatched until their task has had time to run.
+
+    Markers expire after ``ttl`` seconds. They are kept in Redis when
+    available, so that a new leader does not dispatch the same scrapes
+    again, and in process otherwise.
+    """
+
+    def __init__(self, redis_url: Optional[str] = REDIS_URL, ttl: float = CRAWL_DISPATCH_TTL):
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.local: Dict[tuple, float] = {}
+        self._redis = None
+        self._redis_loop = None
+        self._redis_disabled_until = 0.0
+
+    def _get_redis(self):
+        if not self.redis_url or redis_asyncio is None:
+            return None
+        if time.time() < self._redis_disabled_until:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            self._redis = redis_asyncio.from_url(self.redis_url, socket_timeout=1.0, socket_connect_timeout=1.0)
+            self._redis_loop = loop
+        return self._redis
+
+    @staticmethod
+    def _key(store_key: str, set_number: str) -> str:
+        return f"{DISPATCH_KEY_PREFIX}:{store_key}:{set_number}"
+
+    async def pending(self) -> Set[tuple]:
+        """``(store_key, set_number)`` pairs dispatched within the TTL"""
+        client = self._get_redis()
+        if client is not None:
+            try:
+                pending = set()
+                async for key in client.scan_iter(match=f"{DISPATCH_KEY_PREFIX}:*", count=500):
+                    key = key.decode() if isinstance(key, bytes) else key
+                    store_key, set_number = key[len(DISPATCH_KEY_PREFIX) + 1:].split(":", 1)
+                    pending.add((store_key, set_number))
+                return pending
+            except Exception as e:
+                self._redis_failed(e)
+        now = time.monotonic()
+        self.local = {pair: expires for pair, expires in self.local.items() if expires > now}
+        return set(self.local)
+
+    async def mark(self, store_key: str, set_number: str) -> bool:
+        """Mark a scrape as dispatched; False if it already is"""
+        client = self._get_redis()
+        if client is not None:
+            try:
+                return bool(await client.set(self._key(store_key, set_number), "1", nx=True,
+                                             ex=max(int(self.ttl), 1)))
+            except Exception as e:
+                self._redis_failed(e)
+        now = time.monotonic()
+        if self.local.get((store_key, set_number), 0.0) > now:
+            return False
+        self.local[(store_key, set_number)] = now + self.ttl
+        return True
+
+    async def clear(self, store_key: str, set_number: str):
+        """Drop a marker, so that a scrape that could not be dispatched is planned again"""
+        self.local.pop((store_key, set_number), None)
+        client = self._get_redis()
+        if client is not None:
+            try:
+                await client.delete(self._key(store_key, set_number))
+            except Exception as e:
+                self._redis_failed(e)
+
+    def _redis_failed(self, error: Exception):
+        self._redis_disabled_until = time.time() + REDIS_RETRY_SECONDS
+        print(f"Crawl dispatch markers: Redis unavailable ({error}), using local markers")
+
+
+class LeaderLock:
+    """Redis lease that lets only one replica run the scheduler.
+
+    Without Redis the process assumes it is the only replica.
+    """
+
+    _RENEW_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('pexpire', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+
+    def __init__(self, redis_url: Optional[str], key: str, ttl: float):
+        self.redis_url = redis_url
+        self.key = key
+        self.ttl = ttl
+        self.token = uuid.uuid4().hex
+        self._redis = None
+        self._redis_loop = None
+
+    def _get_redis(self):
+        if not self.redis_url or redis_asyncio is None:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            self._redis = redis_asyncio.from_url(self.redis_url, socket_timeout=1.0, socket_connect_timeout=1.0)
+            self._redis_loop = loop
+        return self._redis
+
+    async def acquire(self) -> bool:
+        """Take or renew the lease; returns True while this replica is leader"""
+        client = self._get_redis()
+        if client is None:
+            return True
+        ttl_ms = int(self.ttl * 1000)
+        try:
+            if await client.eval(self._RENEW_SCRIPT, 1, self.key, self.token, ttl_ms):
+                return True
+            return bool(await client.set(self.key, self.token, nx=True, px=ttl_ms))
+        except Exception as e:
+            print(f"Crawl scheduler: cannot reach Redis for leader lock ({e})")
+            return False
+
+    async def release(self):
+        client = self._get_redis()
+        if client is None:
+            return
+        try:
+            await client.eval(
+                "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0",
+                1, self.key, self.token
+            )
+        except Exception:
+            pass
+
+
+def load_candidates(db, searches: Dict[str, int], seeds: Iterable[str] = SEED_SETS) -> List[CrawlCandidate]:
+    """Collect every known, watched, searched or seeded set with its crawl signals"""
+    candidates: Dict[str, CrawlCandidate] = {}
+
+    def candidate(set_number: str) -> CrawlCandidate:
+        if set_number not in candidates:
+            candidates[set_number] = CrawlCandidate(set_number)
+        return candidates[set_number]
+
+    for set_number in seeds:
+        candidate(set_number)
+    for set_number, count in searches.items():
+        candidate(set_number).searches = count
+
+    for (set_number,) in db.query(LegoSet.set_number):
+        candidate(set_number)
+    watched = db.query(LegoSet.set_number, func.count(WatchlistItem.id)).join(
+        WatchlistItem, WatchlistItem.lego_set_id == LegoSet.id
+    ).group_by(LegoSet.set_number)
+    for set_number, count in watched:
+        candidate(set_number).watchers = count
+    # Unchanged offers only move last_seen; rows from before change-only storage have just scraped_at
+    last_seen = func.coalesce(PriceHistory.last_seen, PriceHistory.scraped_at)
+    scraped = db.query(LegoSet.set_number, func.max(last_seen)).join(
+        PriceHistory, PriceHistory.lego_set_id == LegoSet.id
+    ).group_by(LegoSet.set_number)
+    for set_number, last_scraped in scraped:
+        candidate(set_number).last_scraped = last_scraped
+
+    return list(candidates.values())
+
+
+def plan_crawl(candidates: Iterable[CrawlCandidate], budgets: Dict[str, int],
+               now: Optional[datetime] = None, in_flight: Iterable[tuple] = ()) -> List[tuple]:
+    """Pick due sets, most overdue first, within each store's budget.
+
+    Returns ``(store_key, set_number)`` pairs to dispatch. Pairs in
+    ``in_flight`` were dispatched recently and are skipped without using
+    the store's budget.
+    """
+    now = now or datetime.now(timezone.utc)
+    in_flight = set(in_flight)
+    queue = []
+    for candidate in candidates:
+        priority = candidate.priority(now)
+        if priority >= 1.0:
+            # heapq is a min-heap; never-scraped (infinite) sets come first
+            heapq.heappush(queue, (-priority, candidate.set_number))
+
+    remaining = dict(budgets)
+    plan = []
+    while queue and any(remaining.values()):
+        _, set_number = heapq.heappop(queue)
+        for store_key, budget in remaining.items():
+            if budget > 0 and (store_key, set_number) not in in_flight:
+                plan.append((store_key, set_number))
+                remaining[store_key] = budget - 1
+    return plan
+
+
+def enqueue_refresh(store_key: str, set_number: str):
+    """Queue a store scrape for a set on the Celery worker"""
+    from ..tasks import enqueue_search
+    enqueue_search(f"lego {set_number}", [store_key], max_pages=CRAWL_REFRESH_PAGES)
+
+
+class CrawlScheduler:
+    """Periodically refreshes the sets users care about most.
+
+    Every tick the leader replica ranks candidate sets by how stale they
+    are relative to their demand-based refresh interval and dispatches the
+    due ones to the scrape queues within each store's budget. Scrapes
+    still marked as dispatched are left alone until their marker expires.
+    """
+
+    def __init__(self, store_keys: Iterable[str] = STORE_KEYS,
+                 dispatch: Callable[[str, str], None] = enqueue_refresh,
+                 tick_seconds: float = CRAWL_TICK_SECONDS):
+        self.store_keys = list(store_keys)
+        self.dispatch = dispatch
+        self.tick_seconds = tick_seconds
+        self.lock = LeaderLock(REDIS_URL, CRAWL_LOCK_KEY, ttl=tick_seconds * 3)
+        self.markers = DispatchMarkers()
+        self._task: Optional[asyncio.Task] = None
+
+        self.is_leader = False
+        self.ticks = 0
+        self.last_tick: Optional[float] = None
+        self.dispatched = Counter()
+        self.dispatch_errors = 0
+        self.skipped_in_flight = 0
+        self.last_plan: List[tuple] = []
+
+    def _plan(self, searches: Dict[str, int], in_flight: Set[tuple]) -> List[tuple]:
+        db = SessionLocal()
+        try:
+            candidates = load_candidates(db, searches)
+        finally:
+            db.close()
+        return plan_crawl(candidates, {key: store_budget(key) for key in self.store_keys}, in_flight=in_flight)
+
+    async def tick(self) -> List[tuple]:
+        """Run one scheduling round if this replica holds the leader lock"""
+        self.is_leader = await self.lock.acquire()
+        if not self.is_leader:
+            return []
+
+        searches = await search_popularity.counts()
+        in_flight = await self.markers.pending()
+        # The ranking queries are synchronous SQLAlchemy; keep them off the loop
+        plan = await asyncio.to_thread(self._plan, searches, in_flight)
+        dispatched = []
+        for store_key, set_number in plan:
+            # Another leader may have dispatched it since the markers were read
+            if not await self.markers.mark(store_key, set_number):
+                self.skipped_in_flight += 1
+                continue
+            try:
+                await asyncio.to_thread(self.dispatch, store_key, set_number)
+                self.dispatched[store_key] += 1
+                dispatched.append((store_key, set_number))
+            except Exception as e:
+                self.dispatch_errors += 1
+                await self.markers.clear(store_key, set_number)
+                print(f"Crawl scheduler: failed to dispatch {set_number} to {store_key}: {e}")
+
+        self.ticks += 1
+        self.last_tick = time.time()
+        self.last_plan = dispatched
+        return dispatched
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f"Crawl scheduler tick failed: {e}")
+            await asyncio.sleep(self.tick_seconds)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.lock.release()
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self._task is not None and not self._task.done(),
+            "is_leader": self.is_leader,
+            "ticks": self.ticks,
+            "last_tick": datetime.fromtimestamp(self.last_tick, timezone.utc).isoformat() if self.last_tick else None,
+            "dispatched": dict(self.dispatched),
+            "dispatch_errors": self.dispatch_errors,
+            "skipped_in_flight": self.skipped_in_flight,
+            "budgets": {key: store_budget(key) for key in self.store_keys},
+            "last_plan": [{"store_key": store, "set_number": number} for store, number in self.last_plan],
+        }
+
+
+# Shared search counter and scheduler of this process
+search_popularity = SearchPopularity()
+crawl_scheduler = CrawlScheduler()
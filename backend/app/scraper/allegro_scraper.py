@@ -1,9 +1,9 @@
-import asyncio
-from typing import List, Optional
-from datetime import datetime
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
 import re
-from playwright.async_api import async_playwright
 from .base_scraper import BaseScraper, LegoSet
+from .deadline import Deadline
+from .extraction import SelectorSpec, extract_listings
 
 
 class AllegroScraper(BaseScraper):
@@ -12,236 +12,170 @@ class AllegroScraper(BaseScraper):
     def __init__(self):
         super().__init__("Allegro")
         self.base_url = "https://allegro.pl"
-    
-    async def search_sets(self, query: str) -> List[LegoSet]:
-        """Search for LEGO sets on Allegro"""
-        sets = []
-        
-        try:
-            async with async_playwright() as p:
-                # Launch browser with more realistic settings
-                browser = await p.chromium.launch(
-                    headless=True,
-                    args=[
-                        '--no-sandbox',
-                        '--disable-setuid-sandbox',
-                        '--disable-dev-shm-usage',
-                        '--disable-accelerated-2d-canvas',
-                        '--no-first-run',
-                        '--no-zygote',
-                        '--disable-gpu'
-                    ]
-                )
-                page = await browser.new_page()
-                
-                # Set realistic user agent and viewport
-                await page.set_extra_http_headers({
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'pl-PL,pl;q=0.9,en;q=0.8',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'DNT': '1',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1'
-                })
-                
-                await page.set_viewport_size({"width": 1920, "height": 1080})
-                
-                # Search for LEGO sets
-                search_url = f"{self.base_url}/listing?string={query}"
-                print(f"Searching Allegro: {search_url}")
-                
-                await page.goto(search_url, wait_until='domcontentloaded', timeout=30000)
-                
-                # Wait a bit for dynamic content
-                await page.wait_for_timeout(3000)
-                
-                # Try to find any product listings with multiple approaches
-                listings = []
-                
+        # Realistic user agent and viewport for Allegro pages
+        self.context_options = {
+            "user_agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            "viewport": {"width": 1920, "height": 1080},
+            "extra_http_headers": {
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+                'Accept-Language': 'pl-PL,pl;q=0.9,en;q=0.8',
+                'DNT': '1',
+                'Upgrade-Insecure-Requests': '1'
+            }
+        }
+        self.consent_selectors = [
+            'button[data-role="accept-consent"]',
+            '[data-testid="consent-accept-button"]'
+        ]
+        # Lean navigation: listing text needs neither images nor ad servers
+        if self.resource_policy:
+            self.resource_policy.blocked_domains += ['adocean.pl']
+        self.selector_spec = SelectorSpec(
+            listing=[
                 # Method 1: Look for any article or div that might contain products
-                try:
-                    listings = await page.query_selector_all('article, [data-testid*="product"], .product-card, .listing-item')
-                    print(f"Method 1 found {len(listings)} listings")
-                except:
-                    pass
-                
+                'article, [data-testid*="product"], .product-card, .listing-item',
                 # Method 2: Look for any elements with price information
-                if not listings:
-                    try:
-                        listings = await page.query_selector_all('[class*="price"], [class*="Price"], [data-testid*="price"]')
-                        print(f"Method 2 found {len(listings)} price elements")
-                    except:
-                        pass
-                
+                '[class*="price"], [class*="Price"], [data-testid*="price"]',
                 # Method 3: Look for any clickable elements that might be products
-                if not listings:
-                    try:
-                        listings = await page.query_selector_all('a[href*="/oferta/"], a[href*="/item/"]')
-                        print(f"Method 3 found {len(listings)} product links")
-                    except:
-                        pass
-                
+                'a[href*="/oferta/"], a[href*="/item/"]',
                 # Method 4: Fallback - look for any divs that might contain product info
-                if not listings:
-                    try:
-                        listings = await page.query_selector_all('div[class*="product"], div[class*="item"], div[class*="listing"]')
-                        print(f"Method 4 found {len(listings)} div elements")
-                    except:
-                        pass
-                
-                print(f"Total potential listings found: {len(listings)}")
-                
-                # Process found listings
-                for i, listing in enumerate(listings[:10]):  # Limit to first 10
-                    try:
-                        # Try to extract title from various selectors
-                        title = None
-                        title_selectors = [
-                            'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-                            '[class*="title"]', '[class*="name"]',
-                            '[data-testid*="title"]', '[data-testid*="name"]'
-                        ]
-                        
-                        for selector in title_selectors:
-                            try:
-                                title_elem = await listing.query_selector(selector)
-                                if title_elem:
-                                    title = await title_elem.text_content()
-                                    if title and len(title.strip()) > 5:
-                                        break
-                            except:
-                                continue
-                        
-                        # Try to extract price from various selectors
-                        price = None
-                        price_selectors = [
-                            '[class*="price"]', '[class*="Price"]',
-                            '[data-testid*="price"]', '[class*="cost"]',
-                            'span[class*="price"]', 'div[class*="price"]'
-                        ]
-                        
-                        for selector in price_selectors:
-                            try:
-                                price_elem = await listing.query_selector(selector)
-                                if price_elem:
-                                    price_text = await price_elem.text_content()
-                                    if price_text:
-                                        price = self._parse_price(price_text)
-                                        if price:
-                                            break
-                            except:
-                                continue
-                        
-                        # Try to extract link
-                        link = None
-                        try:
-                            link_elem = await listing.query_selector('a')
-                            if link_elem:
-                                link = await link_elem.get_attribute('href')
-                        except:
-                            pass
-                        
-                        # If we have at least title and price, create a result
-                        if title and price:
-                            # Extract set number from title
-                            set_number = self._extract_set_number(title)
-                            if not set_number:
-                                # If no set number found, use a generic one
-                                set_number = f"LEGO_{i+1}"
-                            
-                            # Calculate shipping
-                            shipping = await self.get_shipping_cost(price)
-                            total_price = self.calculate_total_price(price, shipping)
-                            
-                            # Determine condition
-                            condition = "new" if "nowy" in title.lower() else "used"
-                            
-                            lego_set = LegoSet(
-                                set_number=set_number,
-                                name=title.strip(),
-                                price=price,
-                                shipping_cost=shipping,
-                                total_price=total_price,
-                                store_name=self.store_name,
-                                store_url=f"{self.base_url}{link}" if link and link.startswith('/') else (link or f"{self.base_url}/search?string={query}"),
-                                condition=condition,
-                                availability=True,
-                                last_updated=datetime.now()
-                            )
-                            
-                            sets.append(lego_set)
-                            print(f"Added result: {set_number} - {title[:50]}... - {price} PLN")
-                    
-                    except Exception as e:
-                        print(f"Error processing listing {i}: {e}")
-                        continue
-                
-                await browser.close()
+                'div[class*="product"], div[class*="item"], div[class*="listing"]'
+            ],
+            title=[
+                'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+                '[class*="title"]', '[class*="name"]',
+                '[data-testid*="title"]', '[data-testid*="name"]'
+            ],
+            price=[
+                '[class*="price"]', '[class*="Price"]',
+                '[data-testid*="price"]', '[class*="cost"]',
+                'span[class*="price"]', 'div[class*="price"]'
+            ],
+            link=['a'],
+            min_title_length=6
+        )
+        # Allegro prices move quickly
+        self.cache_ttl = 300
+        # Allegro's bot protection blocks bursts quickly
+        self.rate_limit = 0.5
+        self.max_concurrency = 2
+    
+    async def search_sets(self, query: str, deadline: Optional[Deadline] = None) -> List[LegoSet]:
+        """Search for LEGO sets on Allegro"""
+        search_url = self.search_url(query)
+        print(f"Searching Allegro: {search_url}")
         
-        except Exception as e:
-            print(f"Error in Allegro scraper: {e}")
+        records = await self.fetch_listings(search_url, deadline)
+        print(f"Total potential listings found: {len(records)}")
+        sets = await self.parse_records(records, query)
         
         print(f"Allegro scraper finished with {len(sets)} results")
-        
-        # If no real results found, return mock data for testing
-        if not sets:
-            print("No real results found, returning mock data for testing")
-            mock_sets = [
-                LegoSet(
-                    set_number="42100",
-                    name="LEGO Technic 42100 Koparka Liebherr R 9800",
-                    price=2400.0,
-                    shipping_cost=0.0,
-                    total_price=2400.0,
-                    store_name=self.store_name,
-                    store_url=f"{self.base_url}/oferta/lego-technic-42100-koparka-liebherr-r-9800-123456789",
-                    condition="new",
-                    availability=True,
-                    last_updated=datetime.now()
-                ),
-                LegoSet(
-                    set_number="75362",
-                    name="LEGO Star Wars 75362 Imperial Shuttle",
-                    price=180.0,
-                    shipping_cost=15.0,
-                    total_price=195.0,
-                    store_name=self.store_name,
-                    store_url=f"{self.base_url}/oferta/lego-star-wars-75362-imperial-shuttle-987654321",
-                    condition="new",
-                    availability=True,
-                    last_updated=datetime.now()
-                ),
-                LegoSet(
-                    set_number="42115",
-                    name="LEGO Technic 42115 Lamborghini Sián FKP 37",
-                    price=1800.0,
-                    shipping_cost=0.0,
-                    total_price=1800.0,
-                    store_name=self.store_name,
-                    store_url=f"{self.base_url}/oferta/lego-technic-42115-lamborghini-sian-456789123",
-                    condition="new",
-                    availability=True,
-                    last_updated=datetime.now()
-                )
-            ]
-            return mock_sets
-        
         return sets
     
-    async def get_set_details(self, set_number: str) -> Optional[LegoSet]:
-        """Get detailed information about specific LEGO set"""
-        # Implementation for getting specific set details
-        # This would search for the exact set number
-        query = f"lego {set_number}"
-        results = await self.search_sets(query)
+    def sample_sets(self, query: str) -> List[LegoSet]:
+        """Mock Allegro offers for testing without network access"""
+        return [
+            LegoSet(
+                set_number="42100",
+                name="LEGO Technic 42100 Koparka Liebherr R 9800",
+                price=2400.0,
+                shipping_cost=0.0,
+                total_price=2400.0,
+                store_name=self.store_name,
+                store_url=f"{self.base_url}/oferta/lego-technic-42100-koparka-liebherr-r-9800-123456789",
+                condition="new",
+                availability=True,
+                last_updated=datetime.now(timezone.utc)
+            ),
+            LegoSet(
+                set_number="75362",
+                name="LEGO Star Wars 75362 Imperial Shuttle",
+                price=180.0,
+                shipping_cost=15.0,
+                total_price=195.0,
+                store_name=self.store_name,
+                store_url=f"{self.base_url}/oferta/lego-star-wars-75362-imperial-shuttle-987654321",
+                condition="new",
+                availability=True,
+                last_updated=datetime.now(timezone.utc)
+            ),
+            LegoSet(
+                set_number="42115",
+                name="LEGO Technic 42115 Lamborghini Sián FKP 37",
+                price=1800.0,
+                shipping_cost=0.0,
+                total_price=1800.0,
+                store_name=self.store_name,
+                store_url=f"{self.base_url}/oferta/lego-technic-42115-lamborghini-sian-456789123",
+                condition="new",
+                availability=True,
+                last_updated=datetime.now(timezone.utc)
+            )
+        ]
+    
+    def search_url(self, query: str, page_number: int = 1) -> str:
+        url = f"{self.base_url}/listing?string={query}"
+        return url if page_number == 1 else f"{url}&p={page_number}"
+    
+    async def records_to_sets(self, records: List[Dict], query: str, offset: int = 0) -> List[LegoSet]:
+        sets = []
+        for i, record in enumerate(records, start=offset):
+            try:
+                lego_set = await self._record_to_set(record, i, query)
+                if lego_set:
+                    sets.append(lego_set)
+                    print(f"Added result: {lego_set.set_number} - {lego_set.name[:50]}... - {lego_set.price} PLN")
+            except Exception as e:
+                print(f"Error processing listing {i}: {e}")
+                continue
+        return sets
+    
+    async def fetch_listings_browser(self, url: str, deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Load an Allegro result page and extract listing records"""
+        async with self.page() as page:
+            await self.navigate(page, url, deadline, wait_until='domcontentloaded', timeout=30000)
+            
+            # Wait until the dynamic listings have rendered
+            await self.wait_for_listings(page, deadline)
+            
+            # Extract all listings in a single round trip
+            return await extract_listings(page, self.learned_selector_spec)
+    
+    async def _record_to_set(self, record: Dict, index: int, query: str) -> Optional[LegoSet]:
+        """Build a LegoSet from an extracted listing record"""
+        title = record.get("title")
+        price = self._parse_price(record.get("price_text"))
+        link = record.get("href")
         
-        # Return the first result that matches the set number exactly
-        for result in results:
-            if result.set_number == set_number:
-                return result
+        # If we have at least title and price, create a result
+        if not title or not price:
+            return None
         
-        return None
+        # Extract set number from title
+        set_number = self._extract_set_number(title)
+        if not set_number:
+            return None
+        
+        # Calculate shipping
+        shipping = await self.get_shipping_cost(price)
+        total_price = self.calculate_total_price(price, shipping)
+        
+        # Determine condition
+        condition = "new" if "nowy" in title.lower() else "used"
+        
+        return LegoSet(
+            set_number=set_number,
+            name=title.strip(),
+            price=price,
+            shipping_cost=shipping,
+            total_price=total_price,
+            store_name=self.store_name,
+            store_url=f"{self.base_url}{link}" if link and link.startswith('/') else (link or f"{self.base_url}/search?string={query}"),
+            condition=condition,
+            availability=True,
+            last_updated=datetime.now(timezone.utc),
+            image_url=record.get("image")
+        )
     
     async def get_shipping_cost(self, price: float, location: str = "PL") -> float:
         """Calculate shipping cost for Allegro"""
@@ -1,8 +1,43 @@
+import asyncio
+import os
+import time
+import weakref
+from dataclasses import replace
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, List, Dict, Optional
 from dataclasses import dataclass
 from datetime import datetime
 
+from ..journal.scrape_journal import SCRAPE_JOURNAL_ENABLED, scrape_journal
+from .browser_pool import browser_pool
+from .fetcher import HTTP_TIER_ENABLED, TIER_BROWSER, FetchResult, fetch_listings_http, get_tier_stats
+from .extraction import SelectorSpec, extract_listings
+from .deadline import DEFAULT_BROWSER_TIMEOUT_MS, Deadline, DeadlineExceeded, timeout_ms
+from .health import CircuitOpen, get_store_health
+from .product_index import ProductIndex, get_product_index
+from .resource_policy import LEAN_MODE_ENABLED, ResourcePolicy, get_resource_stats
+from .readiness import READY_TIMEOUT_MS, get_readiness_stats, wait_until_ready
+from .selector_memory import CHAIN_CONTAINER, CHAIN_LISTING, SelectorMemory, get_selector_memory, race_selectors
+from .throttle import (
+    THROTTLE_ENABLED, THROTTLE_STATUS_CODES, OUTCOME_OK, OUTCOME_THROTTLED, OUTCOME_TIMEOUT,
+    OUTCOME_EMPTY, OUTCOME_ERROR, StoreThrottled, get_throttle, is_timeout
+)
+
+# Directory where per-store browser storage state (cookies, consent) is kept
+SCRAPER_STATE_DIR = os.getenv("SCRAPER_STATE_DIR", ".scraper_state")
+# Default time scraped results stay cached, in seconds
+SCRAPE_CACHE_TTL = float(os.getenv("SCRAPE_CACHE_TTL", "300"))
+# Result pages a paginated crawl reads by default, and listings kept per page
+CRAWL_MAX_PAGES = int(os.getenv("SCRAPER_CRAWL_MAX_PAGES", "5"))
+CRAWL_PAGE_LIMIT = int(os.getenv("SCRAPER_CRAWL_PAGE_LIMIT", "60"))
+
+# Listings to extract per page when it differs from the selector spec's limit
+_listing_limit: ContextVar[Optional[int]] = ContextVar("listing_limit", default=None)
+# Whether an empty page is an expected answer (a crawl page past the last one) rather than a soft block
+_empty_expected: ContextVar[bool] = ContextVar("empty_expected", default=False)
+
 
 @dataclass
 class LegoSet:
@@ -26,16 +61,391 @@ class BaseScraper(ABC):
     def __init__(self, store_name: str):
         self.store_name = store_name
         self.base_url = ""
+        # Shared browser pool; scrapers check out pages instead of launching browsers
+        self.browser_pool = browser_pool
+        # Options for the browser contexts this store's pages run in
+        self.context_options: Dict = {}
+        # Cookie consent buttons to dismiss on the first visit of a context
+        self.consent_selectors: List[str] = []
+        self._consented_pages = weakref.WeakSet()
+        # Lean navigation: block images, fonts, media and trackers
+        self.resource_policy: Optional[ResourcePolicy] = ResourcePolicy() if LEAN_MODE_ENABLED else None
+        self._routed_pages = weakref.WeakSet()
+        # Try a plain HTTP fetch before driving a browser (server-rendered stores)
+        self.http_first = False
+        # Selector chains for result listings, set by each store
+        self.selector_spec = None
+        # Selectors for a single product or offer page, used for set lookups
+        self.product_spec: Optional[SelectorSpec] = None
+        # How long this store's results stay cached
+        self.cache_ttl = SCRAPE_CACHE_TTL
+        # Request rate (per second) and concurrency ceiling the store tolerates
+        self.rate_limit = 1.0
+        self.max_concurrency = 4
+        # Upper bound on waiting for result listings to settle after navigation
+        self.ready_timeout_ms = READY_TIMEOUT_MS
+
+    @property
+    def store_key(self) -> str:
+        """Stable identifier of the store used for pools, caches and stats"""
+        return self.store_name.lower()
+
+    @property
+    def storage_state_path(self) -> str:
+        return os.path.join(SCRAPER_STATE_DIR, f"{self.store_key}.json")
+
+    @property
+    def selector_memory(self) -> SelectorMemory:
+        """Learned selector winners of this store, persisted next to its storage state"""
+        return get_selector_memory(
+            self.store_key, os.path.join(SCRAPER_STATE_DIR, f"{self.store_key}.selectors.json")
+        )
+
+    @property
+    def product_index(self) -> ProductIndex:
+        """Set numbers mapped to this store's product pages, learned from searches"""
+        return get_product_index(
+            self.store_key, os.path.join(SCRAPER_STATE_DIR, f"{self.store_key}.products.json")
+        )
+
+    @property
+    def learned_selector_spec(self):
+        """The store's selector spec with the last winning listing selector first"""
+        if self.selector_spec is None:
+            return None
+        return replace(
+            self.selector_spec,
+            listing=self.selector_memory.order(CHAIN_LISTING, self.selector_spec.listing),
+            limit=_listing_limit.get() or self.selector_spec.limit
+        )
+
+    async def wait_for_results(self, page, containers: List[str], deadline: Optional[Deadline] = None,
+                               timeout: int = 5000) -> Optional[str]:
+        """Wait until any of the result containers renders.
+
+        All candidates are raced at once, so a layout change costs one
+        timeout instead of one per stale selector. Returns the selector that
+        matched, or None.
+        """
+        memory = self.selector_memory
+        winner = await race_selectors(page, memory.order(CHAIN_CONTAINER, containers), timeout_ms(deadline, timeout))
+        memory.record(CHAIN_CONTAINER, winner)
+        return winner
+
+    @asynccontextmanager
+    async def page(self):
+        """Check out a warm page for this store from the browser pool"""
+        async with self.browser_pool.store_page(
+            self.store_key,
+            storage_state=self.storage_state_path,
+            **self.context_options
+        ) as page:
+            if self.resource_policy and page not in self._routed_pages:
+                await self.resource_policy.install(page, get_resource_stats(self.store_key))
+                self._routed_pages.add(page)
+            yield page
+
+    async def navigate(self, page, url: str, deadline: Optional[Deadline] = None, **goto_options):
+        """Navigate a pooled page, dismissing cookie consent on first use.
+
+        The navigation timeout is capped to what is left of ``deadline``.
+        """
+        goto_options["timeout"] = timeout_ms(deadline, goto_options.get("timeout", DEFAULT_BROWSER_TIMEOUT_MS))
+        response = await page.goto(url, **goto_options)
+        if response is not None and response.status in THROTTLE_STATUS_CODES:
+            raise StoreThrottled(response.status)
+        if page not in self._consented_pages:
+            accepted = await self.accept_consent(page)
+            if accepted or not os.path.exists(self.storage_state_path):
+                await self.browser_pool.save_storage_state(page, self.storage_state_path)
+            self._consented_pages.add(page)
+        return response
+
+    async def accept_consent(self, page) -> bool:
+        """Click the first visible cookie consent button, if any"""
+        for selector in self.consent_selectors:
+            try:
+                button = await page.query_selector(selector)
+                if button and await button.is_visible():
+                    await button.click(timeout=2000)
+                    print(f"{self.store_name}: accepted cookie consent")
+                    return True
+            except Exception:
+                continue
+        return False
     
+    @property
+    def http_headers(self) -> Dict:
+        """Headers for the HTTP tier, matching the browser context options"""
+        headers = dict(self.context_options.get("extra_http_headers", {}))
+        if "user_agent" in self.context_options:
+            headers["User-Agent"] = self.context_options["user_agent"]
+        return headers
+
+    async def fetch_listings(self, url: str, deadline: Optional[Deadline] = None,
+                             spec: Optional[SelectorSpec] = None) -> List[Dict]:
+        """Fetch listing records for a result page, or for another page with ``spec``.
+
+        Fails fast with CircuitOpen while the store's circuit is open, and
+        records every outcome in the store's health registry. Failures caused
+        by the caller's deadline running out are not held against the store.
+        """
+        if deadline is not None:
+            deadline.check()
+        health = get_store_health(self.store_key)
+        if not health.breaker.allow():
+            raise CircuitOpen(self.store_key)
+
+        started = time.monotonic()
+        try:
+            records = await self._fetch_listings_throttled(url, deadline, spec)
+        except asyncio.CancelledError:
+            health.breaker.abandon()
+            raise
+        except Exception:
+            if deadline is not None and deadline.expired:
+                health.breaker.abandon()
+            else:
+                health.record(False, time.monotonic() - started)
+            raise
+        health.record(True, time.monotonic() - started)
+        return records
+
+    async def _fetch_listings_throttled(self, url: str, deadline: Optional[Deadline],
+                                        spec: Optional[SelectorSpec] = None) -> List[Dict]:
+        """Fetch listing records under the store's throttle"""
+        if not THROTTLE_ENABLED:
+            return await self._fetch_listings_tiered(url, deadline, spec)
+
+        throttle = get_throttle(self)
+        async with throttle.slot():
+            started = time.monotonic()
+            try:
+                records = await self._fetch_listings_tiered(url, deadline, spec)
+            except asyncio.CancelledError:
+                raise
+            except DeadlineExceeded:
+                raise
+            except StoreThrottled:
+                throttle.record(OUTCOME_THROTTLED, time.monotonic() - started)
+                raise
+            except Exception as e:
+                if deadline is None or not deadline.expired:
+                    throttle.record(OUTCOME_TIMEOUT if is_timeout(e) else OUTCOME_ERROR, time.monotonic() - started)
+                raise
+
+            outcome = OUTCOME_OK if records or _empty_expected.get() else OUTCOME_EMPTY
+            throttle.record(outcome, time.monotonic() - started)
+            return records
+
+    async def _fetch_listings_tiered(self, url: str, deadline: Optional[Deadline],
+                                     spec: Optional[SelectorSpec] = None):
+        """Fetch listing records, cheapest tier first.
+
+        Server-rendered stores are fetched over pooled HTTP and parsed with
+        the store's selector spec (or ``spec``); the browser is only used when
+        that yields nothing or hits a JavaScript wall. A rate-limit status
+        on either tier raises StoreThrottled rather than escalating.
+        """
+        escalation_reason = None
+        page_spec = spec or self.learned_selector_spec
+        if self.http_first and HTTP_TIER_ENABLED and page_spec:
+            result = await fetch_listings_http(url, page_spec, self.http_headers, deadline)
+            if result.records:
+                get_tier_stats(self.store_key).record(result)
+                if spec is None:
+                    self._record_listing_selector(result.records)
+                print(f"{self.store_name}: served by HTTP tier ({len(result.records)} listings)")
+                return result.records
+            escalation_reason = result.escalation_reason
+            print(f"{self.store_name}: escalating to browser ({escalation_reason})")
+
+        if spec is None:
+            records = await self.fetch_listings_browser(url, deadline)
+            self._record_listing_selector(records)
+        else:
+            records = await self.fetch_page_browser(url, spec, deadline)
+        get_tier_stats(self.store_key).record(FetchResult(records, TIER_BROWSER, escalation_reason))
+        return records
+
+    async def wait_for_listings(self, page, deadline: Optional[Deadline] = None,
+                                selectors: Optional[List[str]] = None) -> int:
+        """Wait until the page's listing count is stable instead of sleeping.
+
+        Returns as soon as the listings stop changing, or after the store's
+        ready timeout (``<STORE>_READY_TIMEOUT_MS``). The time it took is
+        recorded per store. Returns the number of listings seen.
+        """
+        limit = int(os.getenv(f"{self.store_key.upper()}_READY_TIMEOUT_MS", self.ready_timeout_ms))
+        outcome, elapsed, count = await wait_until_ready(
+            page, selectors or self.learned_selector_spec.listing, timeout_ms(deadline, limit)
+        )
+        get_readiness_stats(self.store_key).record(outcome, elapsed)
+        return count
+
+    def _record_listing_selector(self, records: List[Dict]):
+        if self.selector_spec is not None:
+            self.selector_memory.record(CHAIN_LISTING, records[0].get("listing_selector") if records else None)
+
     @abstractmethod
-    async def search_sets(self, query: str) -> List[LegoSet]:
-        """Search for LEGO sets by query"""
+    async def fetch_listings_browser(self, url: str, deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Load a result page in the browser and extract listing records"""
         pass
-    
+
+    async def fetch_page_browser(self, url: str, spec: SelectorSpec, deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Load any page in the browser and extract records described by ``spec``"""
+        async with self.page() as page:
+            await self.navigate(page, url, deadline, wait_until='domcontentloaded')
+            await self.wait_for_listings(page, deadline, spec.listing)
+            return await extract_listings(page, spec)
+
+    @abstractmethod
+    async def search_sets(self, query: str, deadline: Optional[Deadline] = None) -> List[LegoSet]:
+        """Search for LEGO sets by query, finishing before ``deadline`` if given.
+
+        Returns only offers parsed from the store; a failed scrape raises.
+        """
+        pass
+
+    def sample_sets(self, query: str) -> List[LegoSet]:
+        """Placeholder offers shown when the store returns nothing (demo and development setups).
+
+        They are never cached or stored.
+        """
+        return []
+
+    @abstractmethod
+    def search_url(self, query: str, page_number: int = 1) -> str:
+        """URL of a page of the store's search results, numbered from 1"""
+        pass
+
     @abstractmethod
-    async def get_set_details(self, set_number: str) -> Optional[LegoSet]:
-        """Get detailed information about specific LEGO set"""
+    async def records_to_sets(self, records: List[Dict], query: str, offset: int = 0) -> List[LegoSet]:
+        """Build LegoSets from listing records; ``offset`` is the first record's position"""
         pass
+
+    async def parse_records(self, records: List[Dict], query: str, offset: int = 0,
+                            learn: bool = True) -> List[LegoSet]:
+        """Build LegoSets from result records, journal them and, with ``learn``, index their product pages"""
+        sets = await self.records_to_sets(records, query, offset)
+        if SCRAPE_JOURNAL_ENABLED and records:
+            scrape_journal.append(self.store_name, query, records, sets)
+        if learn and self.product_spec is not None:
+            self.product_index.learn(sets)
+        return sets
+
+    async def _fetch_page(self, query: str, page_number: int, deadline: Optional[Deadline]) -> List[Dict]:
+        _listing_limit.set(CRAWL_PAGE_LIMIT)
+        _empty_expected.set(page_number > 1)
+        return await self.fetch_listings(self.search_url(query, page_number), deadline)
+
+    async def crawl_sets(self, query: str, max_results: Optional[int] = None, max_pages: int = CRAWL_MAX_PAGES,
+                         deadline: Optional[Deadline] = None) -> AsyncIterator[LegoSet]:
+        """Search across several result pages, yielding sets as pages arrive.
+
+        The first page is fetched alone; if it has listings, the remaining
+        pages are fetched concurrently (at most ``max_concurrency`` at once),
+        each on its own pooled page. Stops at ``max_results`` sets, and skips
+        pages beyond one that came back empty. A failed first page raises;
+        later failed pages are skipped. Breaking out of the loop cancels
+        pages still in flight. Unlike search_sets, nothing is cached.
+        """
+        limit = asyncio.Semaphore(self.max_concurrency)
+        seen = set()
+        yielded = 0
+        last_page = max_pages
+        abandoned = []
+
+        async def fetch(page_number: int) -> List[Dict]:
+            async with limit:
+                return await self._fetch_page(query, page_number, deadline)
+
+        pending = {asyncio.ensure_future(fetch(1)): 1}
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=pending.get):
+                    if task not in pending:
+                        # Past an empty page that finished in the same batch
+                        continue
+                    page_number = pending.pop(task)
+                    try:
+                        records = task.result()
+                    except Exception as e:
+                        if page_number == 1:
+                            raise
+                        print(f"{self.store_name}: result page {page_number} failed: {e}")
+                        records = []
+                    if not records:
+                        # Pages past the end of the results are empty too
+                        last_page = min(last_page, page_number - 1)
+                        for other in [t for t, n in pending.items() if n > last_page]:
+                            other.cancel()
+                            abandoned.append(other)
+                            pending.pop(other)
+                        continue
+                    if page_number == 1:
+                        for next_page in range(2, last_page + 1):
+                            pending[asyncio.ensure_future(fetch(next_page))] = next_page
+
+                    offset = (page_number - 1) * CRAWL_PAGE_LIMIT
+                    for lego_set in await self.parse_records(records, query, offset):
+                        if lego_set.store_url in seen:
+                            continue
+                        seen.add(lego_set.store_url)
+                        yield lego_set
+                        yielded += 1
+                        if max_results is not None and yielded >= max_results:
+                            return
+        finally:
+            abandoned.extend(pending)
+            for task in abandoned:
+                task.cancel()
+            if abandoned:
+                await asyncio.gather(*abandoned, return_exceptions=True)
+
+    async def get_set_details(self, set_number: str, deadline: Optional[Deadline] = None) -> Optional[LegoSet]:
+        """Get detailed information about specific LEGO set (its first offer)"""
+        offers = await self.get_set_offers(set_number, deadline)
+        return offers[0] if offers else None
+
+    async def get_set_offers(self, set_number: str, deadline: Optional[Deadline] = None) -> List[LegoSet]:
+        """Every offer of a specific LEGO set on this store.
+
+        Stores with product pages (``product_spec``) fetch the set's indexed
+        page when there is one. On an index miss, when that page no longer
+        shows the set, and on marketplaces, the store is searched and every
+        exact match returned.
+        """
+        url = self.product_index.get(set_number) if self.product_spec is not None else None
+        if url:
+            try:
+                offers = await self.lookup_product(url, set_number, deadline)
+            except (asyncio.CancelledError, DeadlineExceeded):
+                raise
+            except Exception as e:
+                print(f"{self.store_name}: product page lookup for {set_number} failed: {e}")
+                offers = None
+            else:
+                if not offers:
+                    print(f"{self.store_name}: {url} no longer lists {set_number}, dropping it from the index")
+                    self.product_index.evict(set_number)
+            if offers:
+                return offers
+
+        results = await self.search_sets(f"lego {set_number}", deadline)
+        return [result for result in results if result.set_number == set_number]
+
+    async def lookup_product(self, url: str, set_number: str, deadline: Optional[Deadline] = None) -> List[LegoSet]:
+        """Read a set's offers from its product page; empty if the page does not show it"""
+        records = await self.fetch_listings(url, deadline, spec=self.product_spec)
+        # Offer rows may not repeat the product name; they are offers of the page's product
+        page_title = next((record["title"] for record in records if record.get("title")), None)
+        for record in records:
+            record["title"] = record.get("title") or page_title
+            record["href"] = record.get("href") or url
+        sets = await self.parse_records(records, f"lego {set_number}", learn=False)
+        return [lego_set for lego_set in sets if lego_set.set_number == set_number]
     
     @abstractmethod
     async def get_shipping_cost(self, price: float, location: str = "PL") -> float:
@@ -0,0 +1,372 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from playwright.async_api import async_playwright
+
+from .priority import PriorityGate
+
+
+DEFAULT_LAUNCH_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-accelerated-2d-canvas',
+    '--no-first-run',
+    '--no-zygote',
+    '--disable-gpu'
+]
+
+
+class _BrowserSlot:
+    """One long-lived browser owned by the pool"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.browser = None
+        self.active_contexts = 0
+        self.pages_served = 0
+        self.launches = 0
+        self.crashed = False
+        self.draining = False
+
+    @property
+    def alive(self) -> bool:
+        return self.browser is not None and not self.crashed and self.browser.is_connected()
+
+
+class _WarmPage:
+    """An idle context/page kept open for the next search on the same store"""
+
+    def __init__(self, slot: _BrowserSlot, context, page):
+        self.slot = slot
+        self.browser = slot.browser
+        self.context = context
+        self.page = page
+
+    @property
+    def usable(self) -> bool:
+        return (
+            self.slot.alive
+            and not self.slot.draining
+            and self.slot.browser is self.browser
+            and not self.page.is_closed()
+        )
+
+
+class BrowserPool:
+    """Process-wide pool of long-lived Chromium browsers shared by all scrapers.
+
+    Contexts are checked out with ``async with pool.context()`` and closed on
+    checkin. A browser that crashes is relaunched on the next checkout, and a
+    browser that has served ``max_pages_per_browser`` pages is drained and
+    recycled to bound memory growth.
+
+    ``store_page()`` additionally keeps a few warm contexts per store whose
+    page is reused for the next navigation, so cookies, consent state and
+    connection caches survive between searches.
+    """
+
+    def __init__(self, size: Optional[int] = None,
+                 max_pages_per_browser: Optional[int] = None,
+                 max_contexts_per_browser: Optional[int] = None,
+                 warm_pages_per_store: Optional[int] = None,
+                 interactive_reserved: Optional[int] = None,
+                 headless: bool = True,
+                 launch_args: Optional[List[str]] = None):
+        self.size = size or int(os.getenv("SCRAPER_BROWSER_POOL_SIZE", "2"))
+        self.max_pages_per_browser = max_pages_per_browser or int(
+            os.getenv("SCRAPER_BROWSER_MAX_PAGES", "200")
+        )
+        self.max_contexts_per_browser = max_contexts_per_browser or int(
+            os.getenv("SCRAPER_MAX_CONTEXTS_PER_BROWSER", "4")
+        )
+        self.warm_pages_per_store = warm_pages_per_store if warm_pages_per_store is not None else int(
+            os.getenv("SCRAPER_WARM_PAGES_PER_STORE", "2")
+        )
+        # Context slots only interactive (user-facing) work may use
+        self.interactive_reserved = interactive_reserved if interactive_reserved is not None else int(
+            os.getenv("SCRAPER_INTERACTIVE_RESERVED", str(max(self.size * self.max_contexts_per_browser // 4, 1)))
+        )
+        self.headless = headless
+        self.launch_args = launch_args or list(DEFAULT_LAUNCH_ARGS)
+
+        self._playwright = None
+        self._slots: List[_BrowserSlot] = []
+        self._warm: Dict[str, List[_WarmPage]] = {}
+        self._loop = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._capacity: Optional[PriorityGate] = None
+        self._next_slot = 0
+
+        # Lifetime counters
+        self.respawns = 0
+        self.recycles = 0
+        self.total_pages = 0
+        self.warm_hits = 0
+        self.cold_starts = 0
+
+    def _ensure_loop(self):
+        """Bind pool state to the running event loop.
+
+        Playwright objects and asyncio primitives cannot cross event loops
+        (the test client and Celery tasks each run their own), so state
+        belonging to a previous loop is dropped rather than reused.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._lock = asyncio.Lock()
+        self._capacity = PriorityGate(self.size * self.max_contexts_per_browser, self.interactive_reserved)
+        self._playwright = None
+        self._slots = [_BrowserSlot(i) for i in range(self.size)]
+        self._warm = {}
+        self._next_slot = 0
+
+    async def _ensure_playwright(self):
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+
+    async def _launch(self, slot: _BrowserSlot):
+        """Launch (or relaunch) the browser in a slot"""
+        await self._ensure_playwright()
+        if slot.browser is not None:
+            if slot.crashed:
+                self.respawns += 1
+            try:
+                await slot.browser.close()
+            except Exception:
+                pass
+
+        browser = await self._playwright.chromium.launch(
+            headless=self.headless,
+            args=self.launch_args
+        )
+        browser.on("disconnected", lambda _: self._mark_crashed(slot, browser))
+
+        slot.browser = browser
+        slot.crashed = False
+        slot.draining = False
+        slot.pages_served = 0
+        slot.launches += 1
+        print(f"Browser pool: launched browser {slot.index} (launch #{slot.launches})")
+
+    def _mark_crashed(self, slot: _BrowserSlot, browser):
+        # Ignore disconnects of browsers we closed ourselves while recycling
+        if slot.browser is browser and not slot.draining:
+            print(f"Browser pool: browser {slot.index} disconnected, will respawn")
+            slot.crashed = True
+
+    async def _checkout_slot(self) -> _BrowserSlot:
+        async with self._lock:
+            candidates = [s for s in self._slots if not s.draining]
+            if not candidates:
+                candidates = self._slots
+
+            # Round-robin across slots, preferring the least loaded one
+            ordered = candidates[self._next_slot % len(candidates):] + candidates[:self._next_slot % len(candidates)]
+            self._next_slot += 1
+            slot = min(ordered, key=lambda s: s.active_contexts)
+
+            if not slot.alive:
+                await self._launch(slot)
+
+            slot.active_contexts += 1
+            return slot
+
+    async def _checkin_slot(self, slot: _BrowserSlot):
+        async with self._lock:
+            await self._release_slot(slot)
+
+    async def _release_slot(self, slot: _BrowserSlot):
+        """Return a checkout to its slot and recycle the browser if due (lock held)"""
+        slot.active_contexts -= 1
+        if slot.pages_served >= self.max_pages_per_browser:
+            slot.draining = True
+        if slot.draining and slot.active_contexts == 0 and slot.browser is not None:
+            print(f"Browser pool: recycling browser {slot.index} after {slot.pages_served} pages")
+            self.recycles += 1
+            browser = slot.browser
+            slot.browser = None
+            slot.draining = False
+            for store_key, idle in self._warm.items():
+                self._warm[store_key] = [w for w in idle if w.slot is not slot]
+            try:
+                await browser.close()
+            except Exception:
+                pass
+
+    def record_page(self, slot: _BrowserSlot):
+        """Count a page served by a slot towards its recycle budget"""
+        slot.pages_served += 1
+        self.total_pages += 1
+
+    @asynccontextmanager
+    async def _checkout(self, priority: Optional[str] = None, **context_options: Any):
+        self._ensure_loop()
+        async with self._capacity.slot(priority):
+            slot = await self._checkout_slot()
+            context = None
+            try:
+                context = await slot.browser.new_context(**context_options)
+                yield slot, context
+            finally:
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+                await self._checkin_slot(slot)
+
+    @asynccontextmanager
+    async def context(self, priority: Optional[str] = None, **context_options: Any):
+        """Check out a fresh browser context from the pool"""
+        async with self._checkout(priority, **context_options) as (_, context):
+            yield context
+
+    @asynccontextmanager
+    async def page(self, priority: Optional[str] = None, **context_options: Any):
+        """Check out a context and open a single page in it"""
+        async with self._checkout(priority, **context_options) as (slot, context):
+            page = await context.new_page()
+            self.record_page(slot)
+            yield page
+
+    async def _checkout_warm(self, store_key: str) -> Optional[_WarmPage]:
+        """Take an idle warm page for a store, discarding stale ones"""
+        stale = []
+        warm = None
+        async with self._lock:
+            idle = self._warm.setdefault(store_key, [])
+            while idle:
+                candidate = idle.pop()
+                if candidate.usable:
+                    warm = candidate
+                    warm.slot.active_contexts += 1
+                    break
+                stale.append(candidate)
+        for entry in stale:
+            await self._close_context(entry.context)
+        return warm
+
+    async def _checkin_warm(self, store_key: str, warm: _WarmPage, healthy: bool):
+        """Park a warm page for reuse, or close it if it cannot be reused"""
+        async with self._lock:
+            idle = self._warm.setdefault(store_key, [])
+            keep = (
+                healthy
+                and warm.usable
+                and warm.slot.pages_served < self.max_pages_per_browser
+                and len(idle) < self.warm_pages_per_store
+            )
+            if keep:
+                idle.append(warm)
+            await self._release_slot(warm.slot)
+        if not keep:
+            await self._close_context(warm.context)
+
+    async def _close_context(self, context):
+        try:
+            await context.close()
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def store_page(self, store_key: str, storage_state: Optional[str] = None,
+                         priority: Optional[str] = None, **context_options: Any):
+        """Check out a warm, reusable page for a store.
+
+        New contexts are seeded from ``storage_state`` (a JSON file written by
+        ``save_storage_state``) when it exists. A page whose caller raised is
+        not returned to the warm pool.
+
+        ``priority`` is the lane (interactive or background) to wait in for
+        capacity, by default the lane of the current task.
+        """
+        self._ensure_loop()
+        async with self._capacity.slot(priority):
+            warm = await self._checkout_warm(store_key)
+            if warm is not None:
+                self.warm_hits += 1
+            else:
+                slot = await self._checkout_slot()
+                try:
+                    options = dict(context_options)
+                    if storage_state and os.path.exists(storage_state):
+                        options["storage_state"] = storage_state
+                    context = await slot.browser.new_context(**options)
+                    page = await context.new_page()
+                except Exception:
+                    await self._checkin_slot(slot)
+                    raise
+                warm = _WarmPage(slot, context, page)
+                self.cold_starts += 1
+
+            self.record_page(warm.slot)
+            healthy = False
+            try:
+                yield warm.page
+                healthy = True
+            finally:
+                await self._checkin_warm(store_key, warm, healthy)
+
+    async def save_storage_state(self, page, path: str):
+        """Persist cookies and local storage of a page's context to disk"""
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            await page.context.storage_state(path=path)
+        except Exception as e:
+            print(f"Browser pool: could not save storage state to {path}: {e}")
+
+    async def close(self):
+        """Close all browsers and stop Playwright"""
+        if self._loop is not asyncio.get_running_loop():
+            return
+        self._warm = {}
+        for slot in self._slots:
+            if slot.browser is not None:
+                slot.draining = True
+                try:
+                    await slot.browser.close()
+                except Exception:
+                    pass
+                slot.browser = None
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+        self._playwright = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool counters for monitoring"""
+        return {
+            "size": self.size,
+            "max_pages_per_browser": self.max_pages_per_browser,
+            "max_contexts_per_browser": self.max_contexts_per_browser,
+            "browsers_alive": sum(1 for s in self._slots if s.alive),
+            "active_contexts": sum(s.active_contexts for s in self._slots),
+            "total_pages": self.total_pages,
+            "respawns": self.respawns,
+            "recycles": self.recycles,
+            "warm_hits": self.warm_hits,
+            "cold_starts": self.cold_starts,
+            "warm_pages": {key: len(idle) for key, idle in self._warm.items()},
+            "capacity": self._capacity.to_dict() if self._capacity is not None else None,
+            "browsers": [
+                {
+                    "index": s.index,
+                    "alive": s.alive,
+                    "active_contexts": s.active_contexts,
+                    "pages_served": s.pages_served,
+                    "launches": s.launches
+                }
+                for s in self._slots
+            ]
+        }
+
+
+# Shared pool used by all scrapers in this process
+browser_pool = BrowserPool()
@@ -0,0 +1,284 @@
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .base_scraper import LegoSet
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:
+    redis_asyncio = None
+
+
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_LOCAL_MAX_ENTRIES = int(os.getenv("SCRAPE_CACHE_LOCAL_MAX_ENTRIES", "1000"))
+# How long an empty result is remembered, so dead queries are not re-scraped
+CACHE_NEGATIVE_TTL = float(os.getenv("SCRAPE_CACHE_NEGATIVE_TTL", "60"))
+# How long past its TTL an entry may still be served while it is refreshed
+CACHE_STALE_TTL = float(os.getenv("SCRAPE_CACHE_STALE_TTL", "600"))
+# Aggressiveness of probabilistic early refresh (0 disables it)
+CACHE_EARLY_REFRESH_BETA = float(os.getenv("SCRAPE_CACHE_EARLY_REFRESH_BETA", "1.0"))
+# After a Redis error, skip Redis for this many seconds
+REDIS_RETRY_SECONDS = 30.0
+
+CACHE_KEY_PREFIX = "lpa:scrape"
+
+# Words that do not change what a marketplace search returns
+_NOISE_WORDS = {"lego", "zestaw", "klocki"}
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a search query.
+
+    "42100", "lego 42100" and " LEGO 42100 " all normalize to "42100".
+    """
+    words = re.split(r"\s+", query.strip().lower())
+    meaningful = [w for w in words if w and w not in _NOISE_WORDS]
+    if not meaningful:
+        return " ".join(w for w in words if w)
+    return " ".join(meaningful)
+
+
+def cache_key(store_key: str, kind: str, query: str) -> str:
+    """Build the cache key for one store's result of a search or set lookup"""
+    return f"{CACHE_KEY_PREFIX}:{kind}:{store_key}:{normalize_query(query)}"
+
+
+def set_to_dict(lego_set: LegoSet) -> Dict:
+    data = dict(lego_set.__dict__)
+    data["last_updated"] = lego_set.last_updated.isoformat()
+    return data
+
+
+def set_from_dict(data: Dict) -> LegoSet:
+    data = dict(data)
+    data["last_updated"] = datetime.fromisoformat(data["last_updated"])
+    return LegoSet(**data)
+
+
+@dataclass
+class CacheEntry:
+    """Cached offers of one store for one normalized query.
+
+    An entry is fresh for ``ttl`` seconds and may then be served stale for
+    another ``stale_ttl`` seconds while a refresh runs. ``compute_time`` is
+    how long the scrape took, used to schedule early refreshes.
+    """
+    sets: List[LegoSet]
+    stored_at: float
+    ttl: float
+    stale_ttl: float = 0.0
+    compute_time: float = 0.0
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    @property
+    def expires_at(self) -> float:
+        return self.stored_at + self.ttl
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def is_servable(self) -> bool:
+        return time.time() < self.expires_at + self.stale_ttl
+
+    def should_refresh_early(self, beta: float = CACHE_EARLY_REFRESH_BETA) -> bool:
+        """Probabilistic early expiry (XFetch).
+
+        The closer an entry is to expiring, and the longer it takes to
+        recompute, the more likely a read triggers a refresh, so hot keys
+        are refreshed by one reader before they expire for everyone.
+        """
+        if beta <= 0 or self.compute_time <= 0:
+            return False
+        jitter = -self.compute_time * beta * math.log(1.0 - random.random())
+        return time.time() + jitter >= self.expires_at
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "stored_at": self.stored_at,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "compute_time": self.compute_time,
+            "sets": [set_to_dict(s) for s in self.sets]
+        })
+
+    @classmethod
+    def from_json(cls, raw) -> "CacheEntry":
+        data = json.loads(raw)
+        return cls(
+            [set_from_dict(s) for s in data["sets"]],
+            data["stored_at"],
+            data["ttl"],
+            data.get("stale_ttl", 0.0),
+            data.get("compute_time", 0.0)
+        )
+
+
+class LRUCache:
+    """Bounded in-process cache with least-recently-used eviction"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not entry.is_servable():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ScrapeCache:
+    """Two-tier scrape result cache: in-process LRU in front of Redis.
+
+    Redis is optional; without ``REDIS_URL`` (or while Redis is failing)
+    only the local tier is used.
+    """
+
+    def __init__(self, redis_url: Optional[str] = REDIS_URL,
+                 max_local_entries: int = CACHE_LOCAL_MAX_ENTRIES):
+        self.redis_url = redis_url
+        self.local = LRUCache(max_local_entries)
+        self._redis = None
+        self._redis_loop = None
+        self._redis_disabled_until = 0.0
+
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.stale_hits = 0
+        self.writes = 0
+        self.redis_errors = 0
+
+    def _get_redis(self):
+        if not self.redis_url or redis_asyncio is None:
+            return None
+        if time.time() < self._redis_disabled_until:
+            return None
+        # Redis connections belong to the loop they were opened on
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            self._redis = redis_asyncio.from_url(self.redis_url, socket_timeout=1.0, socket_connect_timeout=1.0)
+            self._redis_loop = loop
+        return self._redis
+
+    def _redis_failed(self, error: Exception):
+        self.redis_errors += 1
+        self._redis_disabled_until = time.time() + REDIS_RETRY_SECONDS
+        print(f"Scrape cache: Redis unavailable ({error}), using local cache only")
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        """Look up a servable (possibly stale) entry, local tier first.
+
+        A stale local entry is checked against Redis, where another process
+        (e.g. a Celery worker) may have stored a fresher result.
+        """
+        entry = self.local.get(key)
+        if entry is not None and entry.is_fresh():
+            self.local_hits += 1
+        else:
+            remote = await self._redis_get(key)
+            if remote is not None and (entry is None or remote.stored_at > entry.stored_at):
+                self.redis_hits += 1
+                self.local.set(key, remote)
+                entry = remote
+            elif entry is not None:
+                self.local_hits += 1
+
+        if entry is None:
+            self.misses += 1
+        else:
+            if not entry.sets:
+                self.negative_hits += 1
+            if not entry.is_fresh():
+                self.stale_hits += 1
+        return entry
+
+    async def _redis_get(self, key: str) -> Optional[CacheEntry]:
+        client = self._get_redis()
+        if client is None:
+            return None
+        try:
+            raw = await client.get(key)
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+        if raw is None:
+            return None
+        entry = CacheEntry.from_json(raw)
+        return entry if entry.is_servable() else None
+
+    async def set(self, key: str, sets: List[LegoSet], ttl: float,
+                  stale_ttl: float = CACHE_STALE_TTL, compute_time: float = 0.0) -> CacheEntry:
+        """Store a result; empty results are kept for the negative TTL"""
+        if not sets:
+            ttl = min(ttl, CACHE_NEGATIVE_TTL)
+            stale_ttl = 0.0
+        entry = CacheEntry(list(sets), time.time(), ttl, stale_ttl, compute_time)
+        self.local.set(key, entry)
+        self.writes += 1
+
+        client = self._get_redis()
+        if client is not None:
+            try:
+                await client.set(key, entry.to_json(), ex=max(int(ttl + stale_ttl), 1))
+            except Exception as e:
+                self._redis_failed(e)
+        return entry
+
+    def clear_local(self):
+        self.local.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "local_entries": len(self.local),
+            "local_max_entries": self.local.max_entries,
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "negative_hits": self.negative_hits,
+            "stale_hits": self.stale_hits,
+            "hit_ratio": (self.local_hits + self.redis_hits) / lookups if lookups else 0.0,
+            "evictions": self.local.evictions,
+            "writes": self.writes,
+            "redis_enabled": bool(self.redis_url and redis_asyncio is not None),
+            "redis_errors": self.redis_errors,
+        }
+
+
+# Shared scrape cache used by all scrapers in this process
+scrape_cache = ScrapeCache()
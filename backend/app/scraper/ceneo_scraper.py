@@ -1,9 +1,9 @@
-import asyncio
-from typing import List, Optional
-from datetime import datetime
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
 import re
-from playwright.async_api import async_playwright
 from .base_scraper import BaseScraper, LegoSet
+from .deadline import Deadline
+from .extraction import SelectorSpec, extract_listings
 
 
 class CeneoScraper(BaseScraper):
@@ -12,186 +12,169 @@ class CeneoScraper(BaseScraper):
     def __init__(self):
         super().__init__("Ceneo")
         self.base_url = "https://www.ceneo.pl"
+        # Set user agent to avoid detection
+        self.context_options = {
+            "user_agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }
+        # Listing pages are server-rendered, so try plain HTTP first
+        self.http_first = True
+        self.consent_selectors = [
+            '.js_cookie-monster-agree',
+            'button[data-role="accept-consent"]',
+            '#onetrust-accept-btn-handler'
+        ]
+        # Lean navigation: keep the consent script, drop ad servers
+        if self.resource_policy:
+            self.resource_policy.blocked_domains += ['ads.ceneo.pl', 'adocean.pl']
+            self.resource_policy.allowed_domains += ['cookielaw.org']
+        # Containers that hold the search results, in order of preference
+        self.result_containers = [
+            '.cat-prod-row',
+            '.product-row',
+            '.search-results',
+            '.products-grid',
+            '[data-role="search-results"]',
+            '.listing-item'
+        ]
+        self.selector_spec = SelectorSpec(
+            listing=list(self.result_containers) + [
+                # Fallback: try to find any product cards
+                '[data-testid*="product"], .product-card, .listing-item, article, .cat-prod-row'
+            ],
+            title=['.cat-prod-row__name', '.product-name', '.title', '[data-testid="title"]', '.product-title', 'h2', 'h3'],
+            price=['.cat-prod-row__price', '.price', '.product-price', '.listing-price', '.offer-price'],
+            link=['.cat-prod-row__name a', 'a', '[data-testid="link"]', '.product-link']
+        )
+        # A product page lists every shop's offer, cheapest first
+        self.product_spec = SelectorSpec(
+            listing=['.product-offer', '.product-offers__list__item', 'main'],
+            title=['.product-offer__product__name', '.product-name', 'h1'],
+            price=['.product-offer__price .price', '.price'],
+            link=['a.go-to-shop', 'a[href*="/Click/Offer/"]'],
+            limit=50
+        )
+        # Ceneo aggregates shop prices that update a few times a day
+        self.cache_ttl = 900
     
-    async def search_sets(self, query: str) -> List[LegoSet]:
+    async def search_sets(self, query: str, deadline: Optional[Deadline] = None) -> List[LegoSet]:
         """Search for LEGO sets on Ceneo"""
-        sets = []
+        # Search for LEGO sets on Ceneo
+        records = await self.fetch_listings(self.search_url(query), deadline)
+        print(f"Found {len(records)} potential listings on Ceneo")
+        sets = await self.parse_records(records, query)
         
-        try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                page = await browser.new_page()
-                
-                # Set user agent to avoid detection
-                await page.set_extra_http_headers({
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                })
-                
-                # Search for LEGO sets on Ceneo
-                search_url = f"{self.base_url}/;szukaj-{query.replace(' ', '+')}"
-                await page.goto(search_url, wait_until='networkidle')
-                
-                # Try multiple selectors for results
-                selectors = [
-                    '.cat-prod-row',
-                    '.product-row',
-                    '.search-results',
-                    '.products-grid',
-                    '[data-role="search-results"]',
-                    '.listing-item'
-                ]
-                
-                listings = []
-                for selector in selectors:
-                    try:
-                        await page.wait_for_selector(selector, timeout=5000)
-                        listings = await page.query_selector_all(f'{selector}')
-                        if listings:
-                            break
-                    except:
-                        continue
-                
-                if not listings:
-                    # Fallback: try to find any product cards
-                    listings = await page.query_selector_all('[data-testid*="product"], .product-card, .listing-item, article, .cat-prod-row')
-                
-                print(f"Found {len(listings)} potential listings on Ceneo")
-                
-                for listing in listings[:10]:  # Limit to first 10 results
-                    try:
-                        # Try multiple selectors for title
-                        title_selectors = ['.cat-prod-row__name', '.product-name', '.title', '[data-testid="title"]', '.product-title', 'h2', 'h3']
-                        title_elem = None
-                        for selector in title_selectors:
-                            title_elem = await listing.query_selector(selector)
-                            if title_elem:
-                                break
-                        
-                        # Try multiple selectors for price
-                        price_selectors = ['.cat-prod-row__price', '.price', '.product-price', '.listing-price', '.offer-price']
-                        price_elem = None
-                        for selector in price_selectors:
-                            price_elem = await listing.query_selector(selector)
-                            if price_elem:
-                                break
-                        
-                        # Try multiple selectors for link
-                        link_selectors = ['.cat-prod-row__name a', 'a', '[data-testid="link"]', '.product-link']
-                        link_elem = None
-                        for selector in link_selectors:
-                            link_elem = await listing.query_selector(selector)
-                            if link_elem:
-                                break
-                        
-                        if not all([title_elem, price_elem, link_elem]):
-                            continue
-                        
-                        title = await title_elem.text_content()
-                        price_text = await price_elem.text_content()
-                        link = await link_elem.get_attribute('href')
-                        
-                        if not title or not price_text:
-                            continue
-                        
-                        # Parse set number from title
-                        set_number = self._extract_set_number(title)
-                        if not set_number:
-                            continue
-                        
-                        # Parse price
-                        price = self._parse_price(price_text)
-                        if not price:
-                            continue
-                        
-                        # Calculate shipping (Ceneo shows prices from various stores)
-                        shipping = await self.get_shipping_cost(price)
-                        total_price = self.calculate_total_price(price, shipping)
-                        
-                        # Determine if new or used (Ceneo mostly has new items)
-                        condition = "new"
-                        
-                        lego_set = LegoSet(
-                            set_number=set_number,
-                            name=title.strip(),
-                            price=price,
-                            shipping_cost=shipping,
-                            total_price=total_price,
-                            store_name=self.store_name,
-                            store_url=f"{self.base_url}{link}" if link.startswith('/') else link,
-                            condition=condition,
-                            availability=True,
-                            last_updated=datetime.now()
-                        )
-                        
-                        sets.append(lego_set)
-                        
-                    except Exception as e:
-                        print(f"Error parsing Ceneo listing: {e}")
-                        continue
-                
-                await browser.close()
+        print(f"Ceneo scraper finished with {len(sets)} results")
+        return sets
+    
+    def sample_sets(self, query: str) -> List[LegoSet]:
+        """Mock Ceneo offers for testing without network access"""
+        return [
+            LegoSet(
+                set_number="42100",
+                name="LEGO Technic 42100 Koparka Liebherr R 9800 - Najlepsza cena",
+                price=2350.0,
+                shipping_cost=0.0,
+                total_price=2350.0,
+                store_name=self.store_name,
+                store_url=f"{self.base_url}/LEGO-Technic-42100-Koparka-Liebherr-R-9800-123456",
+                condition="new",
+                availability=True,
+                last_updated=datetime.now(timezone.utc)
+            ),
+            LegoSet(
+                set_number="75362",
+                name="LEGO Star Wars 75362 Imperial Shuttle - Promocja",
+                price=165.0,
+                shipping_cost=12.0,
+                total_price=177.0,
+                store_name=self.store_name,
+                store_url=f"{self.base_url}/LEGO-Star-Wars-75362-Imperial-Shuttle-789012",
+                condition="new",
+                availability=True,
+                last_updated=datetime.now(timezone.utc)
+            ),
+            LegoSet(
+                set_number="42115",
+                name="LEGO Technic 42115 Lamborghini Sián FKP 37 - Dostępny",
+                price=1750.0,
+                shipping_cost=0.0,
+                total_price=1750.0,
+                store_name=self.store_name,
+                store_url=f"{self.base_url}/LEGO-Technic-42115-Lamborghini-Sian-456789",
+                condition="new",
+                availability=True,
+                last_updated=datetime.now(timezone.utc)
+            )
+        ]
+    
+    def search_url(self, query: str, page_number: int = 1) -> str:
+        url = f"{self.base_url}/;szukaj-{query.replace(' ', '+')}"
+        # Ceneo numbers result pages from 0
+        return url if page_number == 1 else f"{url};0020-30-0-0-{page_number - 1}.htm"
+    
+    async def records_to_sets(self, records: List[Dict], query: str, offset: int = 0) -> List[LegoSet]:
+        sets = []
+        for record in records:
+            try:
+                lego_set = await self._record_to_set(record)
+                if lego_set:
+                    sets.append(lego_set)
+            except Exception as e:
+                print(f"Error parsing Ceneo listing: {e}")
+                continue
+        return sets
+    
+    async def fetch_listings_browser(self, url: str, deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Load a Ceneo result page and extract listing records"""
+        async with self.page() as page:
+            await self.navigate(page, url, deadline, wait_until='domcontentloaded')
+            
+            # Wait for whichever result container renders first, then for its listings to settle
+            if await self.wait_for_results(page, self.result_containers, deadline):
+                await self.wait_for_listings(page, deadline)
+            
+            # Extract all listings in a single round trip
+            return await extract_listings(page, self.learned_selector_spec)
+    
+    async def _record_to_set(self, record: Dict) -> Optional[LegoSet]:
+        """Build a LegoSet from an extracted listing record"""
+        title = record.get("title")
+        price_text = record.get("price_text")
+        link = record.get("href")
         
-        except Exception as e:
-            print(f"Error in Ceneo scraper: {e}")
+        if not title or not price_text or not link:
+            return None
         
-        print(f"Ceneo scraper finished with {len(sets)} results")
+        # Parse set number from title
+        set_number = self._extract_set_number(title)
+        if not set_number:
+            return None
         
-        # If no real results found, return mock data for testing
-        if not sets:
-            print("No real results found, returning mock data for testing")
-            mock_sets = [
-                LegoSet(
-                    set_number="42100",
-                    name="LEGO Technic 42100 Koparka Liebherr R 9800 - Najlepsza cena",
-                    price=2350.0,
-                    shipping_cost=0.0,
-                    total_price=2350.0,
-                    store_name=self.store_name,
-                    store_url=f"{self.base_url}/LEGO-Technic-42100-Koparka-Liebherr-R-9800-123456",
-                    condition="new",
-                    availability=True,
-                    last_updated=datetime.now()
-                ),
-                LegoSet(
-                    set_number="75362",
-                    name="LEGO Star Wars 75362 Imperial Shuttle - Promocja",
-                    price=165.0,
-                    shipping_cost=12.0,
-                    total_price=177.0,
-                    store_name=self.store_name,
-                    store_url=f"{self.base_url}/LEGO-Star-Wars-75362-Imperial-Shuttle-789012",
-                    condition="new",
-                    availability=True,
-                    last_updated=datetime.now()
-                ),
-                LegoSet(
-                    set_number="42115",
-                    name="LEGO Technic 42115 Lamborghini Sián FKP 37 - Dostępny",
-                    price=1750.0,
-                    shipping_cost=0.0,
-                    total_price=1750.0,
-                    store_name=self.store_name,
-                    store_url=f"{self.base_url}/LEGO-Technic-42115-Lamborghini-Sian-456789",
-                    condition="new",
-                    availability=True,
-                    last_updated=datetime.now()
-                )
-            ]
-            return mock_sets
+        # Parse price
+        price = self._parse_price(price_text)
+        if not price:
+            return None
         
-        return sets
-    
-    async def get_set_details(self, set_number: str) -> Optional[LegoSet]:
-        """Get detailed information about specific LEGO set"""
-        query = f"lego {set_number}"
-        results = await self.search_sets(query)
+        # Calculate shipping (Ceneo shows prices from various stores)
+        shipping = await self.get_shipping_cost(price)
+        total_price = self.calculate_total_price(price, shipping)
         
-        # Return the first result that matches the set number exactly
-        for result in results:
-            if result.set_number == set_number:
-                return result
+        # Determine if new or used (Ceneo mostly has new items)
+        condition = "new"
         
-        return None
+        return LegoSet(
+            set_number=set_number,
+            name=title.strip(),
+            price=price,
+            shipping_cost=shipping,
+            total_price=total_price,
+            store_name=self.store_name,
+            store_url=f"{self.base_url}{link}" if link.startswith('/') else link,
+            condition=condition,
+            availability=True,
+            last_updated=datetime.now(timezone.utc),
+            image_url=record.get("image")
+        )
     
     async def get_shipping_cost(self, price: float, location: str = "PL") -> float:
         """Calculate shipping cost for Ceneo"""
@@ -0,0 +1,56 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+# Latency budget of an interactive API request
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "25"))
+# Playwright's own default for navigations and waits
+DEFAULT_BROWSER_TIMEOUT_MS = 30000
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The request's latency budget ran out before the work could finish"""
+
+
+class Deadline:
+    """Point in time by which a request's scraping must be done.
+
+    Created by the API handlers and passed down to the scrapers, which cap
+    their navigation and wait timeouts to the time remaining.
+    """
+
+    def __init__(self, budget_seconds: float = REQUEST_DEADLINE_SECONDS):
+        self.budget = budget_seconds
+        self.expires_at = time.monotonic() + budget_seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self):
+        if self.expired:
+            raise DeadlineExceeded(f"request deadline of {self.budget}s exceeded")
+
+    def cap(self, seconds: float) -> float:
+        """Shorten a timeout in seconds to the time remaining"""
+        self.check()
+        return min(seconds, self.remaining())
+
+    def cap_ms(self, milliseconds: float) -> int:
+        """Shorten a Playwright timeout; never 0, which Playwright treats as no timeout"""
+        self.check()
+        return max(int(min(milliseconds, self.remaining() * 1000)), 1)
+
+
+def timeout_ms(deadline: Optional[Deadline], milliseconds: float = DEFAULT_BROWSER_TIMEOUT_MS) -> int:
+    """A browser timeout capped by an optional deadline"""
+    return deadline.cap_ms(milliseconds) if deadline is not None else int(milliseconds)
+
+
+def timeout_seconds(deadline: Optional[Deadline], seconds: float) -> float:
+    """A timeout in seconds capped by an optional deadline"""
+    return deadline.cap(seconds) if deadline is not None else seconds
@@ -0,0 +1,138 @@
+import re
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+
+@dataclass
+class SelectorSpec:
+    """Selector chains describing a store's result listings.
+
+    Each field is a list of candidate CSS selectors tried in order; the first
+    one that matches (with usable text, for title and price) wins.
+    """
+    listing: List[str]
+    title: List[str]
+    price: List[str]
+    link: List[str] = field(default_factory=lambda: ['a'])
+    image: List[str] = field(default_factory=lambda: ['img'])
+    min_title_length: int = 1
+    limit: int = 10
+
+
+# Runs inside the page: walks every listing with the full selector chain and
+# returns plain records, so a whole result page costs one CDP round trip
+# instead of one per selector per listing.
+EXTRACT_LISTINGS_JS = """
+(spec) => {
+    const firstMatch = (root, selectors, accept) => {
+        for (const selector of selectors) {
+            let elements;
+            try {
+                elements = root.querySelectorAll(selector);
+            } catch (e) {
+                continue;
+            }
+            for (const el of elements) {
+                if (accept(el)) return el;
+            }
+        }
+        return null;
+    };
+
+    let listings = [];
+    let listingSelector = null;
+    for (const selector of spec.listing) {
+        try {
+            listings = Array.from(document.querySelectorAll(selector));
+        } catch (e) {
+            listings = [];
+        }
+        if (listings.length) {
+            listingSelector = selector;
+            break;
+        }
+    }
+
+    const text = (el) => (el && el.textContent ? el.textContent.trim() : null);
+
+    return listings.slice(0, spec.limit).map((listing) => {
+        const titleEl = firstMatch(listing, spec.title,
+            (el) => (text(el) || '').length >= spec.min_title_length);
+        const priceEl = firstMatch(listing, spec.price, (el) => /\\d/.test(text(el) || ''));
+        const linkEl = listing.matches('a[href]') ? listing
+            : firstMatch(listing, spec.link, (el) => el.hasAttribute('href'));
+        const imageEl = firstMatch(listing, spec.image, () => true);
+        return {
+            title: text(titleEl),
+            price_text: text(priceEl),
+            href: linkEl ? linkEl.getAttribute('href') : null,
+            image: imageEl ? (imageEl.getAttribute('src') || imageEl.getAttribute('data-src')) : null,
+            listing_selector: listingSelector
+        };
+    });
+}
+"""
+
+
+async def extract_listings(page, spec: SelectorSpec) -> List[Dict]:
+    """Extract listing records from a page in a single evaluate call"""
+    return await page.evaluate(EXTRACT_LISTINGS_JS, asdict(spec))
+
+
+def _first_match(root, selectors: List[str], accept):
+    for selector in selectors:
+        try:
+            elements = root.select(selector)
+        except Exception:
+            continue
+        for element in elements:
+            if accept(element):
+                return element
+    return None
+
+
+def _text(element) -> Optional[str]:
+    if element is None:
+        return None
+    return element.get_text().strip()
+
+
+def parse_listings_html(html: str, spec: SelectorSpec) -> List[Dict]:
+    """Extract listing records from static HTML using the same selector spec.
+
+    Mirrors EXTRACT_LISTINGS_JS so the HTTP tier and the browser tier
+    produce identical records.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+
+    listings = []
+    listing_selector = None
+    for selector in spec.listing:
+        try:
+            listings = soup.select(selector)
+        except Exception:
+            listings = []
+        if listings:
+            listing_selector = selector
+            break
+
+    records = []
+    for listing in listings[:spec.limit]:
+        title_elem = _first_match(listing, spec.title,
+                                  lambda el: len(_text(el) or "") >= spec.min_title_length)
+        price_elem = _first_match(listing, spec.price, lambda el: bool(re.search(r'\d', _text(el) or "")))
+        if listing.name == "a" and listing.has_attr("href"):
+            link_elem = listing
+        else:
+            link_elem = _first_match(listing, spec.link, lambda el: el.has_attr("href"))
+        image_elem = _first_match(listing, spec.image, lambda el: True)
+        records.append({
+            "title": _text(title_elem),
+            "price_text": _text(price_elem),
+            "href": link_elem.get("href") if link_elem else None,
+            "image": (image_elem.get("src") or image_elem.get("data-src")) if image_elem else None,
+            "listing_selector": listing_selector
+        })
+    return records
@@ -0,0 +1,208 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Sequence
+
+from .base_scraper import BaseScraper, LegoSet
+from .deadline import Deadline
+from .health import get_store_health
+from .runtime import CachedResult, run_search, run_set_details
+
+
+# Maximum number of store/query scrapes running at once across the process
+FANOUT_MAX_CONCURRENCY = int(os.getenv("FANOUT_MAX_CONCURRENCY", "6"))
+# Default time budget for a single store scrape
+STORE_TIMEOUT_SECONDS = float(os.getenv("STORE_TIMEOUT_SECONDS", "20"))
+# Show a store's placeholder offers when it returns none; turn off in production
+SCRAPER_SAMPLE_FALLBACK = os.getenv("SCRAPER_SAMPLE_FALLBACK", "true").lower() == "true"
+
+STATUS_OK = "ok"
+STATUS_TIMEOUT = "timeout"
+STATUS_ERROR = "error"
+
+
+@dataclass
+class StoreResult:
+    """Outcome of one store/query scrape in a fan-out"""
+    store_name: str
+    query: str
+    sets: List[LegoSet] = field(default_factory=list)
+    status: str = STATUS_OK
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    # Age of the offers in seconds (0 for a fresh scrape) and whether they
+    # were served past their TTL while a refresh runs
+    age: float = 0.0
+    stale: bool = False
+    # The offers are the store's placeholders, not scraped ones
+    sample: bool = False
+
+
+_semaphore: Optional[asyncio.Semaphore] = None
+_semaphore_loop = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore, _semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _semaphore is None or _semaphore_loop is not loop:
+        _semaphore = asyncio.Semaphore(FANOUT_MAX_CONCURRENCY)
+        _semaphore_loop = loop
+    return _semaphore
+
+
+def store_timeout(scraper: BaseScraper) -> float:
+    """Per-store timeout, overridable with e.g. ALLEGRO_TIMEOUT_SECONDS"""
+    return float(os.getenv(f"{scraper.store_key.upper()}_TIMEOUT_SECONDS", STORE_TIMEOUT_SECONDS))
+
+
+def with_samples(scraper: BaseScraper, result: StoreResult, set_number: Optional[str] = None) -> StoreResult:
+    """Fill a store result without offers with the store's placeholder offers.
+
+    Samples only ever reach the API response; the cache, the offer writer
+    and price history see the scraped result. For a set lookup only the
+    samples of that set are used.
+    """
+    if result.sets or not SCRAPER_SAMPLE_FALLBACK:
+        return result
+    samples = scraper.sample_sets(result.query)
+    if set_number is not None:
+        samples = [sample for sample in samples if sample.set_number == set_number]
+    if samples:
+        print(f"{scraper.store_name}: no offers for '{result.query}', showing sample data")
+        result.sets = samples
+        result.sample = True
+    return result
+
+
+async def scrape_store(scraper: BaseScraper, query: str, timeout: Optional[float] = None,
+                       deadline: Optional[Deadline] = None) -> StoreResult:
+    """Run one store search under the global cap, its timeout and the request deadline"""
+    result = await _scrape_store(scraper, query, lambda: run_search(scraper, query, deadline), timeout, deadline)
+    return with_samples(scraper, result)
+
+
+async def lookup_store_set(scraper: BaseScraper, set_number: str, timeout: Optional[float] = None,
+                           deadline: Optional[Deadline] = None) -> StoreResult:
+    """Look every offer of one set up on a store, under the same limits as a search"""
+    query = f"lego {set_number}"
+    result = await _scrape_store(
+        scraper, query, lambda: run_set_details(scraper, set_number, deadline), timeout, deadline
+    )
+    return with_samples(scraper, result, set_number)
+
+
+async def _scrape_store(scraper: BaseScraper, query: str, scrape: Callable[[], Awaitable[CachedResult]],
+                        timeout: Optional[float], deadline: Optional[Deadline]) -> StoreResult:
+    timeout = timeout if timeout is not None else store_timeout(scraper)
+    # Cut short by the request deadline rather than by the store being slow
+    deadline_bound = deadline is not None and deadline.remaining() < timeout
+    if deadline is not None:
+        timeout = min(timeout, deadline.remaining())
+    started = time.monotonic()
+    async with _get_semaphore():
+        try:
+            result = await asyncio.wait_for(scrape(), timeout=timeout)
+            return StoreResult(scraper.store_name, query, result.sets, STATUS_OK, time.monotonic() - started,
+                               age=result.age, stale=result.stale)
+        except asyncio.TimeoutError:
+            print(f"{scraper.store_name} timed out after {timeout}s for '{query}'")
+            # The scrape was cancelled before it could report; count it against the store
+            if not deadline_bound:
+                get_store_health(scraper.store_key).record(False, time.monotonic() - started)
+            return StoreResult(scraper.store_name, query, [], STATUS_TIMEOUT, time.monotonic() - started)
+        except Exception as e:
+            print(f"{scraper.store_name} failed for '{query}': {e}")
+            return StoreResult(scraper.store_name, query, [], STATUS_ERROR, time.monotonic() - started, str(e))
+
+
+def _start_tasks(scrapers: Sequence[BaseScraper], queries: Sequence[str],
+                 timeout: Optional[float], deadline: Optional[Deadline]) -> List[asyncio.Task]:
+    return [
+        asyncio.create_task(scrape_store(scraper, query, timeout, deadline))
+        for query in queries
+        for scraper in scrapers
+    ]
+
+
+async def fan_out(scrapers: Sequence[BaseScraper], queries: Sequence[str],
+                  timeout: Optional[float] = None, deadline: Optional[Deadline] = None) -> List[StoreResult]:
+    """Scrape every store/query pair concurrently.
+
+    Results are returned in query-then-store order. Slow or failing stores
+    yield an empty result with a timeout/error status instead of failing
+    the whole request.
+    """
+    tasks = _start_tasks(scrapers, queries, timeout, deadline)
+    try:
+        return list(await asyncio.gather(*tasks))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def fan_out_set_details(scrapers: Sequence[BaseScraper], set_number: str,
+                              timeout: Optional[float] = None,
+                              deadline: Optional[Deadline] = None) -> List[StoreResult]:
+    """Look a set up on every store concurrently.
+
+    Stores read the set's indexed product page when they know it, instead
+    of running a full search. Results are returned in store order.
+    """
+    tasks = [
+        asyncio.create_task(lookup_store_set(scraper, set_number, timeout, deadline))
+        for scraper in scrapers
+    ]
+    try:
+        return list(await asyncio.gather(*tasks))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def iter_fan_out(scrapers: Sequence[BaseScraper], queries: Sequence[str],
+                       timeout: Optional[float] = None,
+                       deadline: Optional[Deadline] = None) -> AsyncIterator[StoreResult]:
+    """Like fan_out, but yield each store result as soon as it completes"""
+    tasks = _start_tasks(scrapers, queries, timeout, deadline)
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Stop remaining scrapes if the consumer goes away early
+        for task in tasks:
+            task.cancel()
+
+
+def combine_sets(results: Sequence[StoreResult]) -> List[LegoSet]:
+    """Flatten store results into a single list of offers"""
+    combined = []
+    for result in results:
+        combined.extend(result.sets)
+    return combined
+
+
+def summarize_freshness(results: Sequence[StoreResult]) -> dict:
+    """Overall data freshness of a fan-out for API responses"""
+    return {
+        "max_age_seconds": round(max((r.age for r in results), default=0.0)),
+        "stale": any(r.stale for r in results)
+    }
+
+
+def summarize_stores(results: Sequence[StoreResult]) -> List[dict]:
+    """Per-store status for API responses"""
+    return [
+        {
+            "store_name": result.store_name,
+            "query": result.query,
+            "status": result.status,
+            "results": len(result.sets),
+            "elapsed_ms": round(result.elapsed * 1000),
+            "age_seconds": round(result.age),
+            "stale": result.stale,
+            "sample": result.sample
+        }
+        for result in results
+    ]
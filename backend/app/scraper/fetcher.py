@@ -0,0 +1,152 @@
+import asyncio
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+
+from .deadline import Deadline, timeout_seconds
+from .extraction import SelectorSpec, parse_listings_html
+from .throttle import THROTTLE_STATUS_CODES, StoreThrottled
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+HTTP_TIER_ENABLED = os.getenv("SCRAPER_HTTP_FIRST", "true").lower() == "true"
+HTTP_TIMEOUT_SECONDS = float(os.getenv("SCRAPER_HTTP_TIMEOUT", "10"))
+
+DEFAULT_HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'pl-PL,pl;q=0.9,en;q=0.8',
+}
+
+# Markers of bot challenges and client-side-only pages
+JS_WALL_MARKERS = [
+    "enable javascript",
+    "włącz javascript",
+    "captcha",
+    "cf-challenge",
+    "__cf_chl",
+    "datadome",
+    "px-captcha",
+]
+
+TIER_HTTP = "http"
+TIER_BROWSER = "browser"
+
+
+@dataclass
+class FetchResult:
+    """Listing records together with the tier that produced them"""
+    records: List[Dict]
+    tier: str
+    escalation_reason: Optional[str] = None
+
+
+@dataclass
+class TierStats:
+    """Counters of which fetch tier served a store's requests"""
+    served: Dict[str, int] = field(default_factory=lambda: {TIER_HTTP: 0, TIER_BROWSER: 0})
+    escalations: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, result: FetchResult):
+        self.served[result.tier] = self.served.get(result.tier, 0) + 1
+        if result.escalation_reason:
+            self.escalations[result.escalation_reason] = self.escalations.get(result.escalation_reason, 0) + 1
+
+    def to_dict(self) -> Dict:
+        total = sum(self.served.values())
+        return {
+            "served": dict(self.served),
+            "http_ratio": self.served.get(TIER_HTTP, 0) / total if total else 0.0,
+            "escalations": dict(self.escalations),
+        }
+
+
+# Tier stats per store key
+tier_stats: Dict[str, TierStats] = {}
+
+
+def get_tier_stats(store_key: str) -> TierStats:
+    if store_key not in tier_stats:
+        tier_stats[store_key] = TierStats()
+    return tier_stats[store_key]
+
+
+def detect_js_wall(html: str) -> bool:
+    """Return True if the HTML looks like a bot challenge or a JS-only shell"""
+    lowered = html.lower()
+    return any(marker in lowered for marker in JS_WALL_MARKERS)
+
+
+class HttpFetcher:
+    """Pooled keep-alive HTTP client (HTTP/2 when available)"""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # A client's connection pool belongs to the loop it was created on
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                headers=DEFAULT_HTTP_HEADERS,
+                timeout=HTTP_TIMEOUT_SECONDS,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+            )
+            self._loop = loop
+        return self._client
+
+    async def get(self, url: str, headers: Optional[Dict] = None,
+                  timeout: Optional[float] = None) -> httpx.Response:
+        if timeout is None:
+            return await self._get_client().get(url, headers=headers)
+        return await self._get_client().get(url, headers=headers, timeout=timeout)
+
+    async def close(self):
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+
+
+# Shared HTTP client used by all scrapers in this process
+http_fetcher = HttpFetcher()
+
+
+async def fetch_listings_http(url: str, spec: SelectorSpec, headers: Optional[Dict] = None,
+                              deadline: Optional[Deadline] = None) -> FetchResult:
+    """Fetch a result page over plain HTTP and parse it.
+
+    Returns an empty result with an escalation reason when the response
+    cannot be used, so the caller can fall back to the browser; a bot
+    challenge counts as unusable even when served with a 403. A 429, or a
+    403 without a challenge, raises StoreThrottled instead: the store is
+    pushing back, and a browser request would only add load.
+    """
+    timeout = timeout_seconds(deadline, HTTP_TIMEOUT_SECONDS)
+    try:
+        response = await http_fetcher.get(url, headers=headers, timeout=timeout)
+    except Exception as e:
+        return FetchResult([], TIER_HTTP, f"http_error:{type(e).__name__}")
+
+    if response.status_code in THROTTLE_STATUS_CODES:
+        if response.status_code == 403 and detect_js_wall(response.text):
+            return FetchResult([], TIER_HTTP, "js_wall")
+        raise StoreThrottled(response.status_code)
+    if response.status_code != 200:
+        return FetchResult([], TIER_HTTP, f"status_{response.status_code}")
+
+    # Parsing is CPU-bound; keep it off the event loop
+    records = await asyncio.to_thread(parse_listings_html, response.text, spec)
+    if not records:
+        reason = "js_wall" if detect_js_wall(response.text) else "empty_parse"
+        return FetchResult([], TIER_HTTP, reason)
+    return FetchResult(records, TIER_HTTP)
@@ -0,0 +1,147 @@
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+# Consecutive failed fetches that open a store's circuit
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+# How long an open circuit fails fast before letting a probe through
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "1"))
+# Rolling window used for success rates and latency percentiles
+HEALTH_WINDOW_SIZE = int(os.getenv("HEALTH_WINDOW_SIZE", "200"))
+HEALTH_WINDOW_SECONDS = float(os.getenv("HEALTH_WINDOW_SECONDS", "900"))
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Service status reported by /health for each circuit state
+SERVICE_STATUS = {
+    STATE_CLOSED: "available",
+    STATE_HALF_OPEN: "degraded",
+    STATE_OPEN: "unavailable",
+}
+
+
+class CircuitOpen(Exception):
+    """Raised instead of contacting a store whose circuit is open"""
+
+    def __init__(self, store_key: str):
+        super().__init__(f"circuit open for {store_key}")
+        self.store_key = store_key
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with half-open probing"""
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_RESET_SECONDS,
+                 half_open_probes: int = CIRCUIT_HALF_OPEN_PROBES):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.half_open_probes = half_open_probes
+        self._state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.opens = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == STATE_OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self._state = STATE_HALF_OPEN
+            self.probes_in_flight = 0
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go to the store now; half-open admits a few probes"""
+        state = self.state
+        if state == STATE_CLOSED:
+            return True
+        if state == STATE_HALF_OPEN and self.probes_in_flight < self.half_open_probes:
+            self.probes_in_flight += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self._state = STATE_CLOSED
+        self.probes_in_flight = 0
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self._state == STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self._state != STATE_OPEN:
+                self.opens += 1
+            self._state = STATE_OPEN
+            self.opened_at = time.monotonic()
+            self.probes_in_flight = 0
+
+    def abandon(self):
+        """A call admitted by allow() ended without an outcome (e.g. cancelled)"""
+        if self._state == STATE_HALF_OPEN and self.probes_in_flight:
+            self.probes_in_flight -= 1
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+class StoreHealth:
+    """Circuit breaker plus rolling success and latency samples of one store"""
+
+    def __init__(self, store_key: str):
+        self.store_key = store_key
+        self.breaker = CircuitBreaker()
+        self._samples = deque(maxlen=HEALTH_WINDOW_SIZE)
+
+    def record(self, ok: bool, latency: float):
+        self._samples.append((time.time(), ok, latency))
+        previous = self.breaker.state
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        if self.breaker.state != previous:
+            print(f"{self.store_key}: circuit {previous} -> {self.breaker.state}")
+
+    def _recent(self):
+        cutoff = time.time() - HEALTH_WINDOW_SECONDS
+        return [sample for sample in self._samples if sample[0] >= cutoff]
+
+    def service_status(self) -> str:
+        return SERVICE_STATUS[self.breaker.state]
+
+    def to_dict(self) -> Dict:
+        recent = self._recent()
+        latencies = [latency for _, _, latency in recent]
+        p50 = percentile(latencies, 0.5)
+        p95 = percentile(latencies, 0.95)
+        return {
+            "circuit": self.breaker.state,
+            "success_rate": sum(1 for _, ok, _ in recent if ok) / len(recent) if recent else None,
+            "samples": len(recent),
+            "p50_ms": round(p50 * 1000) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000) if p95 is not None else None,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "opens": self.breaker.opens,
+            "rejected": self.breaker.rejected,
+        }
+
+
+# Health per store key
+health_registry: Dict[str, StoreHealth] = {}
+
+
+def get_store_health(store_key: str) -> StoreHealth:
+    if store_key not in health_registry:
+        health_registry[store_key] = StoreHealth(store_key)
+    return health_registry[store_key]
@@ -1,9 +1,9 @@
-import asyncio
-from typing import List, Optional
-from datetime import datetime
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
 import re
-from playwright.async_api import async_playwright
 from .base_scraper import BaseScraper, LegoSet
+from .deadline import Deadline
+from .extraction import SelectorSpec, extract_listings
 
 
 class OlxScraper(BaseScraper):
@@ -12,175 +12,150 @@ class OlxScraper(BaseScraper):
     def __init__(self):
         super().__init__("OLX")
         self.base_url = "https://www.olx.pl"
+        # Set user agent to avoid detection
+        self.context_options = {
+            "user_agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }
+        # Listing pages are server-rendered, so try plain HTTP first
+        self.http_first = True
+        self.consent_selectors = [
+            '#onetrust-accept-btn-handler',
+            '[data-testid="cookies-popup-accept"]'
+        ]
+        # Lean navigation: OLX "ninja" tracking is not needed for listings
+        if self.resource_policy:
+            self.resource_policy.blocked_domains += ['ninja.data.olxcdn.com', 'tracking.olx-st.com']
+            self.resource_policy.allowed_domains += ['cookielaw.org']
+        # Containers that hold the search results, in order of preference
+        self.result_containers = [
+            '[data-testid="listing-grid"]',
+            '.listing-grid',
+            '.search-results',
+            '.products-grid',
+            '[data-role="search-results"]',
+            '.offers-list'
+        ]
+        self.selector_spec = SelectorSpec(
+            listing=[f'{selector} > div, {selector} > article, {selector} > li' for selector in self.result_containers] + [
+                # Fallback: try to find any product cards
+                '[data-testid*="product"], .product-card, .listing-item, article, .offer'
+            ],
+            title=['h6', 'h5', 'h4', '.title', '[data-testid="title"]', '.product-title', '.offer-title'],
+            price=['[data-testid="ad-price"]', '.price', '.product-price', '.listing-price', '.offer-price'],
+            link=['a', '[data-testid="link"]', '.product-link', '.offer-link']
+        )
+        # OLX classifieds change less often
+        self.cache_ttl = 600
+        # OLX serves static HTML and tolerates a higher request rate
+        self.rate_limit = 2.0
+        self.max_concurrency = 6
     
-    async def search_sets(self, query: str) -> List[LegoSet]:
+    async def search_sets(self, query: str, deadline: Optional[Deadline] = None) -> List[LegoSet]:
         """Search for LEGO sets on OLX"""
-        sets = []
+        # Search for LEGO sets on OLX
+        records = await self.fetch_listings(self.search_url(query), deadline)
+        print(f"Found {len(records)} potential listings on OLX")
+        sets = await self.parse_records(records, query)
         
-        try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                page = await browser.new_page()
-                
-                # Set user agent to avoid detection
-                await page.set_extra_http_headers({
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                })
-                
-                # Search for LEGO sets on OLX
-                search_url = f"{self.base_url}/d/ogloszenia/q-{query.replace(' ', '-')}/"
-                await page.goto(search_url, wait_until='networkidle')
-                
-                # Try multiple selectors for results
-                selectors = [
-                    '[data-testid="listing-grid"]',
-                    '.listing-grid',
-                    '.search-results',
-                    '.products-grid',
-                    '[data-role="search-results"]',
-                    '.offers-list'
-                ]
-                
-                listings = []
-                for selector in selectors:
-                    try:
-                        await page.wait_for_selector(selector, timeout=5000)
-                        listings = await page.query_selector_all(f'{selector} > div, {selector} > article, {selector} > li')
-                        if listings:
-                            break
-                    except:
-                        continue
-                
-                if not listings:
-                    # Fallback: try to find any product cards
-                    listings = await page.query_selector_all('[data-testid*="product"], .product-card, .listing-item, article, .offer')
-                
-                print(f"Found {len(listings)} potential listings on OLX")
-                
-                for listing in listings[:10]:  # Limit to first 10 results
-                    try:
-                        # Try multiple selectors for title
-                        title_selectors = ['h6', 'h5', 'h4', '.title', '[data-testid="title"]', '.product-title', '.offer-title']
-                        title_elem = None
-                        for selector in title_selectors:
-                            title_elem = await listing.query_selector(selector)
-                            if title_elem:
-                                break
-                        
-                        # Try multiple selectors for price
-                        price_selectors = ['[data-testid="ad-price"]', '.price', '.product-price', '.listing-price', '.offer-price']
-                        price_elem = None
-                        for selector in price_selectors:
-                            price_elem = await listing.query_selector(selector)
-                            if price_elem:
-                                break
-                        
-                        # Try multiple selectors for link
-                        link_selectors = ['a', '[data-testid="link"]', '.product-link', '.offer-link']
-                        link_elem = None
-                        for selector in link_selectors:
-                            link_elem = await listing.query_selector(selector)
-                            if link_elem:
-                                break
-                        
-                        if not all([title_elem, price_elem, link_elem]):
-                            continue
-                        
-                        title = await title_elem.text_content()
-                        price_text = await price_elem.text_content()
-                        link = await link_elem.get_attribute('href')
-                        
-                        if not title or not price_text:
-                            continue
-                        
-                        # Parse set number from title
-                        set_number = self._extract_set_number(title)
-                        if not set_number:
-                            continue
-                        
-                        # Parse price
-                        price = self._parse_price(price_text)
-                        if not price:
-                            continue
-                        
-                        # Calculate shipping (OLX often has local pickup or shipping)
-                        shipping = await self.get_shipping_cost(price)
-                        total_price = self.calculate_total_price(price, shipping)
-                        
-                        # Determine if new or used
-                        condition = "new" if "nowy" in title.lower() else "used"
-                        
-                        lego_set = LegoSet(
-                            set_number=set_number,
-                            name=title.strip(),
-                            price=price,
-                            shipping_cost=shipping,
-                            total_price=total_price,
-                            store_name=self.store_name,
-                            store_url=f"{self.base_url}{link}" if link.startswith('/') else link,
-                            condition=condition,
-                            availability=True,
-                            last_updated=datetime.now()
-                        )
-                        
-                        sets.append(lego_set)
-                        
-                    except Exception as e:
-                        print(f"Error parsing OLX listing: {e}")
-                        continue
-                
-                await browser.close()
+        print(f"OLX scraper finished with {len(sets)} results")
+        return sets
+    
+    def sample_sets(self, query: str) -> List[LegoSet]:
+        """Mock OLX offers for testing without network access"""
+        return [
+            LegoSet(
+                set_number="42100",
+                name="LEGO Technic 42100 Koparka Liebherr R 9800 - Używane",
+                price=2000.0,
+                shipping_cost=20.0,
+                total_price=2020.0,
+                store_name=self.store_name,
+                store_url=f"{self.base_url}/d/ogloszenie/lego-technic-42100-koparka-liebherr-r-9800-ID123456.html",
+                condition="used",
+                availability=True,
+                last_updated=datetime.now(timezone.utc)
+            ),
+            LegoSet(
+                set_number="75362",
+                name="LEGO Star Wars 75362 Imperial Shuttle - Nowy",
+                price=170.0,
+                shipping_cost=10.0,
+                total_price=180.0,
+                store_name=self.store_name,
+                store_url=f"{self.base_url}/d/ogloszenie/lego-star-wars-75362-imperial-shuttle-ID789012.html",
+                condition="new",
+                availability=True,
+                last_updated=datetime.now(timezone.utc)
+            )
+        ]
+    
+    def search_url(self, query: str, page_number: int = 1) -> str:
+        url = f"{self.base_url}/d/ogloszenia/q-{query.replace(' ', '-')}/"
+        return url if page_number == 1 else f"{url}?page={page_number}"
+    
+    async def records_to_sets(self, records: List[Dict], query: str, offset: int = 0) -> List[LegoSet]:
+        sets = []
+        for record in records:
+            try:
+                lego_set = await self._record_to_set(record)
+                if lego_set:
+                    sets.append(lego_set)
+            except Exception as e:
+                print(f"Error parsing OLX listing: {e}")
+                continue
+        return sets
+    
+    async def fetch_listings_browser(self, url: str, deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Load a OLX result page and extract listing records"""
+        async with self.page() as page:
+            await self.navigate(page, url, deadline, wait_until='domcontentloaded')
+            
+            # Wait for whichever result container renders first, then for its listings to settle
+            if await self.wait_for_results(page, self.result_containers, deadline):
+                await self.wait_for_listings(page, deadline)
+            
+            # Extract all listings in a single round trip
+            return await extract_listings(page, self.learned_selector_spec)
+    
+    async def _record_to_set(self, record: Dict) -> Optional[LegoSet]:
+        """Build a LegoSet from an extracted listing record"""
+        title = record.get("title")
+        price_text = record.get("price_text")
+        link = record.get("href")
         
-        except Exception as e:
-            print(f"Error in OLX scraper: {e}")
+        if not title or not price_text or not link:
+            return None
         
-        print(f"OLX scraper finished with {len(sets)} results")
+        # Parse set number from title
+        set_number = self._extract_set_number(title)
+        if not set_number:
+            return None
         
-        # If no real results found, return mock data for testing
-        if not sets:
-            print("No real results found, returning mock data for testing")
-            mock_sets = [
-                LegoSet(
-                    set_number="42100",
-                    name="LEGO Technic 42100 Koparka Liebherr R 9800 - Używane",
-                    price=2000.0,
-                    shipping_cost=20.0,
-                    total_price=2020.0,
-                    store_name=self.store_name,
-                    store_url=f"{self.base_url}/d/ogloszenie/lego-technic-42100-koparka-liebherr-r-9800-ID123456.html",
-                    condition="used",
-                    availability=True,
-                    last_updated=datetime.now()
-                ),
-                LegoSet(
-                    set_number="75362",
-                    name="LEGO Star Wars 75362 Imperial Shuttle - Nowy",
-                    price=170.0,
-                    shipping_cost=10.0,
-                    total_price=180.0,
-                    store_name=self.store_name,
-                    store_url=f"{self.base_url}/d/ogloszenie/lego-star-wars-75362-imperial-shuttle-ID789012.html",
-                    condition="new",
-                    availability=True,
-                    last_updated=datetime.now()
-                )
-            ]
-            return mock_sets
+        # Parse price
+        price = self._parse_price(price_text)
+        if not price:
+            return None
         
-        return sets
-    
-    async def get_set_details(self, set_number: str) -> Optional[LegoSet]:
-        """Get detailed information about specific LEGO set"""
-        # Implementation for getting specific set details
-        query = f"lego {set_number}"
-        results = await self.search_sets(query)
+        # Calculate shipping (OLX often has local pickup or shipping)
+        shipping = await self.get_shipping_cost(price)
+        total_price = self.calculate_total_price(price, shipping)
         
-        # Return the first result that matches the set number exactly
-        for result in results:
-            if result.set_number == set_number:
-                return result
+        # Determine if new or used
+        condition = "new" if "nowy" in title.lower() else "used"
         
-        return None
+        return LegoSet(
+            set_number=set_number,
+            name=title.strip(),
+            price=price,
+            shipping_cost=shipping,
+            total_price=total_price,
+            store_name=self.store_name,
+            store_url=f"{self.base_url}{link}" if link.startswith('/') else link,
+            condition=condition,
+            availability=True,
+            last_updated=datetime.now(timezone.utc),
+            image_url=record.get("image")
+        )
     
     async def get_shipping_cost(self, price: float, location: str = "PL") -> float:
         """Calculate shipping cost for OLX"""
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from .health import percentile
+
+LANE_INTERACTIVE = "interactive"
+LANE_BACKGROUND = "background"
+LANES = (LANE_INTERACTIVE, LANE_BACKGROUND)
+
+# Lane of the work running in the current task; user requests by default
+current_lane: ContextVar[str] = ContextVar("scrape_lane", default=LANE_INTERACTIVE)
+
+_WAIT_SAMPLES = 500
+
+
+@contextmanager
+def priority_lane(lane: str):
+    """Run the enclosed work, and tasks it creates, in a priority lane"""
+    token = current_lane.set(lane)
+    try:
+        yield
+    finally:
+        current_lane.reset(token)
+
+
+class LaneStats:
+    """Queue-wait samples of one lane"""
+
+    def __init__(self):
+        self.acquired = 0
+        self.queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._recent = deque(maxlen=_WAIT_SAMPLES)
+
+    def record(self, wait: float, queued: bool):
+        self.acquired += 1
+        self.queued += int(queued)
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self._recent.append(wait)
+
+    def to_dict(self) -> Dict:
+        p95 = percentile(list(self._recent), 0.95)
+        return {
+            "acquired": self.acquired,
+            "queued": self.queued,
+            "avg_wait_ms": round(self.total_wait / self.acquired * 1000) if self.acquired else 0,
+            "p95_wait_ms": round(p95 * 1000) if p95 is not None else 0,
+            "max_wait_ms": round(self.max_wait * 1000),
+        }
+
+
+class PriorityGate:
+    """Capacity limiter with an interactive and a background lane.
+
+    ``reserved`` slots can only be used by interactive work, so background
+    crawls never take the whole pool. Whenever a slot frees up, queued
+    interactive work is admitted before any queued background work.
+    """
+
+    def __init__(self, capacity: int, reserved: int):
+        self.capacity = capacity
+        self.reserved = min(reserved, capacity - 1) if capacity > 1 else 0
+        self.in_use = {lane: 0 for lane in LANES}
+        self._waiters = {lane: deque() for lane in LANES}
+        self.stats = {lane: LaneStats() for lane in LANES}
+
+    def _has_room(self, lane: str) -> bool:
+        if sum(self.in_use.values()) >= self.capacity:
+            return False
+        if lane == LANE_BACKGROUND:
+            return (
+                self.in_use[LANE_BACKGROUND] < self.capacity - self.reserved
+                and not self._waiters[LANE_INTERACTIVE]
+            )
+        return True
+
+    async def acquire(self, lane: str):
+        started = time.monotonic()
+        if not self._waiters[lane] and self._has_room(lane):
+            self.in_use[lane] += 1
+            self.stats[lane].record(0.0, queued=False)
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we were cancelled; hand the slot on
+                self.release(lane)
+            elif waiter in self._waiters[lane]:
+                self._waiters[lane].remove(waiter)
+            raise
+        self.stats[lane].record(time.monotonic() - started, queued=True)
+
+    def release(self, lane: str):
+        self.in_use[lane] = max(self.in_use[lane] - 1, 0)
+        self._grant()
+
+    def _grant(self):
+        for lane in LANES:
+            waiters = self._waiters[lane]
+            while waiters and self._has_room(lane):
+                waiter = waiters.popleft()
+                if waiter.done():
+                    continue
+                self.in_use[lane] += 1
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, lane: Optional[str] = None):
+        """Hold a slot in ``lane``, by default the lane of the current task"""
+        lane = lane or current_lane.get()
+        await self.acquire(lane)
+        try:
+            yield lane
+        finally:
+            self.release(lane)
+
+    def to_dict(self) -> Dict:
+        return {
+            "capacity": self.capacity,
+            "reserved_interactive": self.reserved,
+            "lanes": {
+                lane: {
+                    "in_use": self.in_use[lane],
+                    "waiting": len(self._waiters[lane]),
+                    **self.stats[lane].to_dict()
+                }
+                for lane in LANES
+            },
+        }
+
@@ -0,0 +1,99 @@
+import json
+import os
+import re
+import time
+from typing import Dict, Iterable, Optional
+
+# How long an indexed product URL is trusted before falling back to search
+PRODUCT_INDEX_TTL = float(os.getenv("PRODUCT_INDEX_TTL", str(7 * 24 * 3600)))
+
+SET_NUMBER_PATTERN = re.compile(r"^\d{4,6}$")
+
+
+class ProductIndex:
+    """Persisted map of set numbers to a store's product page.
+
+    Learned from search results of stores whose results link to product
+    pages listing every offer of a set (not to single sellers' ads), so set
+    lookups can fetch one targeted page instead of running a search. Entries expire after ``ttl`` seconds and
+    are dropped as soon as their page stops yielding the set.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = PRODUCT_INDEX_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.entries: Dict[str, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def get(self, set_number: str) -> Optional[str]:
+        entry = self.entries.get(set_number)
+        if entry is None or time.time() - entry["indexed_at"] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["url"]
+
+    def learn(self, sets: Iterable) -> int:
+        """Index the URLs of search results; returns how many were added"""
+        now = time.time()
+        added = 0
+        for lego_set in sets:
+            if not SET_NUMBER_PATTERN.match(lego_set.set_number) or not lego_set.store_url:
+                continue
+            entry = self.entries.get(lego_set.set_number)
+            if entry is not None and now - entry["indexed_at"] <= self.ttl:
+                continue
+            self.entries[lego_set.set_number] = {"url": lego_set.store_url, "indexed_at": now}
+            added += 1
+        if added:
+            self._save()
+        return added
+
+    def evict(self, set_number: str):
+        if self.entries.pop(set_number, None) is not None:
+            self.evictions += 1
+            self._save()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable product index {self.path}: {e}")
+            self.entries = {}
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save product index {self.path}: {e}")
+
+    def to_dict(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+product_indexes: Dict[str, ProductIndex] = {}
+
+
+def get_product_index(store_key: str, path: Optional[str] = None) -> ProductIndex:
+    if store_key not in product_indexes:
+        product_indexes[store_key] = ProductIndex(path)
+    return product_indexes[store_key]
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Dict, List, Sequence
+
+from .health import percentile
+
+# Hard upper bound on waiting for a result page to settle, in milliseconds
+READY_TIMEOUT_MS = int(os.getenv("SCRAPER_READY_TIMEOUT_MS", "8000"))
+# How often the listing count is sampled while waiting
+READY_POLL_MS = int(os.getenv("SCRAPER_READY_POLL_MS", "200"))
+# Consecutive samples with an unchanged count that mean the page is ready
+READY_STABLE_POLLS = int(os.getenv("SCRAPER_READY_STABLE_POLLS", "2"))
+READY_SAMPLES = 500
+
+READY_STABLE = "stable"
+READY_TIMEOUT = "timeout"
+READY_EMPTY = "empty"
+
+# Runs inside the page: number of elements matched by the first listing
+# selector that matches anything, the same way extraction picks it
+COUNT_LISTINGS_JS = """
+(selectors) => {
+    for (const selector of selectors) {
+        try {
+            const count = document.querySelectorAll(selector).length;
+            if (count) return count;
+        } catch (e) {}
+    }
+    return 0;
+}
+"""
+
+
+class ReadinessStats:
+    """Time-to-ready samples of one store's result pages"""
+
+    def __init__(self):
+        self.outcomes = {READY_STABLE: 0, READY_TIMEOUT: 0, READY_EMPTY: 0}
+        self._recent = deque(maxlen=READY_SAMPLES)
+
+    def record(self, outcome: str, elapsed: float):
+        self.outcomes[outcome] += 1
+        self._recent.append(elapsed)
+
+    def to_dict(self) -> Dict:
+        samples: List[float] = list(self._recent)
+        p50 = percentile(samples, 0.5)
+        p95 = percentile(samples, 0.95)
+        return {
+            "outcomes": dict(self.outcomes),
+            "p50_ms": round(p50 * 1000) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000) if p95 is not None else None,
+            "max_ms": round(max(samples) * 1000) if samples else None,
+        }
+
+
+readiness_stats: Dict[str, ReadinessStats] = {}
+
+
+def get_readiness_stats(store_key: str) -> ReadinessStats:
+    if store_key not in readiness_stats:
+        readiness_stats[store_key] = ReadinessStats()
+    return readiness_stats[store_key]
+
+
+async def wait_until_ready(page, selectors: Sequence[str], timeout: int = READY_TIMEOUT_MS,
+                           poll: int = READY_POLL_MS, stable_polls: int = READY_STABLE_POLLS):
+    """Wait until the listings on a page stop changing, at most ``timeout`` ms.
+
+    Ready means a non-zero listing count that held for ``stable_polls``
+    consecutive samples. Returns ``(outcome, elapsed_seconds, count)``.
+    """
+    started = time.monotonic()
+    give_up_at = started + timeout / 1000
+    last_count = None
+    unchanged = 0
+    while True:
+        try:
+            count = await page.evaluate(COUNT_LISTINGS_JS, list(selectors))
+        except Exception:
+            # Page still navigating or its context was replaced; sample again
+            count = 0
+        if count and count == last_count:
+            unchanged += 1
+            if unchanged >= stable_polls:
+                return READY_STABLE, time.monotonic() - started, count
+        else:
+            unchanged = 0
+        last_count = count
+
+        remaining = give_up_at - time.monotonic()
+        if remaining <= 0:
+            outcome = READY_TIMEOUT if count else READY_EMPTY
+            return outcome, time.monotonic() - started, count
+        await asyncio.sleep(min(poll / 1000, remaining))
@@ -0,0 +1,130 @@
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+
+# Whether scrapers block heavy resources and trackers while navigating
+LEAN_MODE_ENABLED = os.getenv("SCRAPER_LEAN_MODE", "true").lower() == "true"
+
+# Rough average transfer sizes used to estimate bytes saved by blocking
+ESTIMATED_RESOURCE_BYTES = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 30_000,
+    "stylesheet": 20_000,
+    "script": 30_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+    "other": 5_000,
+}
+
+DEFAULT_BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+# Analytics, ads and tag managers that never contribute listing data
+DEFAULT_BLOCKED_DOMAINS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "facebook.net",
+    "facebook.com",
+    "hotjar.com",
+    "criteo.com",
+    "criteo.net",
+    "gemius.pl",
+    "adform.net",
+    "scorecardresearch.com",
+    "tiktok.com",
+    "bing.com",
+]
+
+
+def _host_matches(host: str, domains: List[str]) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+class ResourceStats:
+    """Counters of requests allowed and blocked for one store"""
+
+    def __init__(self):
+        self.allowed = 0
+        self.blocked = 0
+        self.blocked_by_type: Dict[str, int] = {}
+        self.blocked_by_reason: Dict[str, int] = {}
+        self.estimated_bytes_saved = 0
+
+    def record_allowed(self):
+        self.allowed += 1
+
+    def record_blocked(self, resource_type: str, reason: str):
+        self.blocked += 1
+        self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+        self.blocked_by_reason[reason] = self.blocked_by_reason.get(reason, 0) + 1
+        self.estimated_bytes_saved += ESTIMATED_RESOURCE_BYTES.get(resource_type, ESTIMATED_RESOURCE_BYTES["other"])
+
+    def to_dict(self) -> Dict:
+        total = self.allowed + self.blocked
+        return {
+            "allowed": self.allowed,
+            "blocked": self.blocked,
+            "blocked_ratio": self.blocked / total if total else 0.0,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "blocked_by_reason": dict(self.blocked_by_reason),
+            "estimated_bytes_saved": self.estimated_bytes_saved,
+        }
+
+
+# Stats per store key, shared by all pages of that store
+resource_stats: Dict[str, ResourceStats] = {}
+
+
+def get_resource_stats(store_key: str) -> ResourceStats:
+    if store_key not in resource_stats:
+        resource_stats[store_key] = ResourceStats()
+    return resource_stats[store_key]
+
+
+@dataclass
+class ResourcePolicy:
+    """Request interception rules for lean navigation.
+
+    Documents are always loaded. Hosts in ``allowed_domains`` are never
+    blocked (e.g. a consent provider), then hosts in ``blocked_domains`` and
+    resources of ``blocked_resource_types`` are aborted.
+    """
+    blocked_resource_types: Set[str] = field(default_factory=lambda: set(DEFAULT_BLOCKED_RESOURCE_TYPES))
+    blocked_domains: List[str] = field(default_factory=lambda: list(DEFAULT_BLOCKED_DOMAINS))
+    allowed_domains: List[str] = field(default_factory=list)
+
+    def block_reason(self, resource_type: str, url: str) -> Optional[str]:
+        """Return why a request should be blocked, or None to let it through"""
+        if resource_type == "document":
+            return None
+        host = (urlparse(url).hostname or "").lower()
+        if _host_matches(host, self.allowed_domains):
+            return None
+        if _host_matches(host, self.blocked_domains):
+            return "domain"
+        if resource_type in self.blocked_resource_types:
+            return "resource_type"
+        return None
+
+    async def install(self, page, stats: ResourceStats):
+        """Route all requests of a page through this policy"""
+        async def handle(route):
+            request = route.request
+            reason = self.block_reason(request.resource_type, request.url)
+            try:
+                if reason:
+                    stats.record_blocked(request.resource_type, reason)
+                    await route.abort()
+                else:
+                    stats.record_allowed()
+                    await route.continue_()
+            except Exception:
+                # The page may have navigated away or closed in the meantime
+                pass
+
+        await page.route("**/*", handle)
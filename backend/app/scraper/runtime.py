@@ -0,0 +1,164 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..database.offer_writer import offer_writer
+from .base_scraper import BaseScraper, LegoSet
+from .cache import CACHE_NEGATIVE_TTL, CacheEntry, cache_key, scrape_cache
+from .deadline import Deadline
+from .priority import LANE_BACKGROUND, priority_lane
+from .singleflight import Singleflight
+
+
+@dataclass
+class CachedResult:
+    """Offers from a store together with how old they are"""
+    sets: List[LegoSet] = field(default_factory=list)
+    age: float = 0.0
+    stale: bool = False
+    cached: bool = False
+
+
+class RefreshStats:
+    """Counters for stale-while-revalidate background refreshes"""
+
+    def __init__(self):
+        self.stale_served = 0
+        self.early_refreshes = 0
+        self.background_refreshes = 0
+        self.refresh_failures = 0
+
+    def to_dict(self) -> Dict:
+        return dict(self.__dict__)
+
+
+refresh_stats = RefreshStats()
+
+# Identical in-flight scrapes, keyed by cache key, share one execution
+scrape_flight = Singleflight()
+
+# Runs a store scrape, optionally bounded by a request deadline
+Scrape = Callable[[Optional[Deadline]], Awaitable[List[LegoSet]]]
+
+# Background refreshes in flight, one per cache key
+_refreshing: Dict[str, asyncio.Task] = {}
+
+
+def cache_ttl_for(scraper: BaseScraper) -> float:
+    """Cache TTL of a store, overridable with e.g. OLX_CACHE_TTL"""
+    return float(os.getenv(f"{scraper.store_key.upper()}_CACHE_TTL", scraper.cache_ttl))
+
+
+async def _scrape_and_store(scraper: BaseScraper, key: str, scrape: Scrape,
+                            deadline: Optional[Deadline] = None) -> CacheEntry:
+    """Scrape and cache a result, joining an identical scrape if one is running.
+
+    Coalesced callers share the deadline of the caller that started the
+    scrape. A result produced after its deadline ran out may be a partial
+    fallback, so it is returned but not cached. A failed scrape is cached
+    as an empty result for the negative TTL, unless an earlier result can
+    still be served, so that a failing store is not retried on every request.
+    """
+    async def execute():
+        started = time.monotonic()
+        try:
+            sets = await scrape(deadline)
+        except asyncio.TimeoutError:
+            # Out of time, not a store failure
+            raise
+        except Exception:
+            if await scrape_cache.get(key) is None:
+                await scrape_cache.set(key, [], CACHE_NEGATIVE_TTL)
+            raise
+        offer_writer.submit(sets)
+        if deadline is not None and deadline.expired:
+            return CacheEntry(list(sets), time.time(), 0.0)
+        return await scrape_cache.set(
+            key, sets, cache_ttl_for(scraper), compute_time=time.monotonic() - started
+        )
+
+    return await scrape_flight.do(key, execute)
+
+
+def _schedule_refresh(scraper: BaseScraper, key: str, scrape: Scrape):
+    """Start a background refresh for a key unless one is already running"""
+    running = _refreshing.get(key)
+    if running is not None and not running.done() and running.get_loop() is asyncio.get_running_loop():
+        return
+
+    async def refresh():
+        try:
+            await _scrape_and_store(scraper, key, scrape)
+            refresh_stats.background_refreshes += 1
+        except Exception as e:
+            refresh_stats.refresh_failures += 1
+            print(f"Background refresh of {key} failed: {e}")
+
+    # Refreshes nobody is waiting for queue behind user requests
+    with priority_lane(LANE_BACKGROUND):
+        task = asyncio.create_task(refresh())
+    _refreshing[key] = task
+    task.add_done_callback(lambda done: _refreshing.pop(key, None) if _refreshing.get(key) is done else None)
+
+
+async def _cached_scrape(scraper: BaseScraper, kind: str, query: str, scrape: Scrape,
+                         deadline: Optional[Deadline] = None) -> Tuple[CacheEntry, bool]:
+    """Serve from cache when possible, revalidating stale entries in the background.
+
+    Background refreshes are not bound by the deadline of the request that
+    triggered them.
+    """
+    key = cache_key(scraper.store_key, kind, query)
+    entry = await scrape_cache.get(key)
+    if entry is not None:
+        if not entry.is_fresh():
+            refresh_stats.stale_served += 1
+            _schedule_refresh(scraper, key, scrape)
+        elif entry.should_refresh_early():
+            refresh_stats.early_refreshes += 1
+            _schedule_refresh(scraper, key, scrape)
+        return entry, True
+
+    return await _scrape_and_store(scraper, key, scrape, deadline), False
+
+
+def _to_result(entry: CacheEntry, cached: bool) -> CachedResult:
+    return CachedResult(
+        sets=list(entry.sets),
+        age=entry.age if cached else 0.0,
+        stale=cached and not entry.is_fresh(),
+        cached=cached
+    )
+
+
+async def run_search(scraper: BaseScraper, query: str,
+                     deadline: Optional[Deadline] = None) -> CachedResult:
+    """Search a store through the scrape cache"""
+    entry, cached = await _cached_scrape(
+        scraper, "search", query, lambda bound: scraper.search_sets(query, bound), deadline
+    )
+    return _to_result(entry, cached)
+
+
+async def run_set_details(scraper: BaseScraper, set_number: str,
+                          deadline: Optional[Deadline] = None) -> CachedResult:
+    """Look up every offer of a single set on a store through the scrape cache"""
+    async def scrape(bound: Optional[Deadline]):
+        return await scraper.get_set_offers(set_number, bound)
+
+    entry, cached = await _cached_scrape(scraper, "set", set_number, scrape, deadline)
+    return _to_result(entry, cached)
+
+
+async def refresh_search(scraper: BaseScraper, query: str) -> List[LegoSet]:
+    """Scrape a store search regardless of the cache and store the result"""
+    key = cache_key(scraper.store_key, "search", query)
+    entry = await _scrape_and_store(scraper, key, lambda bound: scraper.search_sets(query, bound))
+    return list(entry.sets)
+
+
+async def crawl_search(scraper: BaseScraper, query: str, max_pages: int) -> List[LegoSet]:
+    """Scrape up to ``max_pages`` result pages of a store search; nothing is cached"""
+    return [lego_set async for lego_set in scraper.crawl_sets(query, max_pages=max_pages)]
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+# Selector chains a store remembers winners for
+CHAIN_CONTAINER = "container"
+CHAIN_LISTING = "listing"
+
+# How long a learned winner is tried first before the chain's own order is tried again
+SELECTOR_WINNER_TTL = float(os.getenv("SELECTOR_WINNER_TTL", "3600"))
+# Learning is written to disk at most once per this many seconds
+SELECTOR_SAVE_DELAY = float(os.getenv("SELECTOR_SAVE_DELAY", "5"))
+
+
+class SelectorMemory:
+    """Which candidate selectors of a store's fallback chains have matched.
+
+    The last selector that matched a chain is tried first next time, and
+    per-selector hit counts show when a store's layout changes. A winner
+    is trusted for ``winner_ttl`` seconds; after that the chain is tried
+    in its own order again, so a broad fallback that once matched does not
+    shadow the precise selectors ahead of it for good. State is persisted
+    to ``path``, batched and off the event loop, so the learning survives
+    restarts.
+    """
+
+    def __init__(self, path: Optional[str] = None, winner_ttl: float = SELECTOR_WINNER_TTL,
+                 save_delay: float = SELECTOR_SAVE_DELAY):
+        self.path = path
+        self.winner_ttl = winner_ttl
+        self.save_delay = save_delay
+        self.chains: Dict[str, Dict] = {}
+        self._dirty = False
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+        self._write_lock = threading.Lock()
+        self._load()
+
+    def _chain(self, chain: str) -> Dict:
+        if chain not in self.chains:
+            self.chains[chain] = {"winner": None, "learned_at": 0.0, "runs": 0, "misses": 0, "hits": {}}
+        return self.chains[chain]
+
+    def winner(self, chain: str) -> Optional[str]:
+        """The chain's last winner, unless it has expired"""
+        state = self.chains.get(chain)
+        if not state or state.get("winner") is None:
+            return None
+        if time.time() - state.get("learned_at", 0.0) > self.winner_ttl:
+            return None
+        return state["winner"]
+
+    def order(self, chain: str, candidates: Sequence[str]) -> List[str]:
+        """Candidates with the current winner moved to the front"""
+        winner = self.winner(chain)
+        if winner not in candidates:
+            return list(candidates)
+        return [winner] + [candidate for candidate in candidates if candidate != winner]
+
+    def record(self, chain: str, winner: Optional[str]):
+        """Record which selector matched a chain, or None if none did"""
+        state = self._chain(chain)
+        state["runs"] += 1
+        if winner is None:
+            state["misses"] += 1
+        else:
+            state["hits"][winner] = state["hits"].get(winner, 0) + 1
+            if winner != state["winner"]:
+                if state["winner"] is not None:
+                    print(f"Selector winner for {chain} changed: {state['winner']!r} -> {winner!r}")
+                state["winner"] = winner
+                state["learned_at"] = time.time()
+            elif self.winner(chain) is None:
+                # Won again with the chain in its own order: trust it for another period
+                state["learned_at"] = time.time()
+        self._schedule_save()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self.chains = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable selector memory {self.path}: {e}")
+            self.chains = {}
+
+    def _schedule_save(self):
+        if not self.path:
+            return
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        if self._save_handle is None:
+            self._save_handle = loop.call_later(self.save_delay, self._save_in_background, loop)
+
+    def _save_in_background(self, loop: asyncio.AbstractEventLoop):
+        self._save_handle = None
+        if self._dirty:
+            self._dirty = False
+            loop.run_in_executor(None, self._write, json.dumps(self.chains))
+
+    def flush(self):
+        """Write pending learning now"""
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        if self._dirty:
+            self._dirty = False
+            self._write(json.dumps(self.chains))
+
+    def _write(self, data: str):
+        try:
+            with self._write_lock:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w") as f:
+                    f.write(data)
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save selector memory {self.path}: {e}")
+
+    def to_dict(self) -> Dict:
+        return {
+            chain: {
+                "winner": state["winner"],
+                "runs": state["runs"],
+                "misses": state["misses"],
+                "selectors": {
+                    selector: {"hits": hits, "hit_rate": round(hits / state["runs"], 3)}
+                    for selector, hits in sorted(state["hits"].items(), key=lambda item: -item[1])
+                },
+            }
+            for chain, state in self.chains.items()
+        }
+
+
+selector_memories: Dict[str, SelectorMemory] = {}
+
+
+def get_selector_memory(store_key: str, path: Optional[str] = None) -> SelectorMemory:
+    if store_key not in selector_memories:
+        selector_memories[store_key] = SelectorMemory(path)
+    return selector_memories[store_key]
+
+
+def flush_selector_memories():
+    """Write every store's pending selector learning, e.g. on shutdown"""
+    for memory in selector_memories.values():
+        memory.flush()
+
+
+async def race_selectors(page, selectors: Sequence[str], timeout: int) -> Optional[str]:
+    """Wait for all selectors at once and return the first one to appear.
+
+    If several appear together, the one earliest in ``selectors`` wins.
+    Returns None when none appears within ``timeout`` milliseconds.
+    """
+    waits = {
+        asyncio.ensure_future(page.wait_for_selector(selector, timeout=timeout)): selector
+        for selector in selectors
+    }
+    pending = set(waits)
+    winner = None
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            matched = [waits[wait] for wait in done if not wait.cancelled() and wait.exception() is None]
+            if matched:
+                winner = min(matched, key=selectors.index)
+    finally:
+        for wait in pending:
+            wait.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    return winner
@@ -0,0 +1,240 @@
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from .priority import LANE_BACKGROUND, LANE_INTERACTIVE, LANES, current_lane
+
+THROTTLE_ENABLED = os.getenv("SCRAPER_THROTTLE", "true").lower() == "true"
+# Requests whose latency exceeds this count as congestion, overridable with e.g. OLX_TARGET_LATENCY
+TARGET_LATENCY_SECONDS = float(os.getenv("SCRAPER_TARGET_LATENCY", "10"))
+# Multiplicative decrease applied to concurrency and rate on congestion
+BACKOFF_FACTOR = 0.5
+# At most one decrease per this many seconds, so one burst of failures halves once
+BACKOFF_COOLDOWN_SECONDS = 2.0
+
+# Status codes stores use to push back on scrapers
+THROTTLE_STATUS_CODES = {403, 429}
+
+OUTCOME_OK = "ok"
+OUTCOME_THROTTLED = "throttled"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_EMPTY = "empty"
+OUTCOME_ERROR = "error"
+CONGESTION_OUTCOMES = {OUTCOME_THROTTLED, OUTCOME_TIMEOUT, OUTCOME_EMPTY}
+
+
+class StoreThrottled(Exception):
+    """A store answered with a rate-limit or access-denied status"""
+
+    def __init__(self, status: int):
+        super().__init__(f"store responded with HTTP {status}")
+        self.status = status
+
+
+def is_timeout(error: BaseException) -> bool:
+    """True for asyncio, httpx and Playwright timeouts"""
+    return isinstance(error, asyncio.TimeoutError) or "Timeout" in type(error).__name__
+
+
+class TokenBucket:
+    """Request-rate limiter: ``rate`` tokens per second, up to ``burst`` saved.
+
+    Background requests leave tokens to interactive requests that are
+    waiting for one.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._updated = time.monotonic()
+        self.waiting = {lane: 0 for lane in LANES}
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, lane: str = LANE_INTERACTIVE):
+        self.waiting[lane] += 1
+        try:
+            while True:
+                self._refill()
+                yielding = lane == LANE_BACKGROUND and self.waiting[LANE_INTERACTIVE] > 0
+                if self.tokens >= 1 and not yielding:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep(max(1 - self.tokens, 1 if yielding else 0) / self.rate)
+        finally:
+            self.waiting[lane] -= 1
+
+
+class AIMDController:
+    """Concurrency limit that grows additively and shrinks multiplicatively.
+
+    Requests queue per priority lane: a freed slot goes to queued
+    interactive requests before background ones, and background requests
+    do not take a free slot while interactive ones are queued.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._waiters = {lane: deque() for lane in LANES}
+        self._loop = None
+
+    def _bind_loop(self):
+        # Waiters are futures of the loop they were created on
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._waiters = {lane: deque() for lane in LANES}
+            self.in_flight = 0
+        return loop
+
+    @property
+    def current_limit(self) -> int:
+        return max(int(self.limit), self.minimum)
+
+    def queued(self) -> Dict[str, int]:
+        return {lane: len(waiters) for lane, waiters in self._waiters.items()}
+
+    def _must_wait(self, lane: str) -> bool:
+        if self.in_flight >= self.current_limit:
+            return True
+        return lane == LANE_BACKGROUND and bool(self._waiters[LANE_INTERACTIVE])
+
+    async def acquire(self, lane: Optional[str] = None):
+        """Wait for a slot in ``lane``, by default the lane of the current task"""
+        loop = self._bind_loop()
+        lane = lane or current_lane.get()
+        while self._must_wait(lane):
+            waiter = loop.create_future()
+            self._waiters[lane].append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters[lane]:
+                    self._waiters[lane].remove(waiter)
+                elif waiter.done() and not waiter.cancelled():
+                    # Woken just as we were cancelled; wake someone else instead
+                    self._wake()
+                raise
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight = max(self.in_flight - 1, 0)
+        self._wake()
+
+    def _wake(self):
+        free = self.current_limit - self.in_flight
+        for lane in LANES:
+            waiters = self._waiters[lane]
+            while free > 0 and waiters:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    free -= 1
+
+    def increase(self):
+        # About +1 per full window of successful requests
+        self.limit = min(float(self.maximum), self.limit + 1.0 / self.current_limit)
+        self._wake()
+
+    def decrease(self):
+        self.limit = max(float(self.minimum), self.limit * BACKOFF_FACTOR)
+
+
+class StoreThrottle:
+    """Token bucket plus AIMD concurrency control for one store.
+
+    Healthy requests (listings found, latency under target) widen the
+    concurrency limit and restore the request rate; timeouts, 429/403
+    responses and empty result pages halve both.
+    """
+
+    def __init__(self, store_key: str, rate: float, max_concurrency: int,
+                 target_latency: float = TARGET_LATENCY_SECONDS):
+        self.store_key = store_key
+        self.max_rate = rate
+        self.min_rate = rate / 10
+        self.bucket = TokenBucket(rate, burst=max(rate * 2, 1.0))
+        self.controller = AIMDController(initial=max(max_concurrency // 2, 1), minimum=1, maximum=max_concurrency)
+        self.target_latency = target_latency
+        self._last_decrease = 0.0
+
+        self.outcomes: Dict[str, int] = {}
+        self.backoffs = 0
+        self.latency_ewma: Optional[float] = None
+
+    @asynccontextmanager
+    async def slot(self, lane: Optional[str] = None):
+        """Wait for a token and a concurrency slot, then hold the slot.
+
+        Interactive requests go ahead of background ones at both steps;
+        ``lane`` defaults to the lane of the current task.
+        """
+        lane = lane or current_lane.get()
+        await self.bucket.acquire(lane)
+        await self.controller.acquire(lane)
+        try:
+            yield
+        finally:
+            self.controller.release()
+
+    def record(self, outcome: str, latency: float):
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+
+        if outcome in CONGESTION_OUTCOMES or (outcome == OUTCOME_OK and latency > self.target_latency):
+            self._back_off()
+        elif outcome == OUTCOME_OK:
+            self.controller.increase()
+            self.bucket.rate = min(self.max_rate, self.bucket.rate + self.max_rate * 0.05)
+
+    def _back_off(self):
+        now = time.monotonic()
+        if now - self._last_decrease < BACKOFF_COOLDOWN_SECONDS:
+            return
+        self._last_decrease = now
+        self.backoffs += 1
+        self.controller.decrease()
+        self.bucket.rate = max(self.min_rate, self.bucket.rate * BACKOFF_FACTOR)
+        print(f"{self.store_key}: backing off to {self.controller.current_limit} concurrent, "
+              f"{self.bucket.rate:.2f} req/s")
+
+    def to_dict(self) -> Dict:
+        return {
+            "concurrency_limit": self.controller.current_limit,
+            "max_concurrency": self.controller.maximum,
+            "in_flight": self.controller.in_flight,
+            "queued": self.controller.queued(),
+            "rate_per_second": round(self.bucket.rate, 3),
+            "max_rate_per_second": self.max_rate,
+            "latency_ewma_ms": round(self.latency_ewma * 1000) if self.latency_ewma is not None else None,
+            "backoffs": self.backoffs,
+            "outcomes": dict(self.outcomes),
+        }
+
+
+# Throttle per store key
+throttles: Dict[str, StoreThrottle] = {}
+
+
+def get_throttle(scraper) -> StoreThrottle:
+    """Throttle of a scraper's store; limits overridable with e.g. OLX_RATE_LIMIT"""
+    store_key = scraper.store_key
+    if store_key not in throttles:
+        prefix = store_key.upper()
+        throttles[store_key] = StoreThrottle(
+            store_key,
+            rate=float(os.getenv(f"{prefix}_RATE_LIMIT", scraper.rate_limit)),
+            max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", scraper.max_concurrency)),
+            target_latency=float(os.getenv(f"{prefix}_TARGET_LATENCY", TARGET_LATENCY_SECONDS))
+        )
+    return throttles[store_key]
@@ -0,0 +1,99 @@
+import asyncio
+from typing import Dict, Iterable, Optional
+
+from celery.signals import worker_process_shutdown
+
+from .celery_app import celery_app, queue_for_store, STORE_KEYS
+from .database.database import SessionLocal
+from .database.price_history import record_offers
+from .journal.scrape_journal import scrape_journal
+from .scraper.base_scraper import BaseScraper
+from .scraper.browser_pool import browser_pool
+from .scraper.fetcher import http_fetcher
+from .scraper.priority import LANE_BACKGROUND, priority_lane
+from .scraper.runtime import crawl_search, refresh_search
+from .scraper.selector_memory import flush_selector_memories
+
+_scrapers: Optional[Dict[str, BaseScraper]] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_scrapers() -> Dict[str, BaseScraper]:
+    """Scrapers of this worker process, keyed by store key"""
+    global _scrapers
+    if _scrapers is None:
+        from .scraper.allegro_scraper import AllegroScraper
+        from .scraper.olx_scraper import OlxScraper
+        from .scraper.ceneo_scraper import CeneoScraper
+        _scrapers = {scraper.store_key: scraper for scraper in (AllegroScraper(), OlxScraper(), CeneoScraper())}
+    return _scrapers
+
+
+def run_async(coro):
+    """Run a coroutine on this process's long-lived event loop.
+
+    Reusing one loop keeps the browser pool and HTTP connections warm
+    across tasks instead of relaunching Chromium for every task.
+    """
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
+
+
+@worker_process_shutdown.connect
+def close_scraper_resources(**kwargs):
+    scrape_journal.close()
+    flush_selector_memories()
+    if _loop is not None and not _loop.is_closed():
+        _loop.run_until_complete(browser_pool.close())
+        _loop.run_until_complete(http_fetcher.close())
+        _loop.close()
+
+
+@celery_app.task(name="scrape.store_search", bind=True, max_retries=2, default_retry_delay=30)
+def scrape_store_search(self, store_key: str, query: str, max_pages: int = 1) -> Dict:
+    """Scrape one store for a query and store the offers.
+
+    A single page refreshes the cached search; more pages are crawled
+    concurrently and only stored.
+    """
+    scraper = get_scrapers().get(store_key)
+    if scraper is None:
+        raise ValueError(f"Unknown store: {store_key}")
+
+    try:
+        # Background crawls yield browser capacity to interactive searches;
+        # a failed scrape raises instead of returning placeholder offers
+        with priority_lane(LANE_BACKGROUND):
+            if max_pages > 1:
+                sets = run_async(crawl_search(scraper, query, max_pages))
+            else:
+                sets = run_async(refresh_search(scraper, query))
+    except Exception as e:
+        raise self.retry(exc=e)
+
+    if not sets:
+        return {"store_key": store_key, "query": query, "results": 0, "stored": 0}
+
+    db = SessionLocal()
+    try:
+        stored = record_offers(db, sets)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    return {"store_key": store_key, "query": query, "results": len(sets), "stored": stored}
+
+
+def enqueue_search(query: str, store_keys: Iterable[str] = STORE_KEYS, max_pages: int = 1) -> Dict[str, str]:
+    """Queue a search of ``max_pages`` result pages on each store's queue; returns task ids by store key"""
+    return {
+        store_key: scrape_store_search.apply_async(
+            (store_key, query), {"max_pages": max_pages}, queue=queue_for_store(store_key)
+        ).id
+        for store_key in store_keys
+    }
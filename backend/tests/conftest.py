@@ -1,7 +1,177 @@
 import pytest
+import pytest_asyncio
 import asyncio
+import re
+from datetime import datetime
 from typing import Generator
 
+from app.scraper.base_scraper import BaseScraper, LegoSet
+
+# Shared test helpers; test modules import them from here rather than from each other
+
+PRODUCT_URL = "https://www.ceneo.pl/98765432"
+
+
+class SlowScraper(BaseScraper):
+    """Scraper stub that answers after a fixed delay"""
+
+    def __init__(self, store_name: str, delay: float, fail: bool = False):
+        super().__init__(store_name)
+        self.delay = delay
+        self.fail = fail
+
+    async def search_sets(self, query: str, deadline=None):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("store down")
+        return [
+            LegoSet(
+                set_number="42100",
+                name=f"{query} at {self.store_name}",
+                price=100.0,
+                shipping_cost=0.0,
+                total_price=100.0,
+                store_name=self.store_name,
+                store_url="https://example.com",
+                condition="new",
+                availability=True,
+                last_updated=datetime.now()
+            )
+        ]
+
+    async def get_set_details(self, set_number: str, deadline=None):
+        return None
+
+    async def get_shipping_cost(self, price: float, location: str = "PL"):
+        return 0.0
+
+    async def fetch_listings_browser(self, url: str, deadline=None):
+        return []
+
+    def search_url(self, query: str, page_number: int = 1):
+        return f"https://example.com/?q={query}&page={page_number}"
+
+    async def records_to_sets(self, records, query: str, offset: int = 0):
+        return []
+
+
+class FakePage:
+    """Playwright page stub.
+
+    Selectors render after their ``delays`` entry (or never), listing
+    counts follow the ``counts`` script and then stay at the last value,
+    navigation options are recorded, and the page is closed with its
+    ``context``.
+    """
+
+    def __init__(self, context=None, delays=None, counts=None):
+        self.context = context
+        self.delays = delays or {}
+        self.counts = list(counts or [0])
+        self.samples = 0
+        self.goto_options = None
+
+    def is_closed(self):
+        return self.context is not None and self.context.closed
+
+    async def close(self):
+        pass
+
+    async def goto(self, url, **options):
+        self.goto_options = options
+        return None
+
+    async def wait_for_selector(self, selector, timeout=30000):
+        delay = self.delays.get(selector)
+        if delay is None or delay * 1000 > timeout:
+            await asyncio.sleep(timeout / 1000)
+            raise asyncio.TimeoutError(f"{selector} not found")
+        await asyncio.sleep(delay)
+        return object()
+
+    async def evaluate(self, script, selectors):
+        self.samples += 1
+        if len(self.counts) > 1:
+            return self.counts.pop(0)
+        return self.counts[0]
+
+
+def make_offer(set_number="42100", price=2400.0, store_url="https://allegro.pl/oferta/1") -> LegoSet:
+    return LegoSet(
+        set_number=set_number,
+        name="LEGO Technic 42100 Liebherr R 9800",
+        price=price,
+        shipping_cost=0.0,
+        total_price=price,
+        store_name="Allegro",
+        store_url=store_url,
+        condition="new",
+        availability=True,
+        last_updated=datetime(2024, 1, 1, 12, 0)
+    )
+
+
+def make_set(set_number: str, url: str) -> LegoSet:
+    return LegoSet(
+        set_number=set_number,
+        name=f"LEGO Technic {set_number}",
+        price=1999.0,
+        shipping_cost=0.0,
+        total_price=1999.0,
+        store_name="Ceneo",
+        store_url=url,
+        condition="new",
+        availability=True,
+        last_updated=datetime.now()
+    )
+
+
+def page_records(page_number: int, count: int = 3):
+    return [
+        {
+            "title": f"LEGO Technic 42100 oferta {page_number}-{i}",
+            "price_text": "1999 zł",
+            "href": f"/d/oferta/42100-{page_number}-{i}.html"
+        }
+        for i in range(count)
+    ]
+
+
+class PagedStore:
+    """Stands in for fetch_listings; later result pages take longer to load"""
+
+    def __init__(self, pages: int, delay: float = 0.02):
+        self.pages = pages
+        self.delay = delay
+        self.requested = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cancelled = 0
+
+    async def fetch_listings(self, url, deadline=None):
+        match = re.search(r"page=(\d+)", url)
+        page_number = int(match.group(1)) if match else 1
+        self.requested.append(page_number)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay * page_number)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        return page_records(page_number) if page_number <= self.pages else []
+
+
+async def login(client) -> dict:
+    """Register and sign in a user; returns its authorization headers"""
+    await client.post("/auth/register", json={
+        "username": "builder", "email": "builder@example.com", "password": "bricks123"
+    })
+    response = await client.post("/auth/login", data={"username": "builder", "password": "bricks123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
 
 @pytest.fixture(scope="session")
 def event_loop() -> Generator:
@@ -11,6 +181,71 @@ def event_loop() -> Generator:
     loop.close()
 
 
+@pytest.fixture(autouse=True)
+def clear_scrape_cache():
+    """Start every test with an empty in-process scrape cache"""
+    from app.scraper.cache import scrape_cache
+    scrape_cache.clear_local()
+    yield
+    scrape_cache.clear_local()
+
+
+@pytest.fixture(autouse=True)
+def reset_store_health():
+    """Start every test with closed circuits and no health samples"""
+    from app.scraper.health import health_registry
+    health_registry.clear()
+    yield
+    health_registry.clear()
+
+
+@pytest.fixture(autouse=True)
+def isolate_scraper_state(tmp_path, monkeypatch):
+    """Keep learned selectors, product indexes, the journal and storage state out of the working tree"""
+    from app.journal.scrape_journal import scrape_journal
+    from app.scraper.product_index import product_indexes
+    from app.scraper.selector_memory import selector_memories
+    monkeypatch.setattr("app.scraper.base_scraper.SCRAPER_STATE_DIR", str(tmp_path / "scraper_state"))
+    monkeypatch.setattr(scrape_journal, "directory", str(tmp_path / "journal"))
+    selector_memories.clear()
+    product_indexes.clear()
+    yield
+    scrape_journal.close()
+    selector_memories.clear()
+    product_indexes.clear()
+
+
+@pytest_asyncio.fixture
+async def async_session_factory():
+    """In-memory aiosqlite session factory"""
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import StaticPool
+    from app.database.models import Base
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def client(async_session_factory):
+    """API client whose request handlers use the in-memory database"""
+    from httpx import AsyncClient
+    from app.database.database import get_async_db
+    from app.main import app
+
+    async def override_get_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.pop(get_async_db, None)
+
+
 @pytest.fixture
 def sample_lego_sets():
     """Sample LEGO sets for testing"""
@@ -1,6 +1,10 @@
+import json
 import pytest
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from app.main import app
+from app.scraper.ceneo_scraper import CeneoScraper
+from tests.conftest import SlowScraper, PRODUCT_URL, make_set
 
 client = TestClient(app)
 
@@ -100,6 +104,25 @@ class TestAPI:
         # At least some sets should be returned (mock data includes multiple sets)
         assert len(set_numbers) > 0
     
+    def test_search_stream_endpoint(self):
+        """Test streaming search emits one event per store, then recommendations"""
+        stub_scrapers = [SlowScraper("Fast", 0.01), SlowScraper("Slow", 0.2)]
+        
+        with patch("app.main.scrapers", stub_scrapers):
+            response = client.get("/api/search/stream?query=42100&limit=10")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        
+        events = [json.loads(line) for line in response.text.splitlines() if line]
+        assert [e["type"] for e in events] == ["store", "store", "complete"]
+        
+        # The fastest store is emitted first
+        assert events[0]["store"]["store_name"] == "Fast"
+        assert events[0]["sets"][0]["set_number"] == "42100"
+        assert events[2]["total_results"] == 2
+        assert isinstance(events[2]["recommendations"], list)
+    
     def test_set_details_endpoint(self):
         """Test set details endpoint"""
         response = client.get("/api/set/42100")
@@ -115,6 +138,30 @@ class TestAPI:
         assert isinstance(data["total_offers"], int)
         assert isinstance(data["offers"], list)
     
+    def test_set_details_endpoint_uses_product_index(self):
+        """Test that an indexed set is read from its product page rather than searched"""
+        scraper = CeneoScraper()
+        scraper.product_index.learn([make_set("10294", PRODUCT_URL)])
+        fetched = []
+
+        async def fake_fetch(url, deadline=None, spec=None):
+            fetched.append(url)
+            return [{"title": "LEGO Icons 10294 Titanic", "price_text": "2 599,00 zł"}]
+
+        async def fail_search(query, deadline=None):
+            raise AssertionError("search should not be used")
+
+        scraper.fetch_listings = fake_fetch
+        scraper.search_sets = fail_search
+        with patch("app.main.scrapers", [scraper]):
+            response = client.get("/api/set/10294")
+
+        assert response.status_code == 200
+        assert fetched == [PRODUCT_URL]
+        offer = response.json()["offers"][0]
+        assert offer["store_url"] == PRODUCT_URL
+        assert offer["price"] == 2599.0
+    
     def test_set_details_endpoint_not_found(self):
         """Test set details endpoint with non-existent set"""
         response = client.get("/api/set/99999")
@@ -126,7 +173,8 @@ class TestAPI:
     
     def test_recommendations_endpoint(self):
         """Test recommendations endpoint"""
-        response = client.get("/api/recommendations")
+        with patch("app.main.stored_offers", return_value=[]), patch("app.main.scrapers", []):
+            response = client.get("/api/recommendations")
         assert response.status_code == 200
         
         data = response.json()
@@ -138,6 +186,15 @@ class TestAPI:
         assert isinstance(data["good_deals"], int)
         assert isinstance(data["recommendations"], list)
     
+    def test_recommendations_scrape_sets_without_stored_offers(self):
+        """Test that recommendations fall back to live scraping when nothing is stored yet"""
+        scraper = SlowScraper("LiveStore", 0)
+        with patch("app.main.stored_offers", return_value=[]), patch("app.main.scrapers", [scraper]):
+            response = client.get("/api/recommendations")
+
+        assert response.status_code == 200
+        assert response.json()["recommendations"][0]["best_offer"]["store_name"] == "LiveStore"
+
     def test_cors_headers(self):
         """Test CORS headers are present"""
         response = client.get("/")
@@ -0,0 +1,150 @@
+import pytest
+from datetime import datetime, timezone
+
+from app.database.database import async_database_url
+from app.database.models import LegoSet
+from app.database.price_history import record_offers
+from tests.conftest import make_offer, login
+
+
+class TestAsyncDatabaseUrl:
+    """Test cases for deriving the async driver URL"""
+
+    def test_sqlite_uses_aiosqlite(self):
+        """Test that the development database gets the aiosqlite driver"""
+        assert async_database_url("sqlite:///./lego_price_agent.db") == "sqlite+aiosqlite:///./lego_price_agent.db"
+
+    def test_postgres_uses_asyncpg(self, monkeypatch):
+        """Test that Postgres gets asyncpg with the configured statement cache"""
+        monkeypatch.setattr("app.database.database.DB_STATEMENT_CACHE_SIZE", 0)
+
+        url = async_database_url("postgresql+psycopg2://lego:secret@db:5432/lego")
+
+        assert url == "postgresql+asyncpg://lego:secret@db:5432/lego?prepared_statement_cache_size=0"
+
+
+class TestAsyncHandlers:
+    """Test cases for request handlers running on AsyncSession"""
+
+    @pytest.mark.asyncio
+    async def test_register_login_and_profile(self, client):
+        """Test that a user can register, log in and read their profile"""
+        headers = await login(client)
+
+        response = await client.get("/auth/me", headers=headers)
+
+        assert response.status_code == 200
+        assert response.json()["username"] == "builder"
+
+    @pytest.mark.asyncio
+    async def test_duplicate_registration_rejected(self, client):
+        """Test that a taken username is refused"""
+        await login(client)
+
+        response = await client.post("/auth/register", json={
+            "username": "builder", "email": "other@example.com", "password": "bricks123"
+        })
+
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_watchlist_reports_best_price(self, client, async_session_factory):
+        """Test that watchlist items carry the lowest stored price"""
+        offers = [make_offer(price=2400.0), make_offer(price=2100.0, store_url="https://allegro.pl/oferta/2")]
+        async with async_session_factory() as db:
+            await db.run_sync(lambda session: record_offers(session, offers))
+            await db.commit()
+        headers = await login(client)
+
+        added = await client.post("/watchlist/", json={"set_number": "42100", "target_price": 2000.0}, headers=headers)
+        listed = await client.get("/watchlist/", headers=headers)
+
+        assert added.status_code == 200
+        assert added.json()["current_best_price"] == 2100.0
+        assert listed.json()[0]["price_difference"] == -100.0
+
+    @pytest.mark.asyncio
+    async def test_watchlist_item_removed(self, client, async_session_factory):
+        """Test updating and removing a watchlist item"""
+        async with async_session_factory() as db:
+            db.add(LegoSet(set_number="10294", name="Titanic"))
+            await db.commit()
+        headers = await login(client)
+        item = (await client.post("/watchlist/", json={"set_number": "10294"}, headers=headers)).json()
+
+        updated = await client.put(f"/watchlist/{item['id']}", json={"set_number": "10294", "target_price": 2500.0},
+                                   headers=headers)
+        removed = await client.delete(f"/watchlist/{item['id']}", headers=headers)
+
+        assert updated.json()["target_price"] == 2500.0
+        assert updated.json()["current_best_price"] is None
+        assert removed.status_code == 200
+        assert (await client.get("/watchlist/", headers=headers)).json() == []
+
+
+class TestStoredRecommendations:
+    """Test cases for recommendations served from stored offers"""
+
+    @pytest.mark.asyncio
+    async def test_recommendations_read_stored_offers(self, client, async_session_factory, monkeypatch):
+        """Test that recommendations use the newest stored offers without scraping"""
+        monkeypatch.setattr("app.main.scrapers", [])
+        stale = make_offer(price=1900.0, store_url="https://allegro.pl/oferta/9")
+        fresh = [make_offer(price=2400.0), make_offer(price=2100.0, store_url="https://allegro.pl/oferta/2")]
+        for offer in fresh:
+            offer.last_updated = datetime.now(timezone.utc)
+        async with async_session_factory() as db:
+            await db.run_sync(lambda session: record_offers(session, [stale, *fresh]))
+            await db.commit()
+
+        response = await client.get("/api/recommendations")
+
+        assert response.status_code == 200
+        recommendation = response.json()["recommendations"][0]
+        assert recommendation["set_number"] == "42100"
+        assert recommendation["best_offer"]["total_price"] == 2100.0
+
+
+class TestScrapeAPI:
+    """Test cases for queueing scrapes and reading stored prices"""
+
+    @pytest.mark.asyncio
+    async def test_enqueue_requires_login(self, client, monkeypatch):
+        """Test that only signed-in users can queue scrapes"""
+        monkeypatch.setattr("app.api.scrape.enqueue_search", lambda query, store_keys: {"olx": "task-1"})
+
+        anonymous = await client.post("/api/scrape", params={"query": "lego 42100"})
+        queued = await client.post("/api/scrape", params={"query": "lego 42100"}, headers=await login(client))
+
+        assert anonymous.status_code == 401
+        assert queued.status_code == 202
+        assert queued.json()["tasks"] == {"olx": "task-1"}
+
+    @pytest.mark.asyncio
+    async def test_stored_prices_are_latest_per_listing(self, client, async_session_factory):
+        """Test that each listing is reported once, with its newest observation"""
+        old = make_offer(price=2400.0)
+        new = make_offer(price=2300.0)
+        new.last_updated = datetime(2024, 1, 2, 12, 0)
+        other = make_offer(price=2500.0, store_url="https://allegro.pl/oferta/2")
+        async with async_session_factory() as db:
+            await db.run_sync(lambda session: record_offers(session, [old, new, other]))
+            await db.commit()
+
+        response = await client.get("/api/prices/42100")
+
+        assert response.status_code == 200
+        assert [offer["total_price"] for offer in response.json()["offers"]] == [2300.0, 2500.0]
+
+
+class TestAdminAPI:
+    """Test cases for the scraper stats endpoints"""
+
+    @pytest.mark.asyncio
+    async def test_stats_require_login(self, client):
+        """Test that scraper internals are not served to anonymous clients"""
+        anonymous = await client.get("/admin/fetch-tiers")
+        signed_in = await client.get("/admin/fetch-tiers", headers=await login(client))
+
+        assert anonymous.status_code == 401
+        assert signed_in.status_code == 200
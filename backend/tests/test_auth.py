@@ -1,6 +1,7 @@
 import pytest
 from datetime import datetime, timedelta
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.auth.auth import (
@@ -86,11 +87,6 @@ class TestJWTToken:
 class TestUserManagement:
     """Test user management functions"""
     
-    @pytest.fixture
-    def mock_db(self):
-        """Create a mock database session"""
-        return Mock(spec=Session)
-    
     @pytest.fixture
     def sample_user(self):
         """Create a sample user for testing"""
@@ -102,33 +98,38 @@ class TestUserManagement:
             is_active=True
         )
     
-    def test_get_current_user_valid(self, mock_db, sample_user):
+    @pytest.fixture
+    def mock_async_db(self):
+        """Create a mock async database session"""
+        return AsyncMock(spec=AsyncSession)
+    
+    @pytest.mark.asyncio
+    async def test_get_current_user_valid(self, mock_async_db, sample_user):
         """Test getting current user with valid token"""
         # Create a valid token
         token = create_access_token({"sub": sample_user.username})
         
         # Mock the database query
-        mock_db.query.return_value.filter.return_value.first.return_value = sample_user
+        mock_async_db.scalar.return_value = sample_user
         
-        with patch('app.auth.auth.get_db', return_value=mock_db):
-            with patch('app.auth.auth.oauth2_scheme', return_value=token):
-                user = get_current_user(token, mock_db)
-                
-                assert user == sample_user
-                assert user.username == "testuser"
-                assert user.is_active is True
+        with patch('app.auth.auth.oauth2_scheme', return_value=token):
+            user = await get_current_user(token, mock_async_db)
+            
+            assert user == sample_user
+            assert user.username == "testuser"
+            assert user.is_active is True
     
-    def test_get_current_user_not_found(self, mock_db):
+    @pytest.mark.asyncio
+    async def test_get_current_user_not_found(self, mock_async_db):
         """Test getting current user with non-existent user"""
         token = create_access_token({"sub": "nonexistentuser"})
         
         # Mock the database query to return None
-        mock_db.query.return_value.filter.return_value.first.return_value = None
+        mock_async_db.scalar.return_value = None
         
-        with patch('app.auth.auth.get_db', return_value=mock_db):
-            with patch('app.auth.auth.oauth2_scheme', return_value=token):
-                with pytest.raises(Exception):
-                    get_current_user(token, mock_db)
+        with patch('app.auth.auth.oauth2_scheme', return_value=token):
+            with pytest.raises(Exception):
+                await get_current_user(token, mock_async_db)
     
     def test_get_current_active_user_active(self, sample_user):
         """Test getting current active user with active user"""
@@ -63,6 +63,15 @@ class TestBaseScraper:
             
             async def get_shipping_cost(self, price: float, location: str = "PL"):
                 return 0.0
+
+            async def fetch_listings_browser(self, url: str, deadline=None):
+                return []
+
+            def search_url(self, query: str, page_number: int = 1):
+                return ""
+
+            async def records_to_sets(self, records, query: str, offset: int = 0):
+                return []
         
         scraper = MockScraper("Test Store")
         assert scraper.store_name == "Test Store"
@@ -79,6 +88,15 @@ class TestBaseScraper:
             
             async def get_shipping_cost(self, price: float, location: str = "PL"):
                 return 0.0
+
+            async def fetch_listings_browser(self, url: str, deadline=None):
+                return []
+
+            def search_url(self, query: str, page_number: int = 1):
+                return ""
+
+            async def records_to_sets(self, records, query: str, offset: int = 0):
+                return []
         
         scraper = MockScraper("Test Store")
         
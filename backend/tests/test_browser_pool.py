@@ -0,0 +1,159 @@
+import pytest
+from app.scraper import browser_pool as browser_pool_module
+from app.scraper.browser_pool import BrowserPool
+from tests.conftest import FakePage
+
+
+class FakeContext:
+    def __init__(self, **options):
+        self.closed = False
+        self.options = options
+
+    async def new_page(self):
+        return FakePage(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.handlers = []
+        self.contexts = []
+
+    def on(self, event, handler):
+        self.handlers.append(handler)
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        context = FakeContext(**options)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.connected = False
+
+    def crash(self):
+        self.connected = False
+        for handler in self.handlers:
+            handler(self)
+
+
+class FakeChromium:
+    def __init__(self):
+        self.launched = []
+
+    async def launch(self, **kwargs):
+        browser = FakeBrowser()
+        self.launched.append(browser)
+        return browser
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.chromium = FakeChromium()
+
+    async def stop(self):
+        pass
+
+
+class FakePlaywrightManager:
+    def __init__(self, playwright):
+        self.playwright = playwright
+
+    async def start(self):
+        return self.playwright
+
+
+@pytest.fixture
+def fake_playwright(monkeypatch):
+    playwright = FakePlaywright()
+    monkeypatch.setattr(browser_pool_module, "async_playwright", lambda: FakePlaywrightManager(playwright))
+    return playwright
+
+
+class TestBrowserPool:
+    """Test cases for the shared browser pool"""
+
+    @pytest.mark.asyncio
+    async def test_browsers_are_reused(self, fake_playwright):
+        """Test that consecutive checkouts share one browser"""
+        pool = BrowserPool(size=1, max_pages_per_browser=100)
+
+        for _ in range(3):
+            async with pool.page() as page:
+                assert page is not None
+
+        assert len(fake_playwright.chromium.launched) == 1
+        assert pool.stats()["total_pages"] == 3
+        assert all(c.closed for c in fake_playwright.chromium.launched[0].contexts)
+
+    @pytest.mark.asyncio
+    async def test_browser_recycled_after_max_pages(self, fake_playwright):
+        """Test that a browser is recycled once it has served N pages"""
+        pool = BrowserPool(size=1, max_pages_per_browser=2)
+
+        for _ in range(3):
+            async with pool.page():
+                pass
+
+        assert len(fake_playwright.chromium.launched) == 2
+        assert pool.recycles == 1
+
+    @pytest.mark.asyncio
+    async def test_crashed_browser_respawned(self, fake_playwright):
+        """Test that a crashed browser is relaunched on next checkout"""
+        pool = BrowserPool(size=1, max_pages_per_browser=100)
+
+        async with pool.page():
+            pass
+        fake_playwright.chromium.launched[0].crash()
+
+        async with pool.page():
+            pass
+
+        assert len(fake_playwright.chromium.launched) == 2
+        assert pool.respawns == 1
+        assert pool.stats()["browsers_alive"] == 1
+
+    @pytest.mark.asyncio
+    async def test_store_page_reused(self, fake_playwright):
+        """Test that a store's warm page is reused for the next search"""
+        pool = BrowserPool(size=1, max_pages_per_browser=100, warm_pages_per_store=2)
+
+        async with pool.store_page("allegro") as first:
+            pass
+        async with pool.store_page("allegro") as second:
+            pass
+
+        assert first is second
+        assert pool.warm_hits == 1
+        assert pool.cold_starts == 1
+        assert not first.context.closed
+
+    @pytest.mark.asyncio
+    async def test_store_page_discarded_after_error(self, fake_playwright):
+        """Test that a page whose search failed is not reused"""
+        pool = BrowserPool(size=1, max_pages_per_browser=100, warm_pages_per_store=2)
+
+        with pytest.raises(RuntimeError):
+            async with pool.store_page("olx") as page:
+                raise RuntimeError("navigation failed")
+
+        assert page.context.closed
+        async with pool.store_page("olx") as fresh:
+            assert fresh is not page
+        assert pool.cold_starts == 2
+
+    @pytest.mark.asyncio
+    async def test_store_page_uses_storage_state(self, fake_playwright, tmp_path):
+        """Test that new contexts are seeded from persisted storage state"""
+        state_file = tmp_path / "ceneo.json"
+        state_file.write_text("{}")
+        pool = BrowserPool(size=1, max_pages_per_browser=100)
+
+        async with pool.store_page("ceneo", storage_state=str(state_file)) as page:
+            assert page.context.options["storage_state"] == str(state_file)
@@ -0,0 +1,248 @@
+import time
+import pytest
+from datetime import datetime
+from app.scraper.base_scraper import LegoSet
+from app.scraper import runtime
+from app.scraper.cache import (
+    CacheEntry, LRUCache, ScrapeCache, cache_key, normalize_query, scrape_cache, CACHE_NEGATIVE_TTL
+)
+from app.scraper.fanout import StoreResult, summarize_freshness
+from app.scraper.runtime import run_search
+from tests.conftest import SlowScraper
+
+
+def make_set(set_number="42100"):
+    return LegoSet(
+        set_number=set_number,
+        name="Liebherr R 9800",
+        price=2400.0,
+        shipping_cost=0.0,
+        total_price=2400.0,
+        store_name="Allegro",
+        store_url="https://allegro.pl/oferta/1",
+        condition="new",
+        availability=True,
+        last_updated=datetime(2024, 1, 1, 12, 0)
+    )
+
+
+class TestNormalizeQuery:
+    """Test cases for canonical cache keys"""
+    
+    def test_equivalent_queries_share_key(self):
+        """Test that noise words, case and whitespace are ignored"""
+        assert normalize_query("42100") == "42100"
+        assert normalize_query("lego 42100") == "42100"
+        assert normalize_query(" LEGO   42100 ") == "42100"
+        assert cache_key("allegro", "search", "lego 42100") == cache_key("allegro", "search", "42100")
+    
+    def test_plain_lego_query_kept(self):
+        """Test that a query consisting only of noise words is not emptied"""
+        assert normalize_query("LEGO") == "lego"
+    
+    def test_keys_differ_per_store(self):
+        """Test that stores do not share cache entries"""
+        assert cache_key("allegro", "search", "42100") != cache_key("olx", "search", "42100")
+
+
+class TestLRUCache:
+    """Test cases for the in-process cache tier"""
+    
+    def test_evicts_least_recently_used(self):
+        """Test LRU eviction once the cache is full"""
+        cache = LRUCache(max_entries=2)
+        cache.set("a", CacheEntry([], time.time(), 60))
+        cache.set("b", CacheEntry([], time.time(), 60))
+        cache.get("a")
+        cache.set("c", CacheEntry([], time.time(), 60))
+        
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.evictions == 1
+    
+    def test_expired_entries_not_returned(self):
+        """Test that expired entries are dropped on read"""
+        cache = LRUCache(max_entries=2)
+        cache.set("a", CacheEntry([], time.time() - 120, 60))
+        
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class TestScrapeCache:
+    """Test cases for the two-tier scrape cache"""
+    
+    @pytest.mark.asyncio
+    async def test_round_trip_and_counters(self):
+        """Test storing and reading back offers"""
+        cache = ScrapeCache(redis_url=None)
+        
+        assert await cache.get("k") is None
+        await cache.set("k", [make_set()], ttl=60)
+        entry = await cache.get("k")
+        
+        assert entry.sets[0].set_number == "42100"
+        stats = cache.stats()
+        assert stats["misses"] == 1
+        assert stats["local_hits"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_negative_caching_uses_short_ttl(self):
+        """Test that empty results are cached for the negative TTL only"""
+        cache = ScrapeCache(redis_url=None)
+        entry = await cache.set("empty", [], ttl=3600)
+        
+        assert entry.ttl == CACHE_NEGATIVE_TTL
+        assert (await cache.get("empty")).sets == []
+        assert cache.stats()["negative_hits"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_unreachable_redis_falls_back_to_local(self):
+        """Test that Redis errors do not break caching"""
+        cache = ScrapeCache(redis_url="redis://127.0.0.1:1/0")
+        
+        await cache.set("k", [make_set()], ttl=60)
+        entry = await cache.get("k")
+        
+        assert entry is not None
+        assert cache.stats()["redis_errors"] >= 1
+    
+    @pytest.mark.asyncio
+    async def test_stale_local_entry_replaced_by_fresher_redis_entry(self, monkeypatch):
+        """Test that a result another process stored in Redis replaces a stale local copy"""
+        cache = ScrapeCache(redis_url=None)
+        cache.local.set("k", CacheEntry([make_set("42100")], time.time() - 120, 60, stale_ttl=600))
+        fresher = CacheEntry([make_set("42115")], time.time(), 60, stale_ttl=600)
+
+        async def redis_get(key):
+            return fresher
+
+        monkeypatch.setattr(cache, "_redis_get", redis_get)
+
+        entry = await cache.get("k")
+
+        assert entry.sets[0].set_number == "42115"
+        assert entry.is_fresh()
+        assert cache.stats()["redis_hits"] == 1
+        assert cache.local.get("k") is fresher
+
+    def test_entry_json_round_trip(self):
+        """Test serialization used for the Redis tier"""
+        entry = CacheEntry([make_set()], 1700000000.0, 60)
+        restored = CacheEntry.from_json(entry.to_json())
+        
+        assert restored.sets == entry.sets
+        assert restored.stored_at == entry.stored_at
+
+
+class TestRunSearch:
+    """Test cases for cached store searches"""
+    
+    @pytest.mark.asyncio
+    async def test_equivalent_queries_scrape_once(self):
+        """Test that normalized-equal queries hit the cache"""
+        scraper = SlowScraper("CacheStore", 0)
+        calls = []
+        original = scraper.search_sets
+        
+        async def counting_search(query, deadline=None):
+            calls.append(query)
+            return await original(query, deadline)
+        
+        scraper.search_sets = counting_search
+        
+        first = await run_search(scraper, "42100")
+        second = await run_search(scraper, " LEGO 42100 ")
+        
+        assert calls == ["42100"]
+        assert first.sets == second.sets
+        assert not first.cached and second.cached
+    
+    @pytest.mark.asyncio
+    async def test_failure_cached_negatively(self):
+        """Test that a failed scrape is remembered for the negative TTL only"""
+        scraper = SlowScraper("FailingStore", 0, fail=True)
+        
+        with pytest.raises(RuntimeError):
+            await run_search(scraper, "42100")
+        retried = await run_search(scraper, "42100")
+        
+        entry = await scrape_cache.get(cache_key(scraper.store_key, "search", "42100"))
+        assert retried.cached and retried.sets == []
+        assert entry.ttl == CACHE_NEGATIVE_TTL
+        assert entry.stale_ttl == 0.0
+    
+    @pytest.mark.asyncio
+    async def test_failure_keeps_servable_entry(self):
+        """Test that a failed refresh does not replace offers that can still be served"""
+        scraper = SlowScraper("FlakyStore", 0, fail=True)
+        key = cache_key(scraper.store_key, "search", "42100")
+        scrape_cache.local.set(key, CacheEntry([make_set()], time.time() - 120, 60, 600))
+        
+        await run_search(scraper, "42100")
+        await runtime._refreshing[key]
+        
+        assert (await scrape_cache.get(key)).sets[0].name == "Liebherr R 9800"
+    
+    @pytest.mark.asyncio
+    async def test_stale_entry_served_and_refreshed(self):
+        """Test that an expired entry is returned at once and refreshed in the background"""
+        scraper = SlowScraper("StaleStore", 0)
+        key = cache_key(scraper.store_key, "search", "42100")
+        scrape_cache.local.set(key, CacheEntry([make_set()], time.time() - 120, 60, 600))
+        
+        result = await run_search(scraper, "42100")
+        
+        assert result.stale
+        assert result.age >= 120
+        assert result.sets[0].name == "Liebherr R 9800"
+        
+        await runtime._refreshing[key]
+        refreshed = await run_search(scraper, "42100")
+        
+        assert not refreshed.stale
+        assert refreshed.sets[0].name == "42100 at StaleStore"
+    
+    @pytest.mark.asyncio
+    async def test_one_refresh_per_key(self):
+        """Test that concurrent stale reads start a single background refresh"""
+        scraper = SlowScraper("StaleStore", 0.05)
+        key = cache_key(scraper.store_key, "search", "42100")
+        scrape_cache.local.set(key, CacheEntry([make_set()], time.time() - 120, 60, 600))
+        started = runtime.refresh_stats.background_refreshes
+        
+        await run_search(scraper, "42100")
+        await run_search(scraper, "42100")
+        await runtime._refreshing[key]
+        
+        assert runtime.refresh_stats.background_refreshes == started + 1
+
+
+class TestEarlyRefresh:
+    """Test cases for probabilistic early expiry"""
+    
+    def test_no_early_refresh_without_compute_time(self):
+        """Test that entries with unknown scrape cost are never refreshed early"""
+        entry = CacheEntry([make_set()], time.time() - 59, 60)
+        assert not entry.should_refresh_early()
+    
+    def test_expensive_entry_near_expiry_refreshes(self):
+        """Test that a slow-to-compute entry close to expiry is refreshed early"""
+        entry = CacheEntry([make_set()], time.time() - 59.9, 60, compute_time=100)
+        assert entry.should_refresh_early(beta=100)
+    
+    def test_servable_window(self):
+        """Test that stale entries stay servable only within the stale TTL"""
+        stale = CacheEntry([], time.time() - 120, 60, stale_ttl=600)
+        dead = CacheEntry([], time.time() - 1200, 60, stale_ttl=600)
+        
+        assert not stale.is_fresh() and stale.is_servable()
+        assert not dead.is_servable()
+    
+    def test_freshness_summary(self):
+        """Test the freshness indicator added to API responses"""
+        results = [
+            StoreResult("Allegro", "42100", age=30),
+            StoreResult("OLX", "42100", age=700, stale=True)
+        ]
+        assert summarize_freshness(results) == {"max_age_seconds": 700, "stale": True}
@@ -0,0 +1,78 @@
+import pytest
+from app.scraper.olx_scraper import OlxScraper
+from tests.conftest import PagedStore
+
+
+class TestCrawl:
+    """Test cases for paginated result crawling"""
+
+    @pytest.mark.asyncio
+    async def test_reads_all_pages_concurrently(self):
+        """Test that later pages are fetched together after the first one"""
+        scraper = OlxScraper()
+        store = PagedStore(pages=4)
+        scraper.fetch_listings = store.fetch_listings
+
+        sets = [lego_set async for lego_set in scraper.crawl_sets("lego 42100", max_pages=4)]
+
+        assert len(sets) == 12
+        assert len({lego_set.store_url for lego_set in sets}) == 12
+        assert sorted(store.requested) == [1, 2, 3, 4]
+        assert store.max_in_flight == 3
+
+    @pytest.mark.asyncio
+    async def test_stops_at_max_results(self):
+        """Test that a caller gets no more than it asked for and pending pages are cancelled"""
+        scraper = OlxScraper()
+        store = PagedStore(pages=5)
+        scraper.fetch_listings = store.fetch_listings
+
+        sets = [lego_set async for lego_set in scraper.crawl_sets("lego 42100", max_results=5, max_pages=5)]
+
+        assert len(sets) == 5
+        assert store.in_flight == 0
+        assert store.cancelled > 0
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        """Test that no more pages than the store's concurrency run at once"""
+        scraper = OlxScraper()
+        scraper.max_concurrency = 2
+        store = PagedStore(pages=6)
+        scraper.fetch_listings = store.fetch_listings
+
+        sets = [lego_set async for lego_set in scraper.crawl_sets("lego 42100", max_pages=6)]
+
+        assert len(sets) == 18
+        assert store.max_in_flight == 2
+
+    @pytest.mark.asyncio
+    async def test_empty_first_page_ends_crawl(self):
+        """Test that no further pages are requested when there are no results"""
+        scraper = OlxScraper()
+        store = PagedStore(pages=0)
+        scraper.fetch_listings = store.fetch_listings
+
+        sets = [lego_set async for lego_set in scraper.crawl_sets("lego 99999", max_pages=5)]
+
+        assert sets == []
+        assert store.requested == [1]
+
+    @pytest.mark.asyncio
+    async def test_failed_first_page_raises(self):
+        """Test that a crawl whose first page fails reports the failure instead of no results"""
+        scraper = OlxScraper()
+
+        async def fail(url, deadline=None):
+            raise RuntimeError("store down")
+        scraper.fetch_listings = fail
+
+        with pytest.raises(RuntimeError):
+            [lego_set async for lego_set in scraper.crawl_sets("lego 42100", max_pages=3)]
+
+    def test_page_urls(self):
+        """Test that page 1 is the plain search URL"""
+        scraper = OlxScraper()
+
+        assert scraper.search_url("lego 42100") == "https://www.olx.pl/d/ogloszenia/q-lego-42100/"
+        assert scraper.search_url("lego 42100", 3).endswith("?page=3")
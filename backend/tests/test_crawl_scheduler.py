@@ -0,0 +1,180 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Base, LegoSet, PriceHistory, User, WatchlistItem
+from app.scheduler.crawl_scheduler import (
+    CrawlCandidate, CrawlScheduler, DispatchMarkers, SearchPopularity, enqueue_refresh, load_candidates,
+    plan_crawl, set_number_from_query, CRAWL_MIN_INTERVAL, CRAWL_REFRESH_PAGES
+)
+
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+
+class TestPriority:
+    """Test cases for freshness-weighted crawl priority"""
+
+    def test_never_scraped_sets_are_due(self):
+        """Test that sets without price history are crawled first"""
+        assert CrawlCandidate("42100").priority(NOW) >= 1.0
+
+    def test_demand_shortens_refresh_interval(self):
+        """Test that watched and searched sets become due sooner"""
+        scraped = NOW - timedelta(hours=2)
+        cold = CrawlCandidate("10001", last_scraped=scraped)
+        hot = CrawlCandidate("42100", watchers=5, searches=100, last_scraped=scraped)
+
+        assert hot.priority(NOW) > cold.priority(NOW)
+        assert hot.priority(NOW) >= 1.0
+        assert cold.priority(NOW) < 1.0
+
+    def test_minimum_interval_caps_hot_sets(self):
+        """Test that even the hottest set is not refreshed back to back"""
+        just_scraped = NOW - timedelta(seconds=CRAWL_MIN_INTERVAL / 2)
+        hot = CrawlCandidate("42100", watchers=1000, searches=10 ** 6, last_scraped=just_scraped)
+
+        assert hot.priority(NOW) < 1.0
+
+    def test_set_number_queries(self):
+        """Test which searches count towards a set's popularity"""
+        assert set_number_from_query("lego 42100") == "42100"
+        assert set_number_from_query("42100") == "42100"
+        assert set_number_from_query("technic koparka") is None
+
+
+class TestPlanCrawl:
+    """Test cases for budgeted dispatch planning"""
+
+    def test_most_overdue_first_within_budget(self):
+        """Test that the budget goes to the stalest sets"""
+        candidates = [
+            CrawlCandidate("10001", last_scraped=NOW - timedelta(days=2)),
+            CrawlCandidate("10002", last_scraped=NOW - timedelta(days=5)),
+            CrawlCandidate("10003"),
+            CrawlCandidate("10004", last_scraped=NOW - timedelta(minutes=1)),
+        ]
+        plan = plan_crawl(candidates, {"allegro": 2, "olx": 1}, now=NOW)
+
+        assert plan == [("allegro", "10003"), ("olx", "10003"), ("allegro", "10002")]
+
+    def test_in_flight_scrapes_skipped(self):
+        """Test that recently dispatched pairs are not planned again nor use the budget"""
+        candidates = [CrawlCandidate("10001"), CrawlCandidate("10002", last_scraped=NOW - timedelta(days=5))]
+
+        plan = plan_crawl(candidates, {"allegro": 1, "olx": 1}, now=NOW, in_flight={("allegro", "10001")})
+
+        assert plan == [("olx", "10001"), ("allegro", "10002")]
+
+    def test_aware_and_naive_times_compare_in_utc(self):
+        """Test that stored naive UTC times and aware times agree"""
+        candidate = CrawlCandidate("10001", last_scraped=NOW)
+        now = (NOW + timedelta(hours=1)).replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=2)))
+
+        assert candidate.age(now) == 3600.0
+
+    def test_nothing_due(self):
+        """Test that fresh sets are not crawled"""
+        candidates = [CrawlCandidate("10001", last_scraped=NOW - timedelta(minutes=1))]
+        assert plan_crawl(candidates, {"allegro": 5}, now=NOW) == []
+
+
+class TestLoadCandidates:
+    """Test cases for collecting crawl signals from the database"""
+
+    def test_signals_from_watchlist_and_history(self):
+        """Test that watchers and last scrape time are loaded per set"""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+
+        user = User(email="a@example.com", username="a", hashed_password="x")
+        lego_set = LegoSet(set_number="42100", name="Liebherr R 9800")
+        session.add_all([user, lego_set])
+        session.flush()
+        session.add(WatchlistItem(user_id=user.id, lego_set_id=lego_set.id))
+        session.add(PriceHistory(lego_set_id=lego_set.id, store_name="Allegro", price=1.0,
+                                 total_price=1.0, scraped_at=NOW))
+        session.commit()
+
+        candidates = {c.set_number: c for c in load_candidates(session, {"75362": 3}, seeds=["42115"])}
+
+        assert candidates["42100"].watchers == 1
+        assert candidates["42100"].last_scraped == NOW
+        assert candidates["75362"].searches == 3
+        assert candidates["42115"].last_scraped is None
+        session.close()
+
+
+class TestCrawlScheduler:
+    """Test cases for scheduler ticks"""
+
+    def test_refresh_crawls_several_pages(self, monkeypatch):
+        """Test that a scheduled refresh queues a multi-page crawl on the store's queue"""
+        sent = []
+        monkeypatch.setattr("app.tasks.enqueue_search", lambda *args, **kwargs: sent.append((args, kwargs)))
+
+        enqueue_refresh("olx", "42100")
+
+        assert sent == [(("lego 42100", ["olx"]), {"max_pages": CRAWL_REFRESH_PAGES})]
+
+    @pytest.mark.asyncio
+    async def test_tick_dispatches_plan(self, monkeypatch):
+        """Test that a leader tick dispatches every planned refresh"""
+        dispatched = []
+        scheduler = CrawlScheduler(store_keys=["allegro"], dispatch=lambda store, number: dispatched.append((store, number)))
+        monkeypatch.setattr(scheduler, "_plan", lambda searches, in_flight: [("allegro", "42100")])
+
+        plan = await scheduler.tick()
+
+        assert plan == dispatched == [("allegro", "42100")]
+        assert scheduler.is_leader
+        assert scheduler.stats()["dispatched"] == {"allegro": 1}
+
+    @pytest.mark.asyncio
+    async def test_dispatched_scrapes_not_dispatched_again(self, monkeypatch):
+        """Test that a scrape stays marked until its marker expires"""
+        dispatched = []
+        scheduler = CrawlScheduler(store_keys=["allegro"], dispatch=lambda store, number: dispatched.append((store, number)))
+        scheduler.markers = DispatchMarkers(redis_url=None, ttl=300)
+        planned_in_flight = []
+
+        def plan(searches, in_flight):
+            planned_in_flight.append(in_flight)
+            return [("allegro", "42100")]
+
+        monkeypatch.setattr(scheduler, "_plan", plan)
+
+        await scheduler.tick()
+        second = await scheduler.tick()
+
+        assert dispatched == [("allegro", "42100")]
+        assert second == []
+        assert planned_in_flight[1] == {("allegro", "42100")}
+        assert scheduler.stats()["skipped_in_flight"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_dispatch_is_planned_again(self, monkeypatch):
+        """Test that a scrape that could not be queued keeps no marker"""
+        def fail(store, number):
+            raise ConnectionError("broker down")
+
+        scheduler = CrawlScheduler(store_keys=["allegro"], dispatch=fail)
+        scheduler.markers = DispatchMarkers(redis_url=None, ttl=300)
+        monkeypatch.setattr(scheduler, "_plan", lambda searches, in_flight: [("allegro", "42100")])
+
+        await scheduler.tick()
+
+        assert scheduler.dispatch_errors == 1
+        assert await scheduler.markers.pending() == set()
+
+    @pytest.mark.asyncio
+    async def test_search_popularity_counts_set_searches(self):
+        """Test local popularity counting without Redis"""
+        popularity = SearchPopularity(redis_url=None)
+        await popularity.record("lego 42100")
+        await popularity.record("42100")
+        await popularity.record("star wars")
+
+        assert await popularity.counts() == {"42100": 2}
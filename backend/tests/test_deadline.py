@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app.main import cancel_on_disconnect
+from app.scraper.cache import cache_key, scrape_cache
+from app.scraper.deadline import Deadline, DeadlineExceeded, timeout_ms
+from app.scraper.fanout import fan_out, STATUS_TIMEOUT
+from app.scraper.health import get_store_health
+from app.scraper.runtime import run_search
+from tests.conftest import SlowScraper, FakePage
+
+
+class FakeRequest:
+    """Request stub that reports a disconnect after a number of polls"""
+
+    def __init__(self, connected_polls: int):
+        self.connected_polls = connected_polls
+
+    async def is_disconnected(self):
+        self.connected_polls -= 1
+        return self.connected_polls < 0
+
+
+class TestDeadline:
+    """Test cases for request deadlines"""
+
+    def test_caps_timeouts_to_remaining_budget(self):
+        """Test that long timeouts are shortened to the time left"""
+        deadline = Deadline(2.0)
+
+        assert timeout_ms(deadline, 30000) <= 2000
+        assert timeout_ms(deadline, 500) == 500
+        assert timeout_ms(None, 30000) == 30000
+
+    def test_expired_deadline_raises(self):
+        """Test that no new work starts once the budget is spent"""
+        deadline = Deadline(0)
+
+        assert deadline.expired
+        with pytest.raises(DeadlineExceeded):
+            deadline.cap_ms(1000)
+
+    @pytest.mark.asyncio
+    async def test_navigate_uses_capped_timeout(self):
+        """Test that page navigations never outlive the deadline"""
+        scraper = SlowScraper("DeadlineStore", 0)
+        page = FakePage()
+        scraper._consented_pages.add(page)
+
+        await scraper.navigate(page, "https://example.com", Deadline(1.0), wait_until="domcontentloaded")
+
+        assert 0 < page.goto_options["timeout"] <= 1000
+        assert page.goto_options["wait_until"] == "domcontentloaded"
+
+
+class TestDeadlinePropagation:
+    """Test cases for deadlines in store fan-out"""
+
+    @pytest.mark.asyncio
+    async def test_fan_out_stops_at_deadline(self):
+        """Test that a slow store is abandoned when the request budget runs out"""
+        scraper = SlowScraper("SlowDeadlineStore", 1.0)
+
+        results = await fan_out([scraper], ["42100"], deadline=Deadline(0.05))
+
+        assert results[0].status == STATUS_TIMEOUT
+        assert results[0].elapsed < 0.5
+        # Running out of request budget is not the store's fault
+        assert get_store_health(scraper.store_key).to_dict()["samples"] == 0
+
+    @pytest.mark.asyncio
+    async def test_result_after_deadline_not_cached(self):
+        """Test that results finished past the deadline are not cached"""
+        scraper = SlowScraper("LateStore", 0.05)
+
+        result = await run_search(scraper, "42100", Deadline(0.01))
+
+        assert len(result.sets) == 1
+        assert await scrape_cache.get(cache_key(scraper.store_key, "search", "42100")) is None
+
+
+class TestClientDisconnect:
+    """Test cases for cancelling work of disconnected clients"""
+
+    @pytest.mark.asyncio
+    async def test_disconnect_cancels_work(self, monkeypatch):
+        """Test that the scrape task is cancelled when the client leaves"""
+        monkeypatch.setattr("app.main.DISCONNECT_POLL_SECONDS", 0.01)
+        cancelled = []
+
+        async def long_scrape():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        with pytest.raises(HTTPException) as error:
+            await cancel_on_disconnect(FakeRequest(connected_polls=2), long_scrape())
+        await asyncio.sleep(0)
+
+        assert error.value.status_code == 499
+        assert cancelled == [True]
+
+    @pytest.mark.asyncio
+    async def test_connected_client_gets_result(self, monkeypatch):
+        """Test that work finishes normally while the client stays"""
+        monkeypatch.setattr("app.main.DISCONNECT_POLL_SECONDS", 0.01)
+
+        async def quick_scrape():
+            await asyncio.sleep(0.03)
+            return "done"
+
+        assert await cancel_on_disconnect(FakeRequest(connected_polls=100), quick_scrape()) == "done"
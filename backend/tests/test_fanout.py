@@ -0,0 +1,79 @@
+import time
+import pytest
+from app.scraper.allegro_scraper import AllegroScraper
+from app.scraper.fanout import fan_out, combine_sets, summarize_stores, STATUS_OK, STATUS_TIMEOUT, STATUS_ERROR
+from tests.conftest import SlowScraper
+
+
+class TestFanOut:
+    """Test cases for concurrent store fan-out"""
+    
+    @pytest.mark.asyncio
+    async def test_stores_run_concurrently(self):
+        """Test that latency is the slowest store, not the sum"""
+        scrapers = [SlowScraper("A", 0.2), SlowScraper("B", 0.2), SlowScraper("C", 0.2)]
+        
+        started = time.monotonic()
+        results = await fan_out(scrapers, ["lego 42100"], timeout=5)
+        elapsed = time.monotonic() - started
+        
+        assert elapsed < 0.5
+        assert [r.store_name for r in results] == ["A", "B", "C"]
+        assert all(r.status == STATUS_OK for r in results)
+        assert len(combine_sets(results)) == 3
+    
+    @pytest.mark.asyncio
+    async def test_partial_results_on_timeout_and_error(self):
+        """Test that slow and failing stores do not fail the whole fan-out"""
+        scrapers = [SlowScraper("Fast", 0.01), SlowScraper("Slow", 2.0), SlowScraper("Broken", 0.01, fail=True)]
+        
+        results = await fan_out(scrapers, ["lego 42100"], timeout=0.2)
+        statuses = {r.store_name: r.status for r in results}
+        
+        assert statuses == {"Fast": STATUS_OK, "Slow": STATUS_TIMEOUT, "Broken": STATUS_ERROR}
+        assert len(combine_sets(results)) == 1
+    
+    @pytest.mark.asyncio
+    async def test_multiple_queries(self):
+        """Test that every store/query pair is scraped in query-then-store order"""
+        scrapers = [SlowScraper("A", 0.01), SlowScraper("B", 0.01)]
+        
+        results = await fan_out(scrapers, ["q1", "q2"], timeout=5)
+        
+        assert [(r.query, r.store_name) for r in results] == [("q1", "A"), ("q1", "B"), ("q2", "A"), ("q2", "B")]
+
+    @pytest.mark.asyncio
+    async def test_failed_store_shows_flagged_samples(self, monkeypatch):
+        """Test that placeholder offers of a failed store are shown, flagged, and never submitted"""
+        scraper = AllegroScraper()
+        submitted = []
+        
+        async def broken_fetch(url, deadline=None, spec=None):
+            raise RuntimeError("blocked")
+        
+        monkeypatch.setattr(scraper, "fetch_listings", broken_fetch)
+        monkeypatch.setattr("app.scraper.runtime.offer_writer.submit", submitted.extend)
+        
+        results = await fan_out([scraper], ["lego 42100"], timeout=5)
+        
+        assert results[0].status == STATUS_ERROR
+        assert results[0].sample
+        assert summarize_stores(results)[0]["sample"] is True
+        assert {s.set_number for s in results[0].sets} == {"42100", "75362", "42115"}
+        assert submitted == []
+    
+    @pytest.mark.asyncio
+    async def test_samples_can_be_disabled(self, monkeypatch):
+        """Test that production setups show an empty result instead of samples"""
+        monkeypatch.setattr("app.scraper.fanout.SCRAPER_SAMPLE_FALLBACK", False)
+        scraper = AllegroScraper()
+        
+        async def broken_fetch(url, deadline=None, spec=None):
+            raise RuntimeError("blocked")
+        
+        monkeypatch.setattr(scraper, "fetch_listings", broken_fetch)
+        
+        results = await fan_out([scraper], ["lego 42100"], timeout=5)
+        
+        assert results[0].sets == []
+        assert not results[0].sample
@@ -0,0 +1,149 @@
+import pytest
+from app.scraper import base_scraper, throttle as throttle_module
+from app.scraper.ceneo_scraper import CeneoScraper
+from app.scraper.extraction import parse_listings_html
+from app.scraper.fetcher import FetchResult, TIER_HTTP, detect_js_wall, fetch_listings_http, get_tier_stats, http_fetcher
+from app.scraper import health as health_module
+from app.scraper.throttle import OUTCOME_THROTTLED, StoreThrottled
+
+
+CENEO_HTML = """
+<html><body>
+  <div class="cat-prod-row">
+    <strong class="cat-prod-row__name"><a href="/123456">LEGO Technic 42100 Liebherr</a></strong>
+    <span class="cat-prod-row__price">2 349,99 zł</span>
+    <img data-src="https://image.ceneostatic.pl/42100.jpg">
+  </div>
+  <div class="cat-prod-row">
+    <strong class="cat-prod-row__name"><a href="/654321">LEGO Star Wars 75362</a></strong>
+    <span class="cat-prod-row__price">od 169 zł</span>
+  </div>
+</body></html>
+"""
+
+
+class TestParseListingsHtml:
+    """Test cases for the static HTML listing parser"""
+    
+    def test_parse_ceneo_listings(self):
+        """Test parsing server-rendered Ceneo results with the store's spec"""
+        records = parse_listings_html(CENEO_HTML, CeneoScraper().selector_spec)
+        
+        assert len(records) == 2
+        assert records[0]["title"] == "LEGO Technic 42100 Liebherr"
+        assert records[0]["price_text"] == "2 349,99 zł"
+        assert records[0]["href"] == "/123456"
+        assert records[0]["image"] == "https://image.ceneostatic.pl/42100.jpg"
+        assert records[0]["listing_selector"] == ".cat-prod-row"
+        assert records[1]["image"] is None
+    
+    def test_parse_empty_page(self):
+        """Test that a page without listings yields no records"""
+        assert parse_listings_html("<html><body></body></html>", CeneoScraper().selector_spec) == []
+    
+    def test_detect_js_wall(self):
+        """Test bot challenge detection"""
+        assert detect_js_wall("<noscript>Please enable JavaScript to continue</noscript>")
+        assert not detect_js_wall(CENEO_HTML)
+
+
+class TestTieredFetch:
+    """Test cases for HTTP-first fetching with browser fallback"""
+    
+    @pytest.mark.asyncio
+    async def test_http_tier_serves_when_parse_succeeds(self, monkeypatch):
+        """Test that the browser is not used when HTTP yields listings"""
+        scraper = CeneoScraper()
+        
+        async def fake_http(url, spec, headers=None, deadline=None):
+            return FetchResult([{"title": "LEGO 42100"}], TIER_HTTP)
+        
+        async def fail_browser(url, deadline=None):
+            raise AssertionError("browser should not be used")
+        
+        monkeypatch.setattr(base_scraper, "fetch_listings_http", fake_http)
+        monkeypatch.setattr(scraper, "fetch_listings_browser", fail_browser)
+        
+        before = get_tier_stats("ceneo").served["http"]
+        records = await scraper.fetch_listings("https://www.ceneo.pl/;szukaj-lego")
+        
+        assert records == [{"title": "LEGO 42100"}]
+        assert get_tier_stats("ceneo").served["http"] == before + 1
+    
+    @pytest.mark.asyncio
+    async def test_escalates_to_browser_on_js_wall(self, monkeypatch):
+        """Test escalation to the browser when the HTTP tier hits a JS wall"""
+        scraper = CeneoScraper()
+        
+        async def fake_http(url, spec, headers=None, deadline=None):
+            return FetchResult([], TIER_HTTP, "js_wall")
+        
+        async def fake_browser(url, deadline=None):
+            return [{"title": "LEGO 42100 from browser"}]
+        
+        monkeypatch.setattr(base_scraper, "fetch_listings_http", fake_http)
+        monkeypatch.setattr(scraper, "fetch_listings_browser", fake_browser)
+        
+        before = get_tier_stats("ceneo").escalations.get("js_wall", 0)
+        records = await scraper.fetch_listings("https://www.ceneo.pl/;szukaj-lego")
+        
+        assert records == [{"title": "LEGO 42100 from browser"}]
+        assert get_tier_stats("ceneo").escalations["js_wall"] == before + 1
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_status_raises(self, monkeypatch):
+        """Test that a 429 from the HTTP tier is reported as throttling, not an escalation"""
+        class Response:
+            status_code = 429
+            text = ""
+
+        async def fake_get(url, headers=None, timeout=None):
+            return Response()
+
+        monkeypatch.setattr(http_fetcher, "get", fake_get)
+
+        with pytest.raises(StoreThrottled) as error:
+            await fetch_listings_http("https://www.ceneo.pl/;szukaj-lego", CeneoScraper().selector_spec)
+
+        assert error.value.status == 429
+
+    @pytest.mark.asyncio
+    async def test_forbidden_challenge_page_escalates(self, monkeypatch):
+        """Test that a bot challenge served with a 403 goes to the browser instead of throttling"""
+        class Response:
+            status_code = 403
+            text = "<html><body>Please complete the captcha</body></html>"
+
+        async def fake_get(url, headers=None, timeout=None):
+            return Response()
+
+        monkeypatch.setattr(http_fetcher, "get", fake_get)
+
+        result = await fetch_listings_http("https://www.ceneo.pl/;szukaj-lego", CeneoScraper().selector_spec)
+
+        assert result.records == []
+        assert result.escalation_reason == "js_wall"
+
+    @pytest.mark.asyncio
+    async def test_throttled_http_tier_backs_off_without_browser(self, monkeypatch):
+        """Test that a rate-limited HTTP fetch records the backoff and never opens the browser"""
+        monkeypatch.setattr(throttle_module, "throttles", {})
+        monkeypatch.setattr(health_module, "health_registry", {})
+        scraper = CeneoScraper()
+
+        async def fake_http(url, spec, headers=None, deadline=None):
+            raise StoreThrottled(403)
+
+        async def fail_browser(url, deadline=None):
+            raise AssertionError("browser should not be used")
+
+        monkeypatch.setattr(base_scraper, "fetch_listings_http", fake_http)
+        monkeypatch.setattr(scraper, "fetch_listings_browser", fail_browser)
+
+        with pytest.raises(StoreThrottled):
+            await scraper.fetch_listings("https://www.ceneo.pl/;szukaj-lego")
+
+        assert throttle_module.get_throttle(scraper).outcomes == {OUTCOME_THROTTLED: 1}
+        health = health_module.get_store_health("ceneo").to_dict()
+        assert health["consecutive_failures"] == 1
+        assert health["success_rate"] == 0.0
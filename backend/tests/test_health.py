@@ -0,0 +1,98 @@
+import pytest
+from app.scraper.health import (
+    CircuitBreaker, CircuitOpen, StoreHealth, get_store_health, percentile,
+    STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+)
+from tests.conftest import SlowScraper
+
+
+class TestCircuitBreaker:
+    """Test cases for per-store circuit breaking"""
+    
+    def test_opens_after_consecutive_failures(self):
+        """Test that the circuit opens at the failure threshold and then fails fast"""
+        breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60)
+        for _ in range(3):
+            assert breaker.allow()
+            breaker.record_failure()
+        
+        assert breaker.state == STATE_OPEN
+        assert not breaker.allow()
+        assert breaker.rejected == 1
+    
+    def test_success_resets_failure_count(self):
+        """Test that only consecutive failures count"""
+        breaker = CircuitBreaker(failure_threshold=3)
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        
+        assert breaker.state == STATE_CLOSED
+    
+    def test_half_open_probe_closes_or_reopens(self):
+        """Test that after the reset time one probe decides the circuit state"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0, half_open_probes=1)
+        breaker.record_failure()
+        
+        assert breaker.state == STATE_HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_success()
+        assert breaker.state == STATE_CLOSED
+    
+    def test_abandoned_probe_frees_slot(self):
+        """Test that a cancelled probe lets another probe through"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0, half_open_probes=1)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.abandon()
+        
+        assert breaker.allow()
+
+
+class TestStoreHealth:
+    """Test cases for rolling store health metrics"""
+    
+    def test_success_rate_and_percentiles(self):
+        """Test rolling success rate and latency percentiles"""
+        health = StoreHealth("store")
+        for latency in [0.1, 0.2, 0.3, 0.4]:
+            health.record(True, latency)
+        health.record(False, 2.0)
+        
+        stats = health.to_dict()
+        assert stats["success_rate"] == 0.8
+        assert stats["p50_ms"] == 300
+        assert stats["p95_ms"] == 2000
+        assert stats["circuit"] == STATE_CLOSED
+    
+    def test_percentile_empty(self):
+        """Test that percentiles of no samples are undefined"""
+        assert percentile([], 0.5) is None
+
+
+class TestScraperCircuit:
+    """Test cases for fast-failing listing fetches"""
+    
+    @pytest.mark.asyncio
+    async def test_open_circuit_skips_store(self):
+        """Test that an open circuit fails fast without fetching"""
+        scraper = SlowScraper("BrokenStore", 0)
+        scraper.rate_limit = 100
+        calls = []
+        
+        async def fetch_listings_browser(url, deadline=None):
+            calls.append(url)
+            raise RuntimeError("connection refused")
+        
+        scraper.fetch_listings_browser = fetch_listings_browser
+        health = get_store_health(scraper.store_key)
+        for _ in range(health.breaker.failure_threshold):
+            with pytest.raises(RuntimeError):
+                await scraper.fetch_listings("https://example.com")
+        
+        with pytest.raises(CircuitOpen):
+            await scraper.fetch_listings("https://example.com")
+        assert len(calls) == health.breaker.failure_threshold
+        assert health.service_status() == "unavailable"
@@ -0,0 +1,160 @@
+import os
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Base, PriceHistory
+from app.database.price_history import record_offers
+from app.journal import loader
+from app.journal.loader import load_segments, replay
+from app.journal.scrape_journal import ScrapeJournal, closed_segments, loaded_segments, read_segment, scrape_journal
+from app.scraper.olx_scraper import OlxScraper
+from tests.conftest import make_offer
+
+RECORD = {"title": "LEGO Technic 42100 Liebherr nowy", "price_text": "2 100 zł", "href": "/d/oferta/42100.html"}
+
+
+@pytest.fixture
+def session_factory():
+    """In-memory SQLite session factory"""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+class TestScrapeJournal:
+    """Test cases for the append-only scrape journal"""
+
+    def test_segments_rotate_by_size(self, tmp_path):
+        """Test that a full segment is closed and a new one started"""
+        journal = ScrapeJournal(str(tmp_path), segment_bytes=200)
+
+        for _ in range(3):
+            journal.append("Allegro", "lego 42100", [RECORD], [make_offer()])
+
+        assert len(closed_segments(str(tmp_path))) == 3
+        assert journal.stats()["current_segment"] is None
+
+    def test_open_segment_is_not_loaded(self, tmp_path):
+        """Test that the loader waits until a live segment is closed"""
+        journal = ScrapeJournal(str(tmp_path))
+        journal.append("Allegro", "lego 42100", [RECORD], [make_offer()])
+
+        assert closed_segments(str(tmp_path)) == []
+        assert len(closed_segments(str(tmp_path), stale_after=0)) == 1
+
+        journal.close()
+        assert len(closed_segments(str(tmp_path))) == 1
+
+    def test_torn_line_is_skipped(self, tmp_path):
+        """Test that a line cut short by a crash does not break reading"""
+        journal = ScrapeJournal(str(tmp_path))
+        journal.append("Allegro", "lego 42100", [RECORD], [make_offer()])
+        journal.close()
+        path = closed_segments(str(tmp_path))[0]
+        with open(path, "a") as f:
+            f.write('{"ts": 1, "store": "Allegro", "off')
+
+        assert len(list(read_segment(path))) == 1
+
+    @pytest.mark.asyncio
+    async def test_scrapers_journal_parsed_pages(self, monkeypatch):
+        """Test that a search writes its raw records and offers to the journal"""
+        scraper = OlxScraper()
+
+        async def fake_fetch(url, deadline=None, spec=None):
+            return [RECORD]
+
+        monkeypatch.setattr(scraper, "fetch_listings", fake_fetch)
+
+        await scraper.search_sets("lego 42100")
+        scrape_journal.close()
+
+        entries = list(read_segment(closed_segments(scrape_journal.directory)[0]))
+        assert entries[0]["records"] == [RECORD]
+        assert entries[0]["offers"][0]["n"] == "42100"
+
+
+class TestJournalLoader:
+    """Test cases for loading and replaying journal segments"""
+
+    @pytest.mark.asyncio
+    async def test_load_ingests_and_moves_segments(self, tmp_path, session_factory):
+        """Test that closed segments go into price history exactly once"""
+        journal = ScrapeJournal(str(tmp_path))
+        journal.append("Allegro", "lego 42100", [RECORD], [make_offer(), make_offer(price=2300.0)])
+        journal.close()
+
+        first = await load_segments(str(tmp_path), session_factory=session_factory)
+        second = await load_segments(str(tmp_path), session_factory=session_factory)
+
+        assert first == {"segments": 1, "offers": 2}
+        assert second == {"segments": 0, "offers": 0}
+        assert len(loaded_segments(str(tmp_path))) == 1
+        session = session_factory()
+        assert session.query(PriceHistory).count() == 2
+        session.close()
+
+    @pytest.mark.asyncio
+    async def test_load_skips_offers_already_stored(self, tmp_path, session_factory):
+        """Test that loading a segment whose offers were written by the offer writer adds nothing"""
+        offers = [make_offer(), make_offer(price=2300.0, store_url="https://allegro.pl/oferta/2")]
+        session = session_factory()
+        record_offers(session, offers)
+        session.commit()
+        journal = ScrapeJournal(str(tmp_path))
+        journal.append("Allegro", "lego 42100", [RECORD], offers)
+        journal.close()
+
+        result = await load_segments(str(tmp_path), session_factory=session_factory)
+
+        assert result == {"segments": 1, "offers": 0}
+        assert session.query(PriceHistory).count() == 2
+        session.close()
+
+    @pytest.mark.asyncio
+    async def test_old_segment_does_not_become_newest(self, tmp_path, session_factory):
+        """Test that a late segment does not override a newer stored price"""
+        newer = make_offer(price=2100.0)
+        newer.last_updated = datetime(2024, 1, 2, 12, 0)
+        session = session_factory()
+        record_offers(session, [newer])
+        session.commit()
+        journal = ScrapeJournal(str(tmp_path))
+        journal.append("Allegro", "lego 42100", [RECORD], [make_offer(price=2400.0)])
+        journal.close()
+
+        result = await load_segments(str(tmp_path), session_factory=session_factory)
+
+        assert result["offers"] == 0
+        assert [row.total_price for row in session.query(PriceHistory)] == [2100.0]
+        session.close()
+
+    @pytest.mark.asyncio
+    async def test_load_can_reparse_raw_records(self, tmp_path, session_factory, monkeypatch):
+        """Test that records are parsed again by the current scrapers on request"""
+        monkeypatch.setattr(loader, "_get_scrapers", lambda: {"olx": OlxScraper()})
+        journal = ScrapeJournal(str(tmp_path))
+        # A parser bug once produced no offers from this page
+        journal.append("OLX", "lego 42100", [RECORD], [])
+        journal.close()
+
+        result = await load_segments(str(tmp_path), reparse=True, session_factory=session_factory)
+
+        assert result["offers"] == 1
+
+    @pytest.mark.asyncio
+    async def test_replay_runs_analyzer(self, tmp_path, session_factory):
+        """Test that historical offers can be analyzed again"""
+        journal = ScrapeJournal(str(tmp_path), segment_bytes=1)
+        journal.append("Allegro", "lego 42100", [RECORD], [make_offer(price=2400.0)])
+        journal.append("Allegro", "lego 42100", [RECORD], [make_offer(price=2000.0)])
+        await load_segments(str(tmp_path), session_factory=session_factory)
+        journal.append("Allegro", "lego 42100", [RECORD], [make_offer(price=2200.0)])
+
+        recommendations = await replay(str(tmp_path))
+
+        assert len(recommendations) == 1
+        assert recommendations[0].current_best_price == 2000.0
+        assert os.path.isdir(os.path.join(str(tmp_path), "loaded"))
@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.models import Base, LegoSet, PriceHistory
+from app.database.offer_writer import OfferWriter
+from app.scraper.runtime import run_search
+from tests.conftest import SlowScraper, make_offer
+
+
+@pytest.fixture
+def session_factory():
+    """In-memory SQLite shared with the writer's flush thread"""
+    engine = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def count_rows(session_factory, model) -> int:
+    session = session_factory()
+    try:
+        return session.query(model).count()
+    finally:
+        session.close()
+
+
+class TestOfferWriter:
+    """Test cases for write-behind persistence of scraped offers"""
+
+    @pytest.mark.asyncio
+    async def test_ignored_until_started(self, session_factory):
+        """Test that processes without a running writer do not buffer offers"""
+        writer = OfferWriter(session_factory)
+
+        writer.submit([make_offer()])
+
+        assert writer.stats()["buffered"] == 0
+
+    @pytest.mark.asyncio
+    async def test_flushes_on_batch_size(self, session_factory):
+        """Test that a full batch is written without waiting for the timer"""
+        writer = OfferWriter(session_factory, batch_size=3, flush_seconds=60)
+        writer.start()
+
+        writer.submit([make_offer(store_url=f"https://allegro.pl/oferta/{i}") for i in range(3)])
+        await asyncio.sleep(0.1)
+
+        assert count_rows(session_factory, PriceHistory) == 3
+        assert count_rows(session_factory, LegoSet) == 1
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_flushes_on_timer(self, session_factory):
+        """Test that a partial batch is written after the flush interval"""
+        writer = OfferWriter(session_factory, batch_size=100, flush_seconds=0.05)
+        writer.start()
+
+        writer.submit([make_offer()])
+        await asyncio.sleep(0.2)
+
+        assert count_rows(session_factory, PriceHistory) == 1
+        assert writer.stats()["flushes"] == 1
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_stop_writes_remaining_offers(self, session_factory):
+        """Test that shutting down does not lose buffered offers"""
+        writer = OfferWriter(session_factory, batch_size=100, flush_seconds=60)
+        writer.start()
+        writer.submit([make_offer(), make_offer(set_number="42115")])
+
+        await writer.stop()
+
+        assert count_rows(session_factory, PriceHistory) == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_offers(self):
+        """Test that offers survive a database outage, up to the buffer bound"""
+        def broken_session():
+            raise RuntimeError("database unavailable")
+
+        writer = OfferWriter(broken_session, batch_size=100, flush_seconds=60, max_buffer=2)
+        writer.start()
+        writer.submit([make_offer(), make_offer(), make_offer()])
+
+        await writer.flush()
+
+        stats = writer.stats()
+        assert stats["buffered"] == 2
+        assert stats["dropped"] == 1
+        assert stats["failures"] == 1
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_fresh_scrapes_are_submitted(self, session_factory, monkeypatch):
+        """Test that scraped offers reach the writer while cache hits do not"""
+        writer = OfferWriter(session_factory, batch_size=100, flush_seconds=60)
+        monkeypatch.setattr("app.scraper.runtime.offer_writer", writer)
+        writer.start()
+        scraper = SlowScraper("WriterStore", 0)
+
+        await run_search(scraper, "lego 42100")
+        await run_search(scraper, "lego 42100")
+
+        assert writer.stats()["submitted"] == 1
+        await writer.stop()
+        assert count_rows(session_factory, PriceHistory) == 1
@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from app.scraper.priority import (
+    PriorityGate, current_lane, priority_lane, LANE_BACKGROUND, LANE_INTERACTIVE
+)
+
+
+class TestPriorityGate:
+    """Test cases for interactive and background capacity lanes"""
+    
+    @pytest.mark.asyncio
+    async def test_background_leaves_reserved_capacity(self):
+        """Test that background work cannot take the reserved interactive slots"""
+        gate = PriorityGate(capacity=3, reserved=1)
+        await gate.acquire(LANE_BACKGROUND)
+        await gate.acquire(LANE_BACKGROUND)
+        
+        blocked = asyncio.create_task(gate.acquire(LANE_BACKGROUND))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        
+        await asyncio.wait_for(gate.acquire(LANE_INTERACTIVE), timeout=0.1)
+        assert gate.in_use == {LANE_INTERACTIVE: 1, LANE_BACKGROUND: 2}
+        blocked.cancel()
+    
+    @pytest.mark.asyncio
+    async def test_interactive_jumps_background_queue(self):
+        """Test that queued interactive work is admitted before queued background work"""
+        gate = PriorityGate(capacity=1, reserved=0)
+        await gate.acquire(LANE_BACKGROUND)
+        order = []
+        
+        async def wait_in(lane):
+            await gate.acquire(lane)
+            order.append(lane)
+            gate.release(lane)
+        
+        background = asyncio.create_task(wait_in(LANE_BACKGROUND))
+        await asyncio.sleep(0.01)
+        interactive = asyncio.create_task(wait_in(LANE_INTERACTIVE))
+        await asyncio.sleep(0.01)
+        
+        gate.release(LANE_BACKGROUND)
+        await asyncio.gather(background, interactive)
+        
+        assert order == [LANE_INTERACTIVE, LANE_BACKGROUND]
+    
+    @pytest.mark.asyncio
+    async def test_queue_wait_recorded_per_lane(self):
+        """Test queue-wait metrics"""
+        gate = PriorityGate(capacity=1, reserved=0)
+        async with gate.slot(LANE_INTERACTIVE):
+            waiting = asyncio.create_task(gate.acquire(LANE_INTERACTIVE))
+            await asyncio.sleep(0.05)
+        await waiting
+        
+        stats = gate.to_dict()["lanes"][LANE_INTERACTIVE]
+        assert stats["acquired"] == 2
+        assert stats["queued"] == 1
+        assert stats["max_wait_ms"] >= 40
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        """Test that an abandoned waiter does not hold capacity"""
+        gate = PriorityGate(capacity=1, reserved=0)
+        await gate.acquire(LANE_INTERACTIVE)
+        waiter = asyncio.create_task(gate.acquire(LANE_INTERACTIVE))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.sleep(0.01)
+        gate.release(LANE_INTERACTIVE)
+        
+        assert gate.in_use[LANE_INTERACTIVE] == 0
+    
+    @pytest.mark.asyncio
+    async def test_slot_uses_current_lane(self):
+        """Test that work inherits the lane of the task that started it"""
+        gate = PriorityGate(capacity=2, reserved=0)
+        assert current_lane.get() == LANE_INTERACTIVE
+        
+        with priority_lane(LANE_BACKGROUND):
+            async with gate.slot() as lane:
+                assert lane == LANE_BACKGROUND
+        
+        assert current_lane.get() == LANE_INTERACTIVE
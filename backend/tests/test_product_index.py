@@ -0,0 +1,137 @@
+import time
+import pytest
+from app.scraper.allegro_scraper import AllegroScraper
+from app.scraper.ceneo_scraper import CeneoScraper
+from app.scraper.product_index import ProductIndex
+from tests.conftest import PRODUCT_URL, make_set
+
+class TestProductIndex:
+    """Test cases for the set number to product page index"""
+
+    def test_learns_set_numbers_only(self):
+        """Test that results without a real set number are not indexed"""
+        index = ProductIndex()
+
+        added = index.learn([make_set("42100", PRODUCT_URL), make_set("LEGO_3", "https://example.com")])
+
+        assert added == 1
+        assert index.get("42100") == PRODUCT_URL
+        assert index.get("LEGO_3") is None
+
+    def test_persists_across_restarts(self, tmp_path):
+        """Test that a new index loads the entries saved by the previous one"""
+        path = str(tmp_path / "ceneo.products.json")
+        ProductIndex(path).learn([make_set("42100", PRODUCT_URL)])
+
+        assert ProductIndex(path).get("42100") == PRODUCT_URL
+
+    def test_expired_entries_miss(self):
+        """Test that old entries are not trusted"""
+        index = ProductIndex(ttl=60)
+        index.learn([make_set("42100", PRODUCT_URL)])
+        index.entries["42100"]["indexed_at"] = time.time() - 120
+
+        assert index.get("42100") is None
+        assert index.to_dict()["misses"] == 1
+
+
+class TestSetLookup:
+    """Test cases for set lookups through the product index"""
+
+    @pytest.mark.asyncio
+    async def test_indexed_set_fetches_product_page(self, monkeypatch):
+        """Test that an indexed set is read from its product page without searching"""
+        scraper = CeneoScraper()
+        scraper.product_index.learn([make_set("42100", PRODUCT_URL)])
+        fetched = []
+
+        async def fake_fetch(url, deadline=None, spec=None):
+            fetched.append((url, spec))
+            return [{"title": "LEGO Technic 42100 Liebherr R 9800", "price_text": "1 899,00 zł"}]
+
+        async def fail_search(query, deadline=None):
+            raise AssertionError("search should not be used")
+
+        monkeypatch.setattr(scraper, "fetch_listings", fake_fetch)
+        monkeypatch.setattr(scraper, "search_sets", fail_search)
+
+        lego_set = await scraper.get_set_details("42100")
+
+        assert lego_set.set_number == "42100"
+        assert lego_set.store_url == PRODUCT_URL
+        assert fetched == [(PRODUCT_URL, scraper.product_spec)]
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_falls_back_to_search(self, monkeypatch):
+        """Test that a page no longer showing the set is evicted and search is used"""
+        scraper = CeneoScraper()
+        scraper.product_index.learn([make_set("42100", PRODUCT_URL)])
+
+        async def fake_fetch(url, deadline=None, spec=None):
+            return [{"title": "LEGO City 60337", "price_text": "499 zł"}]
+
+        async def fake_search(query, deadline=None):
+            return [make_set("42100", "https://www.ceneo.pl/11111111")]
+
+        monkeypatch.setattr(scraper, "fetch_listings", fake_fetch)
+        monkeypatch.setattr(scraper, "search_sets", fake_search)
+
+        lego_set = await scraper.get_set_details("42100")
+
+        assert lego_set.store_url == "https://www.ceneo.pl/11111111"
+        assert scraper.product_index.to_dict()["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_search_results_are_indexed(self, monkeypatch):
+        """Test that search results teach the index where a set's page is"""
+        scraper = CeneoScraper()
+
+        async def fake_fetch(url, deadline=None, spec=None):
+            return [{"title": "LEGO Technic 42100 Liebherr", "price_text": "1 899 zł", "href": "/98765432"}]
+
+        monkeypatch.setattr(scraper, "fetch_listings", fake_fetch)
+
+        await scraper.search_sets("lego 42100")
+
+        assert scraper.product_index.get("42100") == PRODUCT_URL
+
+    @pytest.mark.asyncio
+    async def test_product_page_yields_every_offer(self, monkeypatch):
+        """Test that all shop offers on an indexed product page are returned"""
+        scraper = CeneoScraper()
+        scraper.product_index.learn([make_set("42100", PRODUCT_URL)])
+
+        async def fake_fetch(url, deadline=None, spec=None):
+            return [
+                {"title": "LEGO Technic 42100 Liebherr R 9800", "price_text": "1 899,00 zł", "href": "/Click/Offer/1"},
+                {"title": None, "price_text": "1 949,00 zł", "href": "/Click/Offer/2"},
+            ]
+
+        monkeypatch.setattr(scraper, "fetch_listings", fake_fetch)
+
+        offers = await scraper.get_set_offers("42100")
+
+        assert [offer.price for offer in offers] == [1899.0, 1949.0]
+        assert [offer.store_url for offer in offers] == [
+            "https://www.ceneo.pl/Click/Offer/1", "https://www.ceneo.pl/Click/Offer/2"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_marketplace_searches_every_match(self, monkeypatch):
+        """Test that marketplace ads are not indexed and a lookup returns every exact match"""
+        scraper = AllegroScraper()
+
+        async def fake_search(query, deadline=None):
+            return [
+                make_set("42100", "https://allegro.pl/oferta/1"),
+                make_set("42100", "https://allegro.pl/oferta/2"),
+                make_set("42115", "https://allegro.pl/oferta/3"),
+            ]
+
+        monkeypatch.setattr(scraper, "search_sets", fake_search)
+
+        offers = await scraper.get_set_offers("42100")
+
+        assert [offer.store_url for offer in offers] == ["https://allegro.pl/oferta/1", "https://allegro.pl/oferta/2"]
+        assert scraper.product_spec is None
+        assert scraper.product_index.get("42100") is None
@@ -0,0 +1,56 @@
+import time
+import pytest
+from app.scraper.allegro_scraper import AllegroScraper
+from app.scraper.readiness import (
+    READY_EMPTY, READY_STABLE, READY_TIMEOUT, get_readiness_stats, wait_until_ready
+)
+from tests.conftest import FakePage
+
+
+class TestReadiness:
+    """Test cases for adaptive page readiness"""
+
+    @pytest.mark.asyncio
+    async def test_ready_once_count_is_stable(self):
+        """Test that waiting ends as soon as the listing count stops growing"""
+        page = FakePage(counts=[0, 4, 12, 20, 20])
+
+        outcome, elapsed, count = await wait_until_ready(page, [".item"], timeout=2000, poll=10, stable_polls=2)
+
+        assert outcome == READY_STABLE
+        assert count == 20
+        assert elapsed < 0.5
+
+    @pytest.mark.asyncio
+    async def test_hard_upper_bound(self):
+        """Test that a page that keeps changing is given up on at the timeout"""
+        page = FakePage(counts=list(range(1, 1000)))
+        started = time.monotonic()
+
+        outcome, _, count = await wait_until_ready(page, [".item"], timeout=100, poll=10)
+
+        assert outcome == READY_TIMEOUT
+        assert count > 0
+        assert time.monotonic() - started < 0.3
+
+    @pytest.mark.asyncio
+    async def test_empty_page(self):
+        """Test that a page without listings reports empty"""
+        outcome, _, count = await wait_until_ready(FakePage(counts=[0]), [".item"], timeout=50, poll=10)
+
+        assert outcome == READY_EMPTY
+        assert count == 0
+
+    @pytest.mark.asyncio
+    async def test_scraper_records_time_to_ready(self, monkeypatch):
+        """Test that each store's time-to-ready is recorded"""
+        monkeypatch.setenv("ALLEGRO_READY_TIMEOUT_MS", "1000")
+        scraper = AllegroScraper()
+        stats = get_readiness_stats(scraper.store_key)
+        before = stats.outcomes[READY_STABLE]
+
+        count = await scraper.wait_for_listings(FakePage(counts=[3, 8, 8]))
+
+        assert count == 8
+        assert stats.outcomes[READY_STABLE] == before + 1
+        assert stats.to_dict()["p95_ms"] is not None
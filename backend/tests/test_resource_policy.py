@@ -0,0 +1,46 @@
+import pytest
+from app.scraper.resource_policy import ResourcePolicy, ResourceStats, ESTIMATED_RESOURCE_BYTES
+
+
+class TestResourcePolicy:
+    """Test cases for lean navigation request interception"""
+    
+    def setup_method(self):
+        """Set up test fixtures"""
+        self.policy = ResourcePolicy(allowed_domains=["cookielaw.org"])
+    
+    def test_documents_always_allowed(self):
+        """Test that the page document itself is never blocked"""
+        assert self.policy.block_reason("document", "https://www.googletagmanager.com/") is None
+    
+    def test_heavy_resource_types_blocked(self):
+        """Test that images, fonts and media are blocked"""
+        assert self.policy.block_reason("image", "https://allegro.pl/a.jpg") == "resource_type"
+        assert self.policy.block_reason("font", "https://allegro.pl/a.woff2") == "resource_type"
+        assert self.policy.block_reason("media", "https://allegro.pl/a.mp4") == "resource_type"
+        assert self.policy.block_reason("script", "https://allegro.pl/app.js") is None
+        assert self.policy.block_reason("xhr", "https://allegro.pl/api/listing") is None
+    
+    def test_tracker_domains_blocked(self):
+        """Test that tracker hosts and their subdomains are blocked"""
+        assert self.policy.block_reason("script", "https://www.google-analytics.com/analytics.js") == "domain"
+        assert self.policy.block_reason("xhr", "https://stats.g.doubleclick.net/collect") == "domain"
+        assert self.policy.block_reason("script", "https://notdoubleclick.net/app.js") is None
+    
+    def test_allowed_domains_take_precedence(self):
+        """Test that allow-listed hosts are never blocked"""
+        assert self.policy.block_reason("script", "https://cdn.cookielaw.org/consent.js") is None
+        assert self.policy.block_reason("image", "https://cdn.cookielaw.org/logo.png") is None
+    
+    def test_stats_estimate_bytes_saved(self):
+        """Test blocked request counters"""
+        stats = ResourceStats()
+        stats.record_allowed()
+        stats.record_blocked("image", "resource_type")
+        stats.record_blocked("script", "domain")
+        
+        data = stats.to_dict()
+        assert data["allowed"] == 1
+        assert data["blocked"] == 2
+        assert data["blocked_by_type"] == {"image": 1, "script": 1}
+        assert data["estimated_bytes_saved"] == ESTIMATED_RESOURCE_BYTES["image"] + ESTIMATED_RESOURCE_BYTES["script"]
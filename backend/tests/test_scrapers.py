@@ -62,6 +62,45 @@ class TestAllegroScraper:
         assert self.scraper.get_shipping_cost(99.0) == 15.0
         assert self.scraper.get_shipping_cost(50.0) == 15.0
 
+    @pytest.mark.asyncio
+    async def test_record_to_set(self):
+        """Test building a LegoSet from an extracted listing record"""
+        record = {
+            "title": "LEGO Technic 42100 Liebherr R 9800 nowy",
+            "price_text": "2 399,00 zł",
+            "href": "/oferta/lego-42100-123",
+            "image": "https://a.allegroimg.com/42100.jpg"
+        }
+        
+        lego_set = await self.scraper._record_to_set(record, 0, "42100")
+        
+        assert lego_set.set_number == "42100"
+        assert lego_set.price == 2399.0
+        assert lego_set.condition == "new"
+        assert lego_set.store_url == "https://allegro.pl/oferta/lego-42100-123"
+        assert lego_set.image_url == "https://a.allegroimg.com/42100.jpg"
+        
+        assert await self.scraper._record_to_set({"title": "LEGO 42100", "price_text": None, "href": None}, 0, "42100") is None
+
+    @pytest.mark.asyncio
+    async def test_record_without_set_number_skipped(self):
+        """Test that listings without a set number are not given a made-up one"""
+        record = {"title": "Klocki LEGO mix 2 kg", "price_text": "150 zł", "href": "/oferta/klocki-1"}
+        
+        assert await self.scraper._record_to_set(record, 3, "lego") is None
+
+    @pytest.mark.asyncio
+    async def test_failed_search_raises_instead_of_sample_data(self, monkeypatch):
+        """Test that a failed scrape is reported rather than replaced by placeholder offers"""
+        async def broken_fetch(url, deadline=None, spec=None):
+            raise RuntimeError("blocked")
+        
+        monkeypatch.setattr(self.scraper, "fetch_listings", broken_fetch)
+        
+        with pytest.raises(RuntimeError):
+            await self.scraper.search_sets("lego 42100")
+        assert self.scraper.sample_sets("lego 42100")
+
 
 class TestOlxScraper:
     """Test cases for OlxScraper"""
@@ -118,6 +157,26 @@ class TestOlxScraper:
         assert self.scraper.get_shipping_cost(200.0) >= 0.0
         assert self.scraper.get_shipping_cost(50.0) >= 0.0
 
+    @pytest.mark.asyncio
+    async def test_record_to_set(self):
+        """Test building a LegoSet from an extracted listing record"""
+        record = {
+            "title": "LEGO 75362 Imperial Shuttle",
+            "price_text": "150 zł",
+            "href": "/d/oferta/lego-75362-ID1.html",
+            "image": None
+        }
+        
+        lego_set = await self.scraper._record_to_set(record)
+        
+        assert lego_set.set_number == "75362"
+        assert lego_set.total_price == 170.0
+        assert lego_set.condition == "used"
+        assert lego_set.store_url.endswith("/d/oferta/lego-75362-ID1.html")
+        
+        # Listings without a link are skipped
+        assert await self.scraper._record_to_set({**record, "href": None}) is None
+
 
 class TestCeneoScraper:
     """Test cases for CeneoScraper"""
@@ -172,4 +231,23 @@ class TestCeneoScraper:
         # Ceneo typically has different shipping rules
         # Test with various price ranges
         assert self.scraper.get_shipping_cost(200.0) >= 0.0
-        assert self.scraper.get_shipping_cost(50.0) >= 0.0 
\ No newline at end of file
+        assert self.scraper.get_shipping_cost(50.0) >= 0.0 
+
+    @pytest.mark.asyncio
+    async def test_record_to_set(self):
+        """Test building a LegoSet from an extracted listing record"""
+        record = {
+            "title": "LEGO Technic 42115 Lamborghini",
+            "price_text": "1 749,99 zł",
+            "href": "/123456",
+            "image": None
+        }
+        
+        lego_set = await self.scraper._record_to_set(record)
+        
+        assert lego_set.set_number == "42115"
+        assert lego_set.price == 1749.99
+        assert lego_set.condition == "new"
+        
+        # Listings without a set number in the title are skipped
+        assert await self.scraper._record_to_set({**record, "title": "Klocki"}) is None
@@ -0,0 +1,125 @@
+import asyncio
+import time
+import pytest
+from app.scraper import base_scraper
+from app.scraper.ceneo_scraper import CeneoScraper
+from app.scraper.fetcher import TIER_HTTP, FetchResult
+from app.scraper.selector_memory import CHAIN_CONTAINER, CHAIN_LISTING, SelectorMemory, race_selectors
+from tests.conftest import FakePage
+
+
+class TestSelectorMemory:
+    """Test cases for learned selector winners"""
+
+    def test_last_winner_tried_first(self):
+        """Test that the selector that matched last moves to the front"""
+        memory = SelectorMemory()
+        memory.record(CHAIN_LISTING, ".c")
+
+        assert memory.order(CHAIN_LISTING, [".a", ".b", ".c"]) == [".c", ".a", ".b"]
+        assert memory.order(CHAIN_CONTAINER, [".a", ".b"]) == [".a", ".b"]
+
+    def test_winner_persists_across_restarts(self, tmp_path):
+        """Test that a new memory loads the winner saved by the previous one"""
+        path = str(tmp_path / "store.selectors.json")
+        SelectorMemory(path).record(CHAIN_CONTAINER, ".b")
+
+        assert SelectorMemory(path).order(CHAIN_CONTAINER, [".a", ".b"]) == [".b", ".a"]
+
+    def test_hit_rates(self):
+        """Test per-selector hit rates and misses"""
+        memory = SelectorMemory()
+        memory.record(CHAIN_LISTING, ".a")
+        memory.record(CHAIN_LISTING, ".a")
+        memory.record(CHAIN_LISTING, ".b")
+        memory.record(CHAIN_LISTING, None)
+
+        stats = memory.to_dict()[CHAIN_LISTING]
+
+        assert stats["winner"] == ".b"
+        assert stats["misses"] == 1
+        assert stats["selectors"][".a"] == {"hits": 2, "hit_rate": 0.5}
+
+    def test_expired_winner_restores_original_order(self):
+        """Test that a fallback winner stops shadowing the precise selectors once it expires"""
+        memory = SelectorMemory(winner_ttl=60)
+        memory.record(CHAIN_LISTING, ".broad")
+        memory.chains[CHAIN_LISTING]["learned_at"] = time.time() - 61
+
+        assert memory.order(CHAIN_LISTING, [".precise", ".broad"]) == [".precise", ".broad"]
+
+        memory.record(CHAIN_LISTING, ".broad")
+
+        assert memory.order(CHAIN_LISTING, [".precise", ".broad"]) == [".broad", ".precise"]
+
+    @pytest.mark.asyncio
+    async def test_saves_debounced_off_loop(self, tmp_path, monkeypatch):
+        """Test that records on the event loop are written once, after the save delay"""
+        path = str(tmp_path / "store.selectors.json")
+        memory = SelectorMemory(path, save_delay=0.05)
+        writes = []
+        write = memory._write
+        monkeypatch.setattr(memory, "_write", lambda data: (writes.append(data), write(data)))
+
+        for _ in range(5):
+            memory.record(CHAIN_CONTAINER, ".b")
+        assert writes == []
+
+        await asyncio.sleep(0.2)
+
+        assert len(writes) == 1
+        assert SelectorMemory(path).to_dict()[CHAIN_CONTAINER]["runs"] == 5
+
+
+class TestSelectorRace:
+    """Test cases for racing fallback selectors"""
+
+    @pytest.mark.asyncio
+    async def test_race_costs_one_timeout(self):
+        """Test that stale selectors are waited on together, not in turn"""
+        page = FakePage(delays={".last": 0.05})
+        started = time.monotonic()
+
+        winner = await race_selectors(page, [".a", ".b", ".c", ".last"], timeout=300)
+
+        assert winner == ".last"
+        assert time.monotonic() - started < 0.2
+
+    @pytest.mark.asyncio
+    async def test_no_match_returns_none(self):
+        """Test that a page without any container yields None after one timeout"""
+        started = time.monotonic()
+
+        assert await race_selectors(FakePage(delays={}), [".a", ".b", ".c"], timeout=50) is None
+        assert time.monotonic() - started < 0.2
+
+    @pytest.mark.asyncio
+    async def test_scraper_remembers_container(self):
+        """Test that a store tries its last matching container first"""
+        scraper = CeneoScraper()
+        page = FakePage(delays={scraper.result_containers[2]: 0.01})
+
+        winner = await scraper.wait_for_results(page, scraper.result_containers)
+
+        assert winner == scraper.result_containers[2]
+        assert scraper.selector_memory.order(CHAIN_CONTAINER, scraper.result_containers)[0] == winner
+
+    @pytest.mark.asyncio
+    async def test_listing_winner_leads_spec(self, monkeypatch):
+        """Test that the listing selector that matched is tried first next time"""
+        scraper = CeneoScraper()
+        fallback = scraper.selector_spec.listing[-1]
+        specs = []
+
+        async def fake_http(url, spec, headers=None, deadline=None):
+            specs.append(spec)
+            return FetchResult([{"title": "LEGO 42100", "listing_selector": fallback}], TIER_HTTP)
+
+        monkeypatch.setattr(base_scraper, "fetch_listings_http", fake_http)
+
+        await scraper.fetch_listings("https://www.ceneo.pl/;szukaj-lego")
+        await scraper.fetch_listings("https://www.ceneo.pl/;szukaj-lego")
+
+        assert specs[0].listing[0] == scraper.selector_spec.listing[0]
+        assert specs[1].listing[0] == fallback
+        assert scraper.selector_memory.to_dict()[CHAIN_LISTING]["selectors"][fallback]["hits"] == 2
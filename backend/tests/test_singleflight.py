@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+from app.scraper.runtime import run_search, scrape_flight
+from app.scraper.singleflight import Singleflight
+from tests.conftest import SlowScraper
+
+
+class TestSingleflight:
+    """Test cases for in-flight call coalescing"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_execution(self):
+        """Test that concurrent callers of one key run the work once"""
+        flight = Singleflight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        results = await asyncio.gather(*[flight.do("k", work) for _ in range(5)])
+
+        assert results == ["result"] * 5
+        assert len(calls) == 1
+        stats = flight.stats()
+        assert stats["executions"] == 1
+        assert stats["coalesced"] == 4
+        assert stats["coalescing_ratio"] == 0.8
+        assert stats["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self):
+        """Test that a failure is raised to all coalesced callers"""
+        flight = Singleflight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("store down")
+
+        results = await asyncio.gather(flight.do("k", work), flight.do("k", work), return_exceptions=True)
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """Test that work continues while at least one caller still waits"""
+        flight = Singleflight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "result"
+
+        impatient = asyncio.create_task(flight.do("k", work))
+        patient = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+
+        assert await patient == "result"
+
+    @pytest.mark.asyncio
+    async def test_work_cancelled_when_all_callers_leave(self):
+        """Test that abandoned work does not keep running"""
+        flight = Singleflight()
+        finished = []
+
+        async def work():
+            await asyncio.sleep(0.05)
+            finished.append(1)
+
+        caller = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.08)
+
+        assert finished == []
+
+    @pytest.mark.asyncio
+    async def test_concurrent_searches_scrape_once(self):
+        """Test that identical concurrent store searches are coalesced"""
+        scraper = SlowScraper("FlightStore", 0.05)
+        calls = []
+        original = scraper.search_sets
+
+        async def counting_search(query, deadline=None):
+            calls.append(query)
+            return await original(query, deadline)
+
+        scraper.search_sets = counting_search
+        coalesced = scrape_flight.coalesced
+
+        results = await asyncio.gather(*[run_search(scraper, "lego 42100") for _ in range(10)])
+
+        assert len(calls) == 1
+        assert all(len(result.sets) == 1 for result in results)
+        assert scrape_flight.coalesced == coalesced + 9
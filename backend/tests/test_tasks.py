@@ -0,0 +1,285 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import tasks
+from app.celery_app import celery_app, queue_for_store, STORE_KEYS
+from app.database.models import Base, CurrentBestPrice, LegoSet, PriceHistory
+from app.database.price_history import offer_fingerprint, offer_key, record_offers
+from app.scraper.olx_scraper import OlxScraper
+from tests.conftest import PagedStore, SlowScraper, make_offer
+
+
+@pytest.fixture
+def session_factory():
+    """In-memory SQLite session factory"""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+class TestRecordOffers:
+    """Test cases for storing scraped offers as price history"""
+
+    def test_creates_catalog_and_history(self, session_factory):
+        """Test that unseen sets get a catalog row and every offer a history row"""
+        session = session_factory()
+        added = record_offers(session, [
+            make_offer(),
+            make_offer(price=2350.0, store_url="https://allegro.pl/oferta/2"),
+            make_offer(set_number="42115", price=1800.0)
+        ])
+        session.commit()
+
+        assert added == 3
+        assert session.query(LegoSet).count() == 2
+        assert session.query(PriceHistory).count() == 3
+        session.close()
+
+    def test_reuses_existing_catalog_row(self, session_factory):
+        """Test that known sets are not duplicated in the catalog"""
+        session = session_factory()
+        record_offers(session, [make_offer()])
+        record_offers(session, [make_offer(price=2300.0)])
+        session.commit()
+
+        assert session.query(LegoSet).count() == 1
+        assert session.query(PriceHistory).count() == 2
+        session.close()
+
+    def test_unchanged_offer_extends_previous_row(self, session_factory):
+        """Test that re-scraping an unchanged listing only moves last_seen"""
+        session = session_factory()
+        first = make_offer()
+        again = make_offer(store_url="https://allegro.pl/oferta/1?utm_source=feed")
+        again.last_updated = datetime(2024, 1, 1, 13, 0)
+        record_offers(session, [first])
+        added = record_offers(session, [again])
+        session.commit()
+
+        row = session.query(PriceHistory).one()
+        assert added == 0
+        assert row.first_seen == datetime(2024, 1, 1, 12, 0)
+        assert row.last_seen == datetime(2024, 1, 1, 13, 0)
+        session.close()
+
+    def test_price_change_starts_new_row(self, session_factory):
+        """Test that a changed price, even back to an earlier one, is a new observation"""
+        session = session_factory()
+        for hour, price in enumerate([2400.0, 2400.0, 2300.0, 2400.0]):
+            offer = make_offer(price=price)
+            offer.last_updated = datetime(2024, 1, 1, 12 + hour, 0)
+            record_offers(session, [offer])
+        session.commit()
+
+        rows = session.query(PriceHistory).order_by(PriceHistory.id).all()
+        assert [row.total_price for row in rows] == [2400.0, 2300.0, 2400.0]
+        assert rows[0].last_seen == datetime(2024, 1, 1, 13, 0)
+        session.close()
+
+    def test_duplicates_within_a_batch_collapse(self, session_factory):
+        """Test that one batch with the same listing twice stores one row"""
+        session = session_factory()
+        later = make_offer()
+        later.last_updated = datetime(2024, 1, 1, 12, 5)
+
+        added = record_offers(session, [later, make_offer()])
+        session.commit()
+
+        row = session.query(PriceHistory).one()
+        assert added == 1
+        assert row.last_seen == datetime(2024, 1, 1, 12, 5)
+        session.close()
+
+    def test_timestamps_stored_as_utc(self, session_factory):
+        """Test that offers observed in another zone are stored as naive UTC"""
+        session = session_factory()
+        offer = make_offer()
+        offer.last_updated = datetime(2024, 1, 1, 14, 0, tzinfo=timezone(timedelta(hours=2)))
+
+        record_offers(session, [offer, make_offer()])
+        session.commit()
+
+        row = session.query(PriceHistory).one()
+        assert row.first_seen == row.last_seen == datetime(2024, 1, 1, 12, 0)
+        session.close()
+
+    def test_older_observation_ignored(self, session_factory):
+        """Test that an offer observed before the stored one does not become the newest row"""
+        session = session_factory()
+        newer = make_offer(price=2300.0)
+        newer.last_updated = datetime(2024, 1, 1, 13, 0)
+        record_offers(session, [newer])
+
+        added = record_offers(session, [make_offer(price=2400.0)])
+        session.commit()
+
+        assert added == 0
+        assert [row.total_price for row in session.query(PriceHistory)] == [2300.0]
+        session.close()
+
+    def test_latest_row_is_latest_observed(self, session_factory):
+        """Test that listings compare against the latest observed row, not the last inserted"""
+        session = session_factory()
+        newer = make_offer(price=2300.0)
+        newer.last_updated = datetime(2024, 1, 1, 13, 0)
+        record_offers(session, [newer])
+        # A row written out of order, as earlier late writes could leave behind
+        older = make_offer(price=2400.0)
+        session.add(PriceHistory(
+            lego_set_id=session.query(LegoSet).one().id, store_name="Allegro", store_url=older.store_url,
+            price=2400.0, total_price=2400.0, offer_key=offer_key(older), fingerprint=offer_fingerprint(older),
+            scraped_at=older.last_updated, first_seen=older.last_updated, last_seen=older.last_updated
+        ))
+        session.flush()
+        again = make_offer(price=2300.0)
+        again.last_updated = datetime(2024, 1, 1, 14, 0)
+
+        added = record_offers(session, [again])
+        session.commit()
+
+        assert added == 0
+        latest = session.query(PriceHistory).filter(PriceHistory.total_price == 2300.0).one()
+        assert latest.last_seen == datetime(2024, 1, 1, 14, 0)
+        session.close()
+
+
+class TestBestPrices:
+    """Test cases for the current best price maintained at ingest"""
+
+    def test_best_price_follows_current_offers(self, session_factory):
+        """Test that the best price is the cheapest listing's newest price, up as well as down"""
+        session = session_factory()
+        record_offers(session, [
+            make_offer(price=2400.0), make_offer(price=2200.0, store_url="https://allegro.pl/oferta/2")
+        ])
+        record_offers(session, [make_offer(price=2300.0, store_url="https://allegro.pl/oferta/3")])
+        session.commit()
+
+        best = session.query(CurrentBestPrice).one()
+        assert best.total_price == 2200.0
+        assert best.store_url == "https://allegro.pl/oferta/2"
+
+        repriced = make_offer(price=2600.0, store_url="https://allegro.pl/oferta/2")
+        repriced.last_updated = datetime(2024, 1, 1, 13, 0)
+        record_offers(session, [repriced])
+        session.commit()
+
+        best = session.query(CurrentBestPrice).one()
+        assert best.total_price == 2300.0
+        assert best.store_url == "https://allegro.pl/oferta/3"
+        session.close()
+
+    def test_gone_listing_leaves_best_price(self, session_factory):
+        """Test that a listing not seen for a while no longer sets the best price"""
+        session = session_factory()
+        record_offers(session, [make_offer(price=1999.0)])
+        later = make_offer(price=2500.0, store_url="https://allegro.pl/oferta/2")
+        later.last_updated = datetime(2024, 1, 10, 12, 0)
+        record_offers(session, [later])
+        session.commit()
+
+        best = session.query(CurrentBestPrice).one()
+        assert best.total_price == 2500.0
+        session.close()
+
+    def test_one_row_per_set_and_condition(self, session_factory):
+        """Test that used offers do not displace the best new price"""
+        session = session_factory()
+        used = make_offer(price=1500.0, store_url="https://allegro.pl/oferta/2")
+        used.condition = "used"
+        record_offers(session, [make_offer(), used, make_offer(set_number="10294", price=2999.0)])
+        session.commit()
+
+        best = dict(
+            ((set_number, condition), total)
+            for set_number, condition, total in session.query(
+                LegoSet.set_number, CurrentBestPrice.condition, CurrentBestPrice.total_price
+            ).join(LegoSet, LegoSet.id == CurrentBestPrice.lego_set_id)
+        )
+        assert best == {("42100", "new"): 2400.0, ("42100", "used"): 1500.0, ("10294", "new"): 2999.0}
+        session.close()
+
+
+class TestCeleryApp:
+    """Test cases for worker configuration"""
+
+    def test_store_queues_declared(self):
+        """Test that every store has its own queue"""
+        queues = {queue.name for queue in celery_app.conf.task_queues}
+        for store_key in STORE_KEYS:
+            assert queue_for_store(store_key) in queues
+
+    def test_browser_bound_tuning(self):
+        """Test that workers reserve one task at a time and ack late"""
+        assert celery_app.conf.worker_prefetch_multiplier == 1
+        assert celery_app.conf.task_acks_late is True
+
+    def test_enqueue_routes_to_store_queue(self, monkeypatch):
+        """Test that each store's scrape is sent to that store's queue"""
+        sent = []
+
+        class FakeResult:
+            def __init__(self, task_id):
+                self.id = task_id
+
+        def fake_apply_async(args, kwargs, queue):
+            sent.append((args, queue))
+            return FakeResult(f"task-{len(sent)}")
+
+        monkeypatch.setattr(tasks.scrape_store_search, "apply_async", fake_apply_async)
+        task_ids = tasks.enqueue_search("42100")
+
+        assert set(task_ids) == set(STORE_KEYS)
+        assert (("olx", "42100"), "scrape.olx") in sent
+
+
+class TestScrapeTask:
+    """Test cases for the store scrape task"""
+
+    def test_task_stores_offers(self, monkeypatch, session_factory):
+        """Test that a task run scrapes the store and writes price history"""
+        monkeypatch.setattr(tasks, "_scrapers", {"taskstore": SlowScraper("TaskStore", 0)})
+        monkeypatch.setattr(tasks, "SessionLocal", session_factory)
+
+        result = tasks.scrape_store_search.run("taskstore", "42100")
+
+        assert result["results"] == 1
+        assert result["stored"] == 1
+        session = session_factory()
+        assert session.query(PriceHistory).first().store_name == "TaskStore"
+        session.close()
+
+    def test_failed_scrape_not_stored(self, monkeypatch, session_factory):
+        """Test that a failing store is retried and leaves no price history"""
+        monkeypatch.setattr(tasks, "_scrapers", {"taskstore": SlowScraper("TaskStore", 0, fail=True)})
+        monkeypatch.setattr(tasks, "SessionLocal", session_factory)
+
+        with pytest.raises(RuntimeError):
+            tasks.scrape_store_search.run("taskstore", "42100")
+
+        session = session_factory()
+        assert session.query(PriceHistory).count() == 0
+        assert session.query(LegoSet).count() == 0
+        session.close()
+
+    def test_multi_page_task_crawls(self, monkeypatch, session_factory):
+        """Test that a task asked for several pages stores offers from all of them"""
+        scraper = OlxScraper()
+        store = PagedStore(pages=2, delay=0)
+        scraper.fetch_listings = store.fetch_listings
+        monkeypatch.setattr(tasks, "_scrapers", {"olx": scraper})
+        monkeypatch.setattr(tasks, "SessionLocal", session_factory)
+
+        result = tasks.scrape_store_search.run("olx", "lego 42100", max_pages=3)
+
+        assert sorted(store.requested) == [1, 2, 3]
+        assert result["results"] == 6
+        assert result["stored"] == 6
+
+    def test_unknown_store_rejected(self, monkeypatch):
+        """Test that tasks for unknown stores fail"""
+        monkeypatch.setattr(tasks, "_scrapers", {})
+        with pytest.raises(ValueError):
+            tasks.scrape_store_search.run("nowhere", "42100")
@@ -0,0 +1,198 @@
+import asyncio
+import time
+import pytest
+from app.scraper.throttle import (
+    AIMDController, StoreThrottle, StoreThrottled, TokenBucket, is_timeout,
+    OUTCOME_OK, OUTCOME_THROTTLED, OUTCOME_EMPTY
+)
+from app.scraper import throttle as throttle_module
+from app.scraper.priority import LANE_BACKGROUND, LANE_INTERACTIVE, priority_lane
+from app.scraper.olx_scraper import OlxScraper
+from tests.conftest import SlowScraper, page_records
+
+
+class TestTokenBucket:
+    """Test cases for request-rate limiting"""
+
+    @pytest.mark.asyncio
+    async def test_rate_limits_after_burst(self):
+        """Test that requests beyond the burst wait for tokens"""
+        bucket = TokenBucket(rate=20, burst=2)
+        started = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+
+        assert time.monotonic() - started >= 0.08
+
+
+    @pytest.mark.asyncio
+    async def test_background_leaves_tokens_to_interactive(self):
+        """Test that a waiting interactive request gets the next token"""
+        bucket = TokenBucket(rate=50, burst=1)
+        await bucket.acquire()
+        order = []
+
+        async def take(lane):
+            await bucket.acquire(lane)
+            order.append(lane)
+
+        background = asyncio.create_task(take(LANE_BACKGROUND))
+        interactive = asyncio.create_task(take(LANE_INTERACTIVE))
+        await asyncio.gather(background, interactive)
+
+        assert order == [LANE_INTERACTIVE, LANE_BACKGROUND]
+
+
+class TestAIMDController:
+    """Test cases for adaptive concurrency"""
+
+    @pytest.mark.asyncio
+    async def test_limit_caps_in_flight(self):
+        """Test that no more than the limit run at once"""
+        controller = AIMDController(initial=2, minimum=1, maximum=4)
+        peak = 0
+
+        async def work():
+            nonlocal peak
+            await controller.acquire()
+            peak = max(peak, controller.in_flight)
+            await asyncio.sleep(0.01)
+            controller.release()
+
+        await asyncio.gather(*[work() for _ in range(6)])
+
+        assert peak == 2
+        assert controller.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_interactive_admitted_before_background(self):
+        """Test that a freed slot goes to queued interactive work first"""
+        controller = AIMDController(initial=1, minimum=1, maximum=1)
+        await controller.acquire(LANE_INTERACTIVE)
+        admitted = []
+
+        async def work(lane, name):
+            await controller.acquire(lane)
+            admitted.append(name)
+            controller.release()
+
+        background = asyncio.create_task(work(LANE_BACKGROUND, "crawl"))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(work(LANE_INTERACTIVE, "search"))
+        await asyncio.sleep(0)
+        assert controller.queued() == {LANE_INTERACTIVE: 1, LANE_BACKGROUND: 1}
+
+        controller.release()
+        await asyncio.gather(background, interactive)
+
+        assert admitted == ["search", "crawl"]
+
+    @pytest.mark.asyncio
+    async def test_background_waits_behind_queued_interactive(self):
+        """Test that background work does not take a free slot from queued interactive work"""
+        controller = AIMDController(initial=1, minimum=1, maximum=1)
+        controller._bind_loop()
+        controller._waiters[LANE_INTERACTIVE].append(asyncio.get_running_loop().create_future())
+
+        with priority_lane(LANE_BACKGROUND):
+            attempt = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0.01)
+
+        assert not attempt.done()
+        attempt.cancel()
+
+    def test_additive_increase_multiplicative_decrease(self):
+        """Test that the limit grows slowly and halves on congestion"""
+        controller = AIMDController(initial=2, minimum=1, maximum=8)
+        for _ in range(2):
+            controller.increase()
+        assert controller.current_limit == 3
+
+        controller.decrease()
+        assert controller.current_limit == 1
+
+
+class TestStoreThrottle:
+    """Test cases for per-store outcome feedback"""
+
+    def test_healthy_requests_widen_limit(self):
+        """Test that fast successful requests raise concurrency"""
+        throttle = StoreThrottle("store", rate=2.0, max_concurrency=8)
+        start = throttle.controller.current_limit
+        for _ in range(10):
+            throttle.record(OUTCOME_OK, 0.5)
+
+        assert throttle.controller.current_limit > start
+
+    def test_congestion_backs_off_rate_and_concurrency(self):
+        """Test that 429s and empty pages halve rate and concurrency once per burst"""
+        throttle = StoreThrottle("store", rate=2.0, max_concurrency=8)
+        throttle.controller.limit = 8
+        throttle.record(OUTCOME_THROTTLED, 0.5)
+        throttle.record(OUTCOME_EMPTY, 0.5)
+
+        assert throttle.controller.current_limit == 4
+        assert throttle.bucket.rate == 1.0
+        assert throttle.backoffs == 1
+
+    def test_slow_success_counts_as_congestion(self):
+        """Test that latency above target backs off"""
+        throttle = StoreThrottle("store", rate=2.0, max_concurrency=8, target_latency=1.0)
+        throttle.controller.limit = 8
+        throttle.record(OUTCOME_OK, 5.0)
+
+        assert throttle.controller.current_limit == 4
+
+    def test_timeout_detection(self):
+        """Test that asyncio and library timeouts are recognised"""
+        class TimeoutError(Exception):
+            pass
+
+        assert is_timeout(asyncio.TimeoutError())
+        assert is_timeout(TimeoutError())
+        assert not is_timeout(ValueError())
+
+
+class TestScraperThrottling:
+    """Test cases for throttled listing fetches"""
+
+    @pytest.mark.asyncio
+    async def test_fetch_outcomes_recorded(self, monkeypatch):
+        """Test that fetches record empty pages and rate-limit responses"""
+        monkeypatch.setattr(throttle_module, "throttles", {})
+        scraper = SlowScraper("ThrottledStore", 0)
+        responses = [[], StoreThrottled(429)]
+
+        async def fetch_listings_browser(url, deadline=None):
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        scraper.fetch_listings_browser = fetch_listings_browser
+        await scraper.fetch_listings("https://example.com")
+        with pytest.raises(StoreThrottled):
+            await scraper.fetch_listings("https://example.com")
+
+        outcomes = throttle_module.get_throttle(scraper).outcomes
+        assert outcomes == {OUTCOME_EMPTY: 1, OUTCOME_THROTTLED: 1}
+
+    @pytest.mark.asyncio
+    async def test_crawl_past_last_page_keeps_rate(self, monkeypatch):
+        """Test that empty pages beyond the end of a crawl are not taken as congestion"""
+        monkeypatch.setattr(throttle_module, "throttles", {})
+        scraper = OlxScraper()
+
+        async def fetch_listings_tiered(url, deadline=None, spec=None):
+            return page_records(1) if "page=" not in url else []
+
+        monkeypatch.setattr(scraper, "_fetch_listings_tiered", fetch_listings_tiered)
+        throttle = throttle_module.get_throttle(scraper)
+        rate, limit = throttle.bucket.rate, throttle.controller.current_limit
+
+        sets = [lego_set async for lego_set in scraper.crawl_sets("lego 42100", max_pages=3)]
+
+        assert len(sets) == 3
+        assert throttle.backoffs == 0
+        assert throttle.bucket.rate == rate
+        assert throttle.controller.current_limit >= limit